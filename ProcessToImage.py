@@ -7,6 +7,7 @@ import os
 import argparse
 from typing import List, Optional
 import platform
+from ocr_engine import get_engine_pool
 
 def check_dependencies() -> bool:
     """
@@ -176,7 +177,7 @@ def detect_orientation(image_path: str) -> int:
     """
     try:
         image = Image.open(image_path)
-        osd_data = pytesseract.image_to_osd(image)
+        osd_data = get_engine_pool().image_to_osd(image)
         rotation_angle = int(osd_data.split("Rotate:")[1].split("\n")[0].strip())
         return rotation_angle
     except Exception as e:
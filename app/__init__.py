@@ -12,6 +12,7 @@ from config import (  # Import from config package
     REQUIRED_CONFIG
 )
 from app.services.menu_service import MenuService
+from app.utils.image_pool import get_image_pool
 from app.services.email_service import EmailService
 from app.utils.logger import Logger
 from app.utils.tesseract_config import configure_tesseract
@@ -80,7 +81,7 @@ def create_app():
         
         # Initialize services
         try:
-            app.menu_service = MenuService(db=supabase, storage=supabase.storage)
+            app.menu_service = MenuService(db=supabase, storage=supabase.storage, image_pool=get_image_pool())
             print("✅ Menu service initialized successfully")
         except Exception as e:
             print(f"❌ Failed to initialize menu service: {e}")
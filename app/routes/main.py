@@ -17,13 +17,13 @@ from config import (
     DASHBOARD_PASSWORD
 )
 from app.utils.logger import Logger
-from app.services.menu_service import MenuService
+from app.services.menu_service import MenuService, PREVIEW_QUALITY_MODES
+from app.services.template_registry import MENUS_TABLE
 from app.services.email_service import EmailService
 from app.utils.debug import debug_log, debug_print, is_debug_mode
 from werkzeug.utils import secure_filename
 from PIL import Image, ImageDraw, ImageFont
 import io
-import requests
 import pytesseract
 import subprocess
 import smtplib
@@ -36,6 +36,11 @@ import re
 from werkzeug.exceptions import HTTPException
 import json
 from app.utils.tesseract_config import configure_tesseract, perform_ocr
+from app.utils.http_client import get_download_client
+from app.utils.image_pool import get_image_pool
+from ocr_planner import get_ocr_planner
+from app.utils.preview_jobs import get_preview_jobs
+from app.utils.events import get_event_bus, SERVICE_STATE_CHANGED, FORCE_SEND
 
 # Load environment variables
 load_dotenv()
@@ -51,8 +56,8 @@ def utility_processor():
         'datetime': datetime
     }
 
-# Initialize services
-menu_service = MenuService(db=supabase, storage=supabase.storage)
+# Initialize services (merge/encode work runs in the image process pool)
+menu_service = MenuService(db=supabase, storage=supabase.storage, image_pool=get_image_pool())
 email_service = EmailService(config={
     'SMTP_SERVER': SMTP_SERVER,
     'SMTP_PORT': SMTP_PORT,
@@ -288,6 +293,8 @@ def index():
         # Get current settings and next menu
         settings = menu_service.get_settings()
         next_menu = menu_service.calculate_next_menu()
+        calendar = menu_service.settings.calendar()
+        upcoming_sends = calendar.upcoming(datetime.now().date()) if calendar else []
         
         # Check service statuses with error handling
         try:
@@ -322,6 +329,7 @@ def index():
         return render_template('index.html',
             settings=settings,
             next_menu=next_menu,
+            upcoming_sends=upcoming_sends,
             db_status=db_status,
             redis_status=redis_status,
             smtp_status=smtp_status,
@@ -339,6 +347,7 @@ def index():
         return render_template('index.html',
             settings=None,
             next_menu=None,
+            upcoming_sends=[],
             db_status=False,
             redis_status=False,
             smtp_status=False,
@@ -370,11 +379,12 @@ def preview():
 
 @bp.route('/api/preview', methods=['GET'])
 def api_preview_menu():
-    """Generate a preview of a menu template"""
+    """Start a background preview render of a menu template (poll status_url for the result)"""
     try:
         print("Starting preview generation...")
         season = request.args.get('season')
         week = request.args.get('week')
+        quality = request.args.get('quality', 'preview')
         
         if not season or not week:
             return jsonify({
@@ -384,6 +394,15 @@ def api_preview_menu():
                     'suggestion': 'Please provide both season and week'
                 }
             }), 400
+        
+        if quality not in PREVIEW_QUALITY_MODES:
+            return jsonify({
+                'error': 'Invalid parameters',
+                'details': {
+                    'message': f'Unknown preview quality: {quality}',
+                    'suggestion': f"Use one of: {', '.join(PREVIEW_QUALITY_MODES)}"
+                }
+            }), 400
             
         print(f"Getting template for {season} week {week}...")
         template = menu_service.get_template(season, week)
@@ -410,18 +429,33 @@ def api_preview_menu():
                 }
             }), 404
             
-        print("Generating preview...")
-        preview = menu_service.generate_preview(
-            template={
-                'season': season,
-                'week': week,
-                'template_url': template['template_url'],
-            },
-            start_date=datetime.now()
+        # Render in the background; identical in-flight requests share one job
+        template_info = {
+            'season': season,
+            'week': week,
+            'template_url': template['template_url'],
+        }
+        job_key = get_preview_jobs().make_key(
+            season, week, quality,
+            template.get('file_path') or template['template_url'],
+            dates_template.get('file_path') or dates_template.get('template_url')
+        )
+        job_id, coalesced = get_preview_jobs().submit(
+            job_key,
+            lambda: menu_service.generate_preview(template=template_info, start_date=datetime.now(),
+                                                  quality=quality)
         )
         
-        print("Preview generated successfully")
-        return jsonify(preview)
+        print(f"Preview job {'joined' if coalesced else 'started'}: {job_id}")
+        status_url = url_for('main.api_preview_status', job_id=job_id)
+        response = jsonify({
+            'job_id': job_id,
+            'status': 'pending',
+            'coalesced': coalesced,
+            'status_url': status_url
+        })
+        response.headers['Location'] = status_url
+        return response, 202
             
     except Exception as e:
         error_msg = f"Preview generation failed: {str(e)}"
@@ -441,6 +475,77 @@ def api_preview_menu():
             }
         }), 500
 
+@bp.route('/api/preview/<job_id>', methods=['GET'])
+@login_required
+def api_preview_status(job_id):
+    """Return the status of a preview job, or its result once rendered"""
+    job = get_preview_jobs().get(job_id)
+    if not job:
+        return jsonify({
+            'error': 'Preview job not found',
+            'details': {
+                'message': 'The preview job has expired or does not exist',
+                'suggestion': 'Please generate the preview again'
+            }
+        }), 404
+    
+    if job['status'] == 'done':
+        return jsonify(dict(job['result'], status='done', job_id=job_id))
+    
+    if job['status'] != 'error':
+        return jsonify({'job_id': job_id, 'status': job['status']}), 202
+    
+    if job.get('error_type') == 'busy':
+        retry_after = job.get('retry_after', 2)
+        response = jsonify({
+            'job_id': job_id,
+            'status': 'error',
+            'error': 'Server busy',
+            'details': {
+                'message': 'Too many previews are rendering right now',
+                'type': 'busy',
+                'suggestion': f'Please try again in {retry_after} seconds'
+            }
+        })
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 503
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'error',
+        'error': 'System error',
+        'details': {
+            'message': job.get('error'),
+            'type': 'system_error',
+            'suggestion': 'Please refresh the page and try again'
+        }
+    }), 500
+
+@bp.route('/api/storage/previews', methods=['GET'])
+@login_required
+def preview_storage_usage():
+    """Report how much storage merged previews use"""
+    try:
+        return jsonify(menu_service.preview_store.usage_report())
+    except Exception as e:
+        get_logger().log_activity(
+            action="Preview Storage Report Failed",
+            details=str(e),
+            status="error"
+        )
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/storage/previews/cleanup', methods=['POST'])
+@login_required
+def preview_storage_cleanup():
+    """Evict expired previews now (pass dry_run=true to only report)"""
+    try:
+        dry_run = str(request.args.get('dry_run', 'false')).lower() == 'true'
+        report = menu_service.preview_store.evict(dry_run=dry_run)
+        return jsonify(report), 500 if report['errors'] else 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 def validate_template(file, season, week):
     """Validate template upload"""
     errors = []
@@ -589,13 +694,14 @@ def upload_template():
 def delete_template(season: str, week: str):
     """Delete a menu template"""
     try:
-        menu_service = MenuService(db=supabase, storage=supabase.storage)
-        result = menu_service.delete_template(season, int(week))
+        # The dashboard sends 'header' as the week of the dates template
+        week_num = 0 if season.lower() == 'dates' else int(week)
+        result = menu_service.delete_template(season, week_num)
         
         if 'error' in result:
             return jsonify({'error': result['error']}), 400
             
-        return jsonify({'success': True}), 200
+        return jsonify(result), 200
         
     except Exception as e:
         get_logger().log_activity(
@@ -608,43 +714,17 @@ def delete_template(season: str, week: str):
 @bp.route('/system-check')
 def system_check():
     try:
-        # Get current settings
-        settings_response = supabase.table('menu_settings')\
-            .select('*')\
-            .order('created_at', ascending=False)\
-            .limit(1)\
-            .execute()
-        
-        # Calculate next menu details using worker logic
+        # Next menu from the shared rotation calendar
         next_menu = None
-        if settings_response.data:
-            current_settings = settings_response.data[0]
-            start_date = datetime.strptime(current_settings['start_date'], '%Y-%m-%d').date()
-            today = datetime.now().date()
-            
-            # Use worker's calculate_next_menu logic
-            weeks_since_start = (today - start_date).days // 7
-            periods_elapsed = weeks_since_start // 2
-            next_period_start = start_date + timedelta(days=periods_elapsed * 14)
-            send_date = next_period_start - timedelta(days=current_settings['days_in_advance'])
-            
-            if today > send_date:
-                next_period_start += timedelta(days=14)
-                send_date += timedelta(days=14)
-            
-            is_odd_period = (periods_elapsed % 2) == 0
-            menu_pair = "1 & 2" if is_odd_period else "3 & 4"
-            
-            next_menu = {
-                'send_date': send_date,
-                'period_start': next_period_start,
-                'menu_pair': menu_pair,
-                'season': current_settings['season']
-            }
+        calendar = menu_service.settings.calendar()
+        if calendar is not None:
+            next_menu = calendar.next_send(datetime.now().date()).as_dict()
+            # The page shows the weeks as "1 & 2"
+            next_menu['menu_pair'] = next_menu['menu_pair'].replace('_', ' & ')
         
         return render_template(
             'system_check.html',
-            settings=settings_response.data[0] if settings_response.data else None,
+            settings=menu_service.settings.get_raw(),
             next_menu=next_menu
         )
         
@@ -673,7 +753,7 @@ def send_menu_email(start_date, recipient_list, season):
         preview_url = supabase.storage.from_('menus').get_public_url(preview_path)
         
         # Download the preview image
-        img_response = requests.get(preview_url)
+        img_data = get_download_client().get(preview_url)
         
         # Email setup
         sender_email = os.getenv('SMTP_USERNAME')
@@ -699,7 +779,7 @@ def send_menu_email(start_date, recipient_list, season):
         msg.attach(MIMEText(html_content, 'html'))
         
         # Attach the preview image
-        attachment = MIMEImage(img_response.content)
+        attachment = MIMEImage(img_data)
         attachment.add_header('Content-Disposition', 'attachment', 
                             filename=f"menu_{start_date.strftime('%Y%m%d')}.{menu['file_type']}")
         msg.attach(attachment)
@@ -828,8 +908,8 @@ def save_settings():
         
         debug_print("Saving settings:", settings_data)
         
-        # Save to database
-        result = supabase.table('menu_settings').insert(settings_data).execute()
+        # Save to database; every process reloads its cached settings
+        result = menu_service.settings.save(settings_data)
         
         get_logger().log_activity(
             action="Settings Updated",
@@ -888,6 +968,9 @@ def toggle_email():
                 'details': str(redis_error)
             }), 500
         
+        # Workers sleep until the next send; wake them to pick up the change
+        get_event_bus().publish(SERVICE_STATE_CHANGED, {'service_state': desired_state})
+        
         # Log the change
         get_logger().log_activity(
             action="Email Service Toggled",
@@ -1030,6 +1113,7 @@ def force_send():
         
         message = "Test menu sent successfully!" if success else "Failed to send test menu"
         debug_print(message)
+        get_event_bus().publish(FORCE_SEND, {'period_start': next_menu['period_start'], 'success': success})
         
         get_logger().log_activity(
             action="Force Send Menu",
@@ -1053,31 +1137,8 @@ def force_send():
 def get_menu_settings():
     """Get current menu settings"""
     try:
-        settings_response = supabase.table('menu_settings')\
-            .select('*')\
-            .order('created_at', ascending=False)\
-            .limit(1)\
-            .execute()
-            
-        if not settings_response.data:
-            return None
-            
-        settings = settings_response.data[0]
-        
-        # Convert date strings to dates
-        if settings.get('start_date'):
-            settings['start_date'] = datetime.strptime(
-                settings['start_date'], 
-                '%Y-%m-%d'
-            ).date()
-            
-        if settings.get('season_change_date'):
-            settings['season_change_date'] = datetime.strptime(
-                settings['season_change_date'], 
-                '%Y-%m-%d'
-            ).date()
-            
-        return settings
+        # Cached, with date strings already converted to dates
+        return menu_service.settings.get()
         
     except Exception as e:
         get_logger().log_activity(
@@ -1160,24 +1221,11 @@ def log_activity(action, details, status):
 @login_required
 def settings():
     try:
-        # Get current settings safely
-        settings_response = safe_supabase_query(
-            'menu_settings',
-            action="select",
-            order_by='created_at',
-            ascending=False,
-            limit=1
-        )
-        
-        if settings_response is None:
-            raise Exception("Failed to fetch settings")
-            
-        current_settings = settings_response.data[0] if settings_response.data else {}
+        # Get current settings (cached until the next save)
+        current_settings = menu_service.settings.get_raw() or {}
         
         # Get menu templates
-        templates_response = supabase.table('menu_templates')\
-            .select('*')\
-            .execute()
+        template_rows = menu_service.registry.templates()
             
         # Initialize template structure
         templates = {
@@ -1187,8 +1235,8 @@ def settings():
         }
         
         # Organize templates
-        if templates_response.data:
-            for template in templates_response.data:
+        if template_rows:
+            for template in template_rows:
                 season = template.get('season', '').lower()
                 week = template.get('week')
                 if season in templates:
@@ -1477,22 +1525,11 @@ def health_check():
 def menu_management():
     try:
         # Get current settings
-        settings_response = supabase.table('menu_settings')\
-            .select('*')\
-            .order('created_at', desc=True)\
-            .limit(1)\
-            .execute()
-            
-        settings = settings_response.data[0] if settings_response.data else None
+        settings = menu_service.settings.get_raw()
         
-        # Get all menus
-        menus_response = supabase.table('menus')\
-            .select('*')\
-            .execute()
-            
         # Convert to dictionary with menu_name as key
         menus = {}
-        for menu in menus_response.data:
+        for menu in menu_service.registry.menus():
             if 'file_path' in menu:
                 menu['file_url'] = supabase.storage.from_('menu-templates').get_public_url(menu['file_path'])
             menus[menu['name']] = menu
@@ -1520,12 +1557,10 @@ def handle_menus():
             # Get current settings
             settings = current_app.menu_service.get_settings()
             
-            # Get all menus
-            menus_response = supabase.table('menus').select('*').execute()
             menus = {}
             
             # Convert to dict with menu_name as key
-            for menu in menus_response.data:
+            for menu in menu_service.registry.menus():
                 # Get public URL for menu file
                 menu['file_url'] = supabase.storage.from_('menu-templates').get_public_url(menu['file_path'])
                 menus[menu['name']] = menu
@@ -1568,10 +1603,10 @@ def handle_menus():
             
             try:
                 # Handle existing menu
-                existing = supabase.table('menus').select('*').eq('name', menu_name).execute()
-                if existing.data:
+                existing = menu_service.registry.get_menu(menu_name)
+                if existing:
                     # Delete old file if it exists
-                    supabase.storage.from_('menu-templates').remove([existing.data[0]['file_path']])
+                    supabase.storage.from_('menu-templates').remove([existing['file_path']])
                     supabase.table('menus').delete().eq('name', menu_name).execute()
                     
                 # Generate unique filename
@@ -1597,6 +1632,7 @@ def handle_menus():
                 }
                 
                 supabase.table('menus').insert(menu_data).execute()
+                menu_service.registry.invalidate(MENUS_TABLE)
                 
                 logger.log_activity(
                     action="Menu Upload",
@@ -1627,16 +1663,11 @@ def handle_menus():
 def delete_menu(menu_name):
     try:
         # Get the menu record
-        menu_response = supabase.table('menus')\
-            .select('*')\
-            .eq('name', menu_name)\
-            .execute()
-            
-        if not menu_response.data:
+        menu = menu_service.registry.get_menu(menu_name)
+        if not menu:
             return "Menu not found", 404
             
         # Delete from storage first
-        menu = menu_response.data[0]
         storage_path = f"menus/{menu['file_path'].split('/')[-1]}"
         supabase.storage.from_('menu-templates').remove([storage_path])
         
@@ -1645,6 +1676,7 @@ def delete_menu(menu_name):
             .delete()\
             .eq('name', menu_name)\
             .execute()
+        menu_service.registry.invalidate(MENUS_TABLE)
             
         logger.log_activity(
             action="Menu Deleted",
@@ -1777,7 +1809,12 @@ def log_system_metrics():
                     'redis': redis_ok,
                     'database': db_ok,
                     'smtp': smtp_ok
-                }
+                },
+                'downloads': get_download_client().stats(),
+                'image_pool': get_image_pool().stats(),
+                'template_registry': menu_service.registry.stats(),
+                'settings': menu_service.settings.stats(),
+                'ocr_tiers': get_ocr_planner().stats()
             },
             status="info"
         )
@@ -1854,6 +1891,7 @@ def toggle_debug_mode():
             
             # Set value in Redis (or MockRedis)
             redis_client.set('debug_mode', value)
+            get_event_bus().publish(SERVICE_STATE_CHANGED, {'debug_mode': value})
             
             # Log the change
             get_logger().log_activity(
@@ -0,0 +1,141 @@
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, NamedTuple, Union
+
+# Each menu runs for two weeks; four menu weeks make one rotation
+PERIOD_DAYS = 14
+
+# Years of periods precomputed ahead of the build date
+DEFAULT_YEARS = 3
+
+DateLike = Union[date, datetime, str]
+
+def to_date(value: DateLike) -> date:
+    """Date from a date, datetime or YYYY-MM-DD string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+class MenuPeriod(NamedTuple):
+    """One two-week menu period and when its email goes out"""
+    index: int           # Periods since the settings' start_date
+    period_start: date
+    period_end: date     # Last day of the period
+    send_date: date
+    season: str          # 'summer' or 'winter'
+    week: int            # First menu week of the period (1 or 3)
+    menu_pair: str       # '1_2' or '3_4'
+
+    @property
+    def weeks(self):
+        """Both menu weeks served in the period"""
+        return (self.week, self.week + 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+class MenuCalendar:
+    """
+    The menu rotation worked out once from menu_settings.
+
+    Periods start every PERIOD_DAYS from start_date and alternate between
+    weeks 1 & 2 and weeks 3 & 4. Each is sent days_in_advance days before
+    it starts. A period takes the configured season, or the other season
+    if it starts on or after season_change_date.
+
+    Periods from just before the build date to `years` after it are
+    precomputed. Lookups by date are index arithmetic, and dates outside
+    that window are computed on demand.
+    """
+
+    def __init__(self, start_date: DateLike, days_in_advance: int, season: str,
+                 season_change_date: Optional[DateLike] = None, years: int = DEFAULT_YEARS,
+                 today: Optional[DateLike] = None):
+        self.start_date = to_date(start_date)
+        self.days_in_advance = int(days_in_advance)
+        self.season = season.lower()
+        self.season_change_date = to_date(season_change_date) if season_change_date else None
+
+        today = to_date(today) if today else datetime.now().date()
+        self._first = self.period_index(today) - 1
+        count = years * 366 // PERIOD_DAYS + 2
+        self._periods = [self._make_period(self._first + i) for i in range(count)]
+        self._send_dates = [period.send_date for period in self._periods]
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], **kwargs) -> 'MenuCalendar':
+        """Build from a menu_settings row (raw strings or parsed dates)"""
+        return cls(start_date=settings['start_date'],
+                   days_in_advance=settings['days_in_advance'],
+                   season=settings['season'],
+                   season_change_date=settings.get('season_change_date'),
+                   **kwargs)
+
+    def period_index(self, day: DateLike) -> int:
+        """Index of the period containing a day"""
+        return (to_date(day) - self.start_date).days // PERIOD_DAYS
+
+    def period(self, index: int) -> MenuPeriod:
+        """Period by index"""
+        offset = index - self._first
+        if 0 <= offset < len(self._periods):
+            return self._periods[offset]
+        return self._make_period(index)
+
+    def period_for(self, day: DateLike) -> MenuPeriod:
+        """The period a day falls in"""
+        return self.period(self.period_index(day))
+
+    def next_period(self, day: DateLike) -> MenuPeriod:
+        """The first period starting after a day"""
+        return self.period(self.period_index(day) + 1)
+
+    def next_send(self, day: DateLike) -> MenuPeriod:
+        """The first period whose send date is on or after a day"""
+        # send_date >= day  <=>  period_start >= day + days_in_advance
+        offset = (to_date(day) - self.start_date).days + self.days_in_advance
+        return self.period(-(-offset // PERIOD_DAYS))
+
+    def due_on(self, day: DateLike) -> Optional[MenuPeriod]:
+        """The period to send on a day, or None if nothing is due"""
+        period = self.next_send(day)
+        return period if period.send_date == to_date(day) else None
+
+    def sends_between(self, start: DateLike, end: DateLike) -> List[MenuPeriod]:
+        """Periods with send dates from start to end inclusive"""
+        start, end = to_date(start), to_date(end)
+        if self._send_dates and self._send_dates[0] <= start and end <= self._send_dates[-1]:
+            return self._periods[bisect_left(self._send_dates, start):
+                                 bisect_left(self._send_dates, end + timedelta(days=1))]
+        periods = []
+        period = self.next_send(start)
+        while period.send_date <= end:
+            periods.append(period)
+            period = self.period(period.index + 1)
+        return periods
+
+    def upcoming(self, day: DateLike, count: int = 6) -> List[MenuPeriod]:
+        """The next count periods to be sent, starting from a day"""
+        first = self.next_send(day).index
+        return [self.period(first + i) for i in range(count)]
+
+    def season_on(self, day: DateLike) -> str:
+        """Season in effect on a day"""
+        if self.season_change_date and to_date(day) >= self.season_change_date:
+            return 'winter' if self.season == 'summer' else 'summer'
+        return self.season
+
+    def _make_period(self, index: int) -> MenuPeriod:
+        period_start = self.start_date + timedelta(days=index * PERIOD_DAYS)
+        week = 1 if index % 2 == 0 else 3
+        return MenuPeriod(
+            index=index,
+            period_start=period_start,
+            period_end=period_start + timedelta(days=PERIOD_DAYS - 1),
+            send_date=period_start - timedelta(days=self.days_in_advance),
+            season=self.season_on(period_start),
+            week=week,
+            menu_pair=f"{week}_{week + 1}"
+        )
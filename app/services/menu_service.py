@@ -1,29 +1,100 @@
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import time
 import os
 from werkzeug.utils import secure_filename
 import traceback
 import random
 import string
-import re
+import threading
 from PIL import Image
 
 from app.utils.logger import get_logger
 from app.utils.debug import debug_log, debug_print, is_debug_mode
-from app.utils.tesseract_config import optimize_image_for_ocr, perform_ocr
+from app.utils.merge_cache import get_merge_cache, make_merge_key, content_digest, get_header_band_cache
+from app.utils.http_client import get_download_client
+from app.utils.concurrency import run_with_deadline, get_io_executor, get_render_executor
+from app.utils.image_pool import ImagePoolBusy
+from app.services.preview_store import PreviewStore
+from app.services.template_registry import get_template_registry, TEMPLATES_TABLE
+from app.services.settings_provider import get_settings_provider
+from app.utils.storage import list_folder, remove_paths
+from menu_ocr import parse_day_dates
+from ocr_planner import get_ocr_planner
+from menu_merge import (decode_image, decode_flags, encode_image, read_image_size, compute_header_layout,
+                        render_header_band, apply_header_band, band_fits, render_merge)
+
+# Content types for merged menu renders, keyed by output format
+MERGE_CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp'
+}
+
+# Seconds allowed for fetching and decoding both merge inputs
+MERGE_FETCH_TIMEOUT = 30
+
+# Share of the page height taken by the dates header
+DEFAULT_HEADER_PROPORTION = 0.20
+
+# Dashboard preview renders: decode scale divisor, format and encoder quality.
+# Only 'full' renders at template resolution, as emailed/printed menus do.
+PREVIEW_QUALITY_MODES = {
+    'preview': {'scale': 2, 'output_format': 'jpg', 'quality': 80},
+    'thumbnail': {'scale': 4, 'output_format': 'jpg', 'quality': 75},
+    'full': {'scale': 1, 'output_format': 'png', 'quality': None}
+}
+
+# Seconds before a failed bucket check is tried again
+BUCKET_RETRY_SECONDS = 30
+
+# Bucket check results for this process: bucket name -> (ok, time.monotonic() of the check)
+_bucket_status: Dict[str, tuple] = {}
+_bucket_lock = threading.Lock()
 
 class MenuService:
-    def __init__(self, db, storage):
+    def __init__(self, db, storage, image_pool=None, check_bucket: bool = True):
+        """
+        Args:
+            check_bucket: Verify the template bucket on construction. The check
+                runs once per process either way; pass False for short-lived
+                services (sends, per-request helpers) so construction does no
+                network I/O. The bucket is still verified before the first
+                template upload.
+        """
         self.db = db
         self.storage = storage
+        self.image_pool = image_pool  # Optional ImagePool for merge/encode work
         self.template_bucket = 'menu-templates'
         self.menus_bucket = 'menus'
-        self._ensure_bucket_exists()
-        
+        self.preview_store = PreviewStore(storage, self.template_bucket)
+        self.registry = get_template_registry(db)
+        self.settings = get_settings_provider(db)
+        if check_bucket:
+            self._ensure_bucket_exists()
+
+    def _ensure_bucket_exists(self, refresh: bool = False) -> bool:
+        """
+        Ensure storage bucket exists, checking at most once per process.
+
+        A successful check is remembered for the life of the process. A
+        failed one is retried after BUCKET_RETRY_SECONDS, or straight away
+        with refresh=True (e.g. after an upload to the bucket failed).
+        """
+        with _bucket_lock:
+            status = _bucket_status.get(self.template_bucket)
+            if status is not None and not refresh:
+                ok, checked_at = status
+                if ok or time.monotonic() - checked_at < BUCKET_RETRY_SECONDS:
+                    return ok
+            ok = self._check_bucket()
+            _bucket_status[self.template_bucket] = (ok, time.monotonic())
+            return ok
+
     @debug_log("Bucket Check", timing=True)
-    def _ensure_bucket_exists(self):
-        """Ensure storage bucket exists"""
+    def _check_bucket(self) -> bool:
+        """Check the storage bucket, creating it if missing"""
         try:
             debug_print("\n=== Checking Storage Bucket ===")
             debug_print(f"Bucket name: {self.template_bucket}")
@@ -31,8 +102,8 @@ class MenuService:
             # Try to get bucket info first
             try:
                 debug_print("Checking if bucket exists...")
-                bucket_info = self.storage.from_(self.template_bucket).list()
-                if bucket_info is not None:  # If we can list files, bucket exists
+                bucket_info = self.storage.get_bucket(self.template_bucket)
+                if bucket_info is not None:
                     debug_print("✅ Bucket exists and is accessible")
                     return True
             except Exception as e:
@@ -73,7 +144,7 @@ class MenuService:
                 
                 # Verify bucket was created
                 debug_print("Verifying new bucket...")
-                verify = self.storage.from_(self.template_bucket).list()
+                verify = self.storage.get_bucket(self.template_bucket)
                 if verify is not None:
                     debug_print("✅ New bucket verified and accessible")
                     return True
@@ -111,44 +182,14 @@ class MenuService:
     def calculate_next_menu(self):
         """Calculate which menu should be sent next"""
         try:
-            # Get current settings
-            settings_response = self.db.table('menu_settings')\
-                .select('*')\
-                .order('created_at', desc=True)\
-                .limit(1)\
-                .execute()
-
-            if not settings_response.data:
+            calendar = self.settings.calendar()
+            if calendar is None:
                 debug_print("No menu settings found")
                 return None
 
-            settings = settings_response.data[0]
-            start_date = datetime.strptime(settings['start_date'], '%Y-%m-%d').date()
-            today = datetime.now().date()
-
-            # Calculate next menu period
-            days_since_start = (today - start_date).days
-            weeks_since_start = days_since_start // 7
-            current_period = weeks_since_start // 2
-            
-            # Calculate next period start
-            next_period_start = start_date + timedelta(weeks=current_period * 2)
-            if today >= next_period_start:
-                next_period_start += timedelta(weeks=2)
-
-            # Calculate send date
-            send_date = next_period_start - timedelta(days=settings['days_in_advance'])
-
-            # Determine season and week
-            season = settings['season']
-            week_pair = "1_2" if (current_period % 2 == 0) else "3_4"
-
-            result = {
-                'send_date': send_date,
-                'period_start': next_period_start,
-                'season': season,
-                'menu_pair': week_pair
-            }
+            # The first period whose send date is today or later
+            result = calendar.next_send(datetime.now().date()).as_dict()
+            result['recipient_emails'] = (self.settings.get_raw() or {}).get('recipient_emails') or []
             
             debug_print("Calculated next menu:", result)
             return result
@@ -161,28 +202,12 @@ class MenuService:
     def get_settings(self) -> Optional[Dict[str, Any]]:
         """Get current menu settings"""
         try:
-            response = self.db.table('menu_settings')\
-                .select('*')\
-                .order('created_at', desc=True)\
-                .limit(1)\
-                .execute()
-                
-            if not response.data:
+            # Dates are already converted to date objects
+            settings = self.settings.get()
+            if not settings:
                 debug_print("No settings found")
                 return None
                 
-            settings = response.data[0]
-            
-            # Convert date strings to date objects
-            settings['start_date'] = datetime.strptime(
-                settings['start_date'], '%Y-%m-%d'
-            ).date()
-            
-            if settings.get('season_change_date'):
-                settings['season_change_date'] = datetime.strptime(
-                    settings['season_change_date'], '%Y-%m-%d'
-                ).date()
-                
             debug_print("Retrieved settings:", settings)
             return settings
             
@@ -365,6 +390,10 @@ class MenuService:
                     raise Exception("Database insert failed - no response")
                 
                 debug_print("✅ Database updated successfully")
+                self.registry.invalidate(TEMPLATES_TABLE)
+                
+                # Lay out the header for the new template/header in the background
+                get_io_executor().submit(self._prepare_header_bands, season, file_data, file.content_type)
                 debug_print("=== Template Save Complete ===\n")
                 
                 return {
@@ -375,6 +404,10 @@ class MenuService:
                 
             except Exception as e:
                 debug_print(f"\n❌ Error during upload/database update: {str(e)}")
+                # The bucket may have gone away since it was checked; recheck for the next save
+                self._ensure_bucket_exists(refresh=True)
+                # The previous row was already deleted above
+                self.registry.invalidate(TEMPLATES_TABLE)
                 # Try to clean up failed upload
                 try:
                     debug_print("Attempting to clean up failed upload...")
@@ -396,14 +429,13 @@ class MenuService:
     def get_templates(self):
         """Get all templates organized by season"""
         try:
-            response = self.db.table('menu_templates').select('*').execute()
             templates = {
                 'summer': {}, 
                 'winter': {},
                 'dates': {}  # Add dates section
             }
             
-            for template in response.data:
+            for template in self.registry.templates():
                 season = template['season']
                 week = str(template['week']) if season not in ['dates'] else 'header'
                 templates[season][week] = {
@@ -424,22 +456,8 @@ class MenuService:
     def get_template(self, season, week):
         """Get a specific template"""
         try:
-            query = self.db.table('menu_templates')\
-                .select('*')\
-                .eq('season', season.lower())
-            
-            # Handle dates template differently
-            if season.lower() == 'dates':
-                query = query.eq('week', 0)  # For dates template, week should be 0
-            else:
-                query = query.eq('week', int(week))
-                
-            response = query.execute()
-                
-            if not response.data:
-                return None
-                
-            return response.data[0]
+            # The dates template is stored as week 0
+            return self.registry.get_template(season, week)
             
         except Exception as e:
             get_logger().log_activity(
@@ -449,10 +467,18 @@ class MenuService:
             )
             return None
 
-    def generate_preview(self, template, start_date):
-        """Generate a preview of the menu template."""
+    def generate_preview(self, template, start_date, quality: str = 'preview'):
+        """
+        Generate a preview of the menu template.
+        
+        Previews are decoded at reduced resolution (cv2.IMREAD_REDUCED_COLOR_*),
+        composited at that size and sent as a small JPEG; pass quality='full'
+        for a template-resolution render. See PREVIEW_QUALITY_MODES.
+        """
         if not template or not start_date:
             raise ValueError("Template and start date are required")
+        if quality not in PREVIEW_QUALITY_MODES:
+            raise ValueError(f"Invalid preview quality: {quality}")
 
         required_fields = ['season', 'week', 'template_url']
         for field in required_fields:
@@ -477,7 +503,8 @@ class MenuService:
         merged_template = self.merge_header_with_template(
             source_image=dates_template_url,
             template_path=template['template_url'],
-            header_proportion=0.20  # Header takes up 20% of the height
+            header_proportion=DEFAULT_HEADER_PROPORTION,
+            **PREVIEW_QUALITY_MODES[quality]
         )
 
         if not merged_template:
@@ -488,7 +515,8 @@ class MenuService:
                 'season': template['season'],
                 'week': template['week'],
                 'template_url': merged_template,
-                'date_range': date_range
+                'date_range': date_range,
+                'quality': quality
             }
         }
 
@@ -632,65 +660,89 @@ class MenuService:
                 status="warning"
             )
 
+    def _template_storage_paths(self, season: str, week: int, template: Dict[str, Any]) -> List[str]:
+        """Storage paths that belong to a template, found by prefix-scoped listing"""
+        if season == 'dates':
+            scopes = [('dates', 'header_'), ('backup/dates', 'header_')]
+        else:
+            scopes = [
+                (season, f"week_{week}_"),
+                (f"backup/{season}", f"week_{week}_"),
+                ('templates', f"{season}_week_{week}")  # Legacy layout
+            ]
+        
+        bucket = self.storage.from_(self.template_bucket)
+        paths = [template['file_path']] if template.get('file_path') else []
+        for folder, name_prefix in scopes:
+            for obj in list_folder(bucket, folder, search=name_prefix):
+                path = f"{folder}/{obj['name']}"
+                if obj['name'].startswith(name_prefix) and path not in paths:
+                    paths.append(path)
+        return paths
+
     def delete_template(self, season: str, week: int) -> Dict[str, Any]:
-        """Delete a menu template"""
+        """
+        Delete a menu template, its stored files and their backups.
+        
+        Only the template's own folders are listed (summer/, winter/,
+        dates/, backup/...), and all matching objects are removed in batched
+        calls.
+        
+        Returns:
+            {'success': True, 'objects': [{'path', 'status'}...], 'deleted': n,
+             'failed': n} or {'error': message}
+        """
         try:
-            print(f"\n=== Starting Template Deletion ===")
-            print(f"Season: {season}, Week: {week}")
+            season = season.lower()
+            debug_print(f"\n=== Starting Template Deletion ===")
+            debug_print(f"Season: {season}, Week: {week}")
             
             # Get the template first
             template = self.get_template(season, week)
             if not template:
-                print("Template not found")
+                debug_print("Template not found")
                 return {'error': 'Template not found'}
             
-            print(f"Found template: {template}")
-            
             # Delete from storage first
             try:
-                print("\n=== Deleting from Storage ===")
-                files = self.storage.from_('menu-templates').list()
-                pattern = f"templates/{season.lower()}_week_{week}"
-                matching_files = [f for f in files if f['name'].startswith(pattern)]
-                
-                print(f"Found {len(matching_files)} matching files to delete")
-                for file_obj in matching_files:
-                    print(f"Deleting: {file_obj['name']}")
-                    self.storage.from_('menu-templates').remove([file_obj['name']])
-                    time.sleep(0.5)
-                    print(f"Deleted: {file_obj['name']}")
+                paths = self._template_storage_paths(season, week, template)
+                debug_print(f"Deleting {len(paths)} stored object(s)")
+                objects = remove_paths(self.storage.from_(self.template_bucket), paths)
             except Exception as e:
-                print(f"Error deleting from storage: {str(e)}")
+                debug_print(f"Error deleting from storage: {str(e)}")
+                objects = [{'path': None, 'status': 'failed', 'error': str(e)}]
             
-            # Wait for storage deletion
-            time.sleep(1)
-            
-            print("\n=== Deleting from Database ===")
-            # Delete from database
-            query = self.db.table('menu_templates')\
+            # Delete from database (dates headers are stored as week 0)
+            self.db.table('menu_templates')\
                 .delete()\
-                .eq('season', season.lower())
-                
-            # Handle dates template differently
-            if season.lower() == 'dates':
-                query = query.is_('week', None)
-            else:
-                query = query.eq('week', int(week))
-                
-            query.execute()
-            print("Database deletion complete")
+                .eq('season', season)\
+                .eq('week', 0 if season == 'dates' else int(week))\
+                .execute()
+            self.registry.invalidate(TEMPLATES_TABLE)
+            
+            failed = [obj for obj in objects if obj['status'] == 'failed']
+            report = {
+                'success': True,
+                'objects': objects,
+                'deleted': sum(1 for obj in objects if obj['status'] == 'deleted'),
+                'failed': len(failed)
+            }
             
             get_logger().log_activity(
                 action="Template Deleted",
-                details=f"Deleted template for {season} week {week}",
-                status="success"
+                details={
+                    'template': f"{season} week {week}",
+                    'deleted': report['deleted'],
+                    'failed': report['failed']
+                },
+                status="warning" if failed else "success"
             )
             
-            print("\n=== Deletion Complete ===")
-            return {'success': True}
+            debug_print("=== Deletion Complete ===")
+            return report
             
         except Exception as e:
-            print(f"\n=== Deletion Failed ===\nError: {str(e)}")
+            debug_print(f"\n=== Deletion Failed ===\nError: {str(e)}")
             get_logger().log_activity(
                 action="Template Delete Failed",
                 details=str(e),
@@ -698,102 +750,48 @@ class MenuService:
             )
             return {'error': str(e)}
 
-    def merge_header_with_template(self, source_image: str, template_path: str, header_proportion: float = 0.20) -> Optional[str]:
+    def merge_header_with_template(self, source_image: str, template_path: str,
+                                   header_proportion: float = DEFAULT_HEADER_PROPORTION,
+                                   output_format: str = 'png', return_bytes: bool = False,
+                                   scale: int = 1, quality: Optional[int] = None, upload: bool = True):
         """
         Merge the dates header with the menu template.
         
+        Renders are cached by the content of both images, the header proportion
+        and the output format, so repeated calls for an unchanged template reuse
+        the stored render instead of merging and uploading again.
+        
         Args:
             source_image: URL of the dates header image
             template_path: URL of the menu template image
             header_proportion: Proportion of image height to use for header
+            output_format: Encoded image format ('png', 'jpg' or 'webp')
+            return_bytes: Return the encoded image bytes instead of the URL
+            scale: Decode and composite at 1/scale resolution (1, 2, 4 or 8)
+            quality: Encoder quality for jpg/webp (format default if None)
+            upload: Store the render under previews/; callers that keep
+                their own copy pass False with return_bytes
         
         Returns:
-            URL of the merged image
+            URL of the merged image (or its bytes when return_bytes is set)
         """
         try:
-            import cv2
-            import numpy as np
-            import requests
-            from io import BytesIO
-            
-            # Download images from URLs
-            header_response = requests.get(source_image)
-            template_response = requests.get(template_path)
-            
-            # Convert to numpy arrays
-            header_array = np.frombuffer(header_response.content, np.uint8)
-            template_array = np.frombuffer(template_response.content, np.uint8)
-            
-            # Decode images
-            source = cv2.imdecode(header_array, cv2.IMREAD_COLOR)
-            template = cv2.imdecode(template_array, cv2.IMREAD_COLOR)
-            
-            if source is None or template is None:
-                raise ValueError("Failed to read source or template image")
-            
-            # Get dimensions
-            source_height = source.shape[0]
-            template_height = template.shape[0]
-            template_width = template.shape[1]
-            
-            # Calculate header heights
-            header_height = int(source_height * header_proportion)
-            template_header_height = int(template_height * header_proportion)
-            
-            # Extract and resize header
-            header = source[0:header_height, :]
-            header_aspect_ratio = header.shape[1] / header.shape[0]
-            new_header_width = int(template_header_height * header_aspect_ratio)
-            header_resized = cv2.resize(header, (new_header_width, template_header_height))
-            
-            # Create result image
-            result = template.copy()
-            
-            # Center the header
-            x_offset = (template_width - new_header_width) // 2
-            
-            # Handle wide headers
-            if new_header_width > template_width:
-                crop_start = (new_header_width - template_width) // 2
-                header_resized = header_resized[:, crop_start:crop_start + template_width]
-                x_offset = 0
-            
-            # Create header region with white background
-            header_region = np.full((template_header_height, template_width, 3), 255, dtype=np.uint8)
-            
-            # Place header in center
-            if x_offset >= 0:
-                header_region[:, x_offset:x_offset + header_resized.shape[1]] = header_resized
-            
-            # Copy header to template
-            result[0:template_header_height, :] = header_region
-            
-            # Save to temporary file
-            temp_path = os.path.join('temp_images', f'merged_menu_{int(time.time() * 1000)}.png')
-            os.makedirs('temp_images', exist_ok=True)
-            
-            # Save merged image
-            success = cv2.imwrite(temp_path, result)
-            if not success:
-                raise ValueError("Failed to save merged image")
-            
-            # Upload to storage
-            with open(temp_path, 'rb') as f:
-                file_path = f"previews/merged_{int(time.time() * 1000)}.png"
-                self.storage.from_(self.template_bucket).upload(
-                    path=file_path,
-                    file=f,
-                    file_options={"content-type": "image/png"}
-                )
-            
-            # Get public URL
-            public_url = self.storage.from_(self.template_bucket).get_public_url(file_path)
-            
-            # Clean up temporary file
-            os.remove(temp_path)
-            
-            return public_url
-            
+            output_format = output_format.lower().lstrip('.')
+            if output_format not in MERGE_CONTENT_TYPES:
+                raise ValueError(f"Unsupported output format: {output_format}")
+            
+            # Download both images concurrently under one deadline
+            deadline = time.monotonic() + MERGE_FETCH_TIMEOUT
+            header_data, template_data = get_download_client().get_many(
+                [source_image, template_path], deadline=deadline)
+            
+            return self._merge_downloaded(header_data, template_data, header_proportion,
+                                          output_format, return_bytes or not upload, deadline=deadline,
+                                          scale=scale, quality=quality, upload=upload)
+            
+        except ImagePoolBusy:
+            # Let the caller turn this into a fast "try again" response
+            raise
         except Exception as e:
             get_logger().log_activity(
                 action="Template Merge Failed",
@@ -802,28 +800,271 @@ class MenuService:
             )
             return None 
 
+    @debug_log("Render All Menus", timing=True)
+    def render_all_menus(self, seasons=('summer', 'winter'), header_proportion: float = DEFAULT_HEADER_PROPORTION,
+                         output_format: str = 'png', return_bytes: bool = False) -> Dict[str, Any]:
+        """
+        Render every stored week template with the current dates header.
+        
+        The header and all templates are downloaded in one concurrent batch
+        and the header is decoded once; the merges then run in parallel on
+        the render pool. Each render goes through the same caches and upload
+        path as merge_header_with_template, so this also prewarms them.
+        
+        Args:
+            seasons: Seasons to render
+            header_proportion: Proportion of image height to use for header
+            output_format: Encoded image format ('png' or 'jpg')
+            return_bytes: Return encoded image bytes instead of URLs
+        
+        Returns:
+            Dict with 'success', 'menus' ({season: {week: url or bytes}})
+            and 'errors' ({'season/week': message})
+        """
+        menus = {season: {} for season in seasons}
+        errors = {}
+        try:
+            output_format = output_format.lower().lstrip('.')
+            if output_format not in MERGE_CONTENT_TYPES:
+                raise ValueError(f"Unsupported output format: {output_format}")
+            
+            templates = self.get_templates()
+            dates_template = templates.get('dates', {}).get('header')
+            if not dates_template or not dates_template.get('template_url'):
+                raise ValueError("Dates header template not found")
+            
+            # Image week templates only; PDFs are not merged
+            targets = []
+            for season in seasons:
+                for week, template in sorted(templates.get(season, {}).items()):
+                    path = (template.get('file_path') or '').lower()
+                    if template.get('template_url') and not path.endswith('.pdf'):
+                        targets.append((season, week, template['template_url']))
+            if not targets:
+                return {'success': True, 'menus': menus, 'errors': errors}
+            
+            # One download batch, one header decode
+            deadline = time.monotonic() + MERGE_FETCH_TIMEOUT
+            downloads = get_download_client().get_many(
+                [dates_template['template_url']] + [url for _, _, url in targets], deadline=deadline)
+            header_data = downloads[0]
+            source = decode_image(header_data)
+            header_digest = content_digest(header_data)
+            
+            executor = get_render_executor()
+            futures = {
+                executor.submit(self._merge_downloaded, header_data, template_data, header_proportion,
+                                output_format, return_bytes, header_digest=header_digest, source=source):
+                    (season, week)
+                for (season, week, _), template_data in zip(targets, downloads[1:])
+            }
+            for future, (season, week) in futures.items():
+                try:
+                    menus[season][week] = future.result()
+                except Exception as e:
+                    errors[f"{season}/{week}"] = str(e)
+            
+            get_logger().log_activity(
+                action="Menus Rendered",
+                details={'rendered': len(targets) - len(errors), 'failed': len(errors)},
+                status="success" if not errors else "warning"
+            )
+            return {'success': not errors, 'menus': menus, 'errors': errors}
+            
+        except Exception as e:
+            get_logger().log_activity(
+                action="Menu Render Failed",
+                details=str(e),
+                status="error"
+            )
+            return {'success': False, 'menus': menus, 'errors': errors, 'error': str(e)}
+
+    def _merge_downloaded(self, header_data: bytes, template_data: bytes, header_proportion: float,
+                          output_format: str, return_bytes: bool, deadline: Optional[float] = None,
+                          header_digest: Optional[str] = None, source=None, scale: int = 1,
+                          quality: Optional[int] = None, upload: bool = True):
+        """
+        Merge downloaded header and template bytes, upload and cache the render.
+        
+        Pass the decoded header as source (and its digest) when rendering
+        several templates with one header, so it is only decoded once. A
+        scale above 1 decodes and composites at 1/scale resolution. With
+        upload off the render is only kept in this process's cache.
+        """
+        client = get_download_client()
+        
+        # Look up an existing render of exactly these inputs
+        cache = get_merge_cache()
+        header_digest = header_digest or content_digest(header_data)
+        cache_key = make_merge_key(
+            header_digest,
+            content_digest(template_data),
+            header_proportion,
+            output_format,
+            scale=scale,
+            quality=quality
+        )
+        cached = cache.get(cache_key)
+        merged_data = None
+        if cached:
+            if not return_bytes:
+                if cached.get('url'):
+                    debug_print(f"✅ Merge cache hit: {cached['url']}")
+                    return cached['url']
+                # Rendered without an upload; upload those bytes now
+                merged_data = cached.get('data')
+            elif cached.get('data') is not None:
+                debug_print("✅ Merge cache hit (bytes)")
+                return cached['data']
+            elif cached.get('url'):
+                merged_data = client.get(cached['url'])
+                cache.put(cache_key, cached['url'], merged_data)
+                return merged_data
+        
+        if merged_data is None:
+            # Web requests hand the CPU work to the image pool; batch renders
+            # (source given) already run on the render pool
+            if self.image_pool is not None and source is None:
+                merged_data = self._render_in_pool(header_data, template_data, header_digest,
+                                                   header_proportion, output_format, scale, quality)
+            else:
+                merged_data = self._render_in_process(header_data, template_data, header_digest, header_proportion,
+                                                      output_format, deadline=deadline, source=source,
+                                                      scale=scale, quality=quality)
+        
+        # Store under a content-hash name; identical renders share one object
+        public_url = None
+        if upload:
+            _, public_url = self.preview_store.save(merged_data, output_format, MERGE_CONTENT_TYPES[output_format])
+        
+        cache.put(cache_key, public_url, merged_data)
+        
+        return merged_data if return_bytes else public_url
+
+    def _render_in_pool(self, header_data: bytes, template_data: bytes, header_digest: str,
+                        header_proportion: float, output_format: str, scale: int = 1,
+                        quality: Optional[int] = None) -> bytes:
+        """Decode, merge and encode in the image pool, keeping the band cache in this process"""
+        band_cache = get_header_band_cache()
+        band_key = band_cache.make_key(header_digest, read_image_size(template_data), header_proportion, scale)
+        merged_data, new_band = self.image_pool.run(
+            render_merge, header_data, template_data, header_proportion, output_format,
+            band_cache.get(band_key), scale, quality)
+        if new_band is not None:
+            band_cache.put(band_key, new_band)
+        return merged_data
+
+    def _render_in_process(self, header_data: bytes, template_data: bytes, header_digest: str,
+                           header_proportion: float, output_format: str,
+                           deadline: Optional[float] = None, source=None, scale: int = 1,
+                           quality: Optional[int] = None) -> bytes:
+        """Decode, merge and encode on the calling thread"""
+        flags = decode_flags(scale)
+        
+        # Reuse the header band laid out for this header version and
+        # template size; only decode the header when it is not cached
+        band_cache = get_header_band_cache()
+        band_key = band_cache.make_key(header_digest, read_image_size(template_data), header_proportion, scale)
+        band = band_cache.get(band_key)
+        template = None
+        if band is not None or source is not None:
+            template = decode_image(template_data, flags)
+            if band is not None and not band_fits(band, template.shape, header_proportion):
+                band = None  # Decoded size differs (e.g. EXIF rotation); lay out again
+        if band is None:
+            if template is None:
+                # Decode both images in parallel (imdecode releases the GIL)
+                source, template = run_with_deadline([
+                    lambda: decode_image(header_data, flags),
+                    lambda: decode_image(template_data, flags)
+                ], deadline)
+            elif source is None:
+                source = decode_image(header_data, flags)
+            band = self._render_header_band(source, template.shape, header_proportion, band_key)
+        
+        # Merge is one block copy into the decoded template; encode in memory
+        merged = apply_header_band(template, band)
+        return encode_image(merged, output_format, quality)
+
+    def _render_header_band(self, source, template_shape, header_proportion: float, band_key):
+        """Render the header band for a template shape and cache it under band_key"""
+        layout = compute_header_layout(source.shape, template_shape, header_proportion)
+        band = render_header_band(source, layout)
+        get_header_band_cache().put(band_key, band)
+        return band
+
+    def _prepare_header_bands(self, season: str, file_data: bytes, content_type: str,
+                              header_proportion: float = DEFAULT_HEADER_PROPORTION) -> int:
+        """
+        Pre-render header bands after a template upload.
+        
+        A new dates header is laid out for every image template this
+        process has downloaded; a new menu template gets the current dates
+        header laid out for its size. Bands are rendered at full size and
+        at every preview scale, so later merges only decode the template
+        and copy the band.
+        
+        Returns:
+            Number of bands rendered
+        """
+        try:
+            if not (content_type or '').startswith('image/'):
+                return 0
+            
+            client = get_download_client()
+            if season == 'dates':
+                header_data = file_data
+                # Sizes come from template bytes already downloaded here;
+                # other templates get their band on their first merge
+                template_data = []
+                templates = self.get_templates()
+                for season_name in ('summer', 'winter'):
+                    for template in templates.get(season_name, {}).values():
+                        path = (template.get('file_path') or '').lower()
+                        if template.get('template_url') and not path.endswith('.pdf'):
+                            data = client.cached(template['template_url'])
+                            if data is not None:
+                                template_data.append(data)
+            else:
+                dates_template = self.get_template('dates', 0)
+                if not dates_template or not dates_template.get('template_url'):
+                    return 0
+                header_data = client.get(dates_template['template_url'])
+                template_data = [file_data]
+            
+            # One template per full size, as the band cache keys them
+            templates_by_size = {read_image_size(data): data for data in template_data}
+            if not templates_by_size:
+                return 0
+            
+            header_digest = content_digest(header_data)
+            band_cache = get_header_band_cache()
+            scales = sorted({1} | {mode['scale'] for mode in PREVIEW_QUALITY_MODES.values()})
+            rendered = 0
+            for scale in scales:
+                source = decode_image(header_data, decode_flags(scale))
+                for size, data in templates_by_size.items():
+                    self._render_header_band(source, read_image_size(data, scale), header_proportion,
+                                             band_cache.make_key(header_digest, size, header_proportion, scale))
+                    rendered += 1
+            
+            debug_print(f"✅ Pre-rendered {rendered} header band(s)")
+            return rendered
+            
+        except Exception as e:
+            debug_print(f"⚠️ Header band pre-render failed: {str(e)}")
+            return 0
+
     def extract_dates_from_image(self, image_path: str) -> Optional[Dict[str, str]]:
-        """Extract dates from the image using OCR"""
+        """Extract dates from the image, escalating from a quick header OCR only when needed"""
         try:
             # Open image
             with Image.open(image_path) as img:
-                # Perform OCR with custom config
-                text = perform_ocr(img, config='--psm 6 --oem 1')
-                
-                # Process text to extract dates
-                dates = {}
-                lines = text.split('\n')
-                for line in lines:
-                    # Process one line at a time
-                    match = re.search(r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*\s+(\d+(?:st|nd|rd|th)?\s+[A-Za-z]+)', line)
-                    if match:
-                        day = match.group(1)[:3]  # Standardize to 3 letters
-                        date = match.group(2)
-                        dates[day] = date
+                plan = get_ocr_planner().run(parse_day_dates, image=img)
                 
-                logger.info(f"Extracted dates: {dates}")
-                return dates if dates else None
+                debug_print(f"Extracted dates: {plan['result']} (OCR tier {plan['tier']})")
+                return plan['result']
                 
         except Exception as e:
-            logger.error(f"Error extracting dates: {str(e)}")
-            return None 
\ No newline at end of file
+            debug_print(f"❌ Error extracting dates: {str(e)}")
+            return None 
@@ -0,0 +1,196 @@
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any
+
+from app.utils.debug import debug_print
+from app.utils.logger import get_logger
+from app.utils.merge_cache import content_digest
+from app.utils.http_client import get_download_client
+from app.utils.storage import remove_paths
+from app.utils.leader import RedisLock, get_redis_client
+from app.services.preview_store import PreviewStore
+from app.services.menu_calendar import MenuPeriod, to_date
+
+PRERENDER_TABLE = 'prerendered_menus'
+PRERENDER_PREFIX = 'prerendered'
+
+# Days before its send date that a menu is rendered
+DEFAULT_DAYS_AHEAD = 7
+
+# Pre-rendered menus are kept this long after their period starts
+RETAIN_DAYS = 28
+
+# Failed renders (e.g. a template not uploaded yet) are retried after this
+RETRY_SECONDS = 3600
+
+# A replica rendering a period holds its lock at most this long
+RENDER_LOCK_SECONDS = 300
+
+class MenuPrerenderer:
+    """
+    Builds the emailed menu for upcoming periods ahead of their send date.
+
+    Each render is stored content-addressed under prerendered/ with its
+    SHA-256 checksum and the template/header files it was built from in
+    the prerendered_menus table. On the send date get_artifact() hands back
+    the stored bytes once the checksum matches and both source files are
+    still current; otherwise the caller falls back to rendering live.
+    """
+
+    def __init__(self, menu_service, days_ahead: int = DEFAULT_DAYS_AHEAD, redis_client=None):
+        self.menu_service = menu_service
+        self.redis_client = redis_client if redis_client is not None else get_redis_client()
+        self.db = menu_service.db
+        self.days_ahead = days_ahead
+        self.store = PreviewStore(menu_service.storage, menu_service.template_bucket, prefix=PRERENDER_PREFIX)
+
+    def run(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Render every period sent within days_ahead that is missing or stale.
+
+        Every worker replica runs this; each period is locked while it is
+        rendered, so replicas split the periods between them.
+
+        Returns:
+            {'rendered': [...], 'current': n, 'busy': [...], 'failed': [...],
+             'pruned': n, 'next_run': datetime the next period enters the window}
+        """
+        today = today or datetime.now().date()
+        report = {'rendered': [], 'current': 0, 'busy': [], 'failed': [], 'pruned': 0, 'next_run': None}
+        calendar = self.menu_service.settings.calendar()
+        if calendar is None:
+            return report
+
+        for period in calendar.sends_between(today, today + timedelta(days=self.days_ahead)):
+            label = f"{period.period_start} {period.season} week {period.week}"
+            lock = RedisLock(self.redis_client, f"prerender:{period.period_start}:{period.season}:{period.week}",
+                             RENDER_LOCK_SECONDS)
+            if not lock.acquire():
+                report['busy'].append(label)  # Another replica is rendering it
+                continue
+            try:
+                if self.prerender(period) is None:
+                    report['current'] += 1
+                else:
+                    report['rendered'].append(label)
+            except Exception as e:
+                debug_print(f"❌ Pre-render failed for {label}: {str(e)}")
+                report['failed'].append({'period': label, 'error': str(e)})
+            finally:
+                lock.release()
+
+        report['pruned'] = self.prune(today)
+
+        # The next period enters the window days_ahead before its send date
+        upcoming = calendar.next_send(today + timedelta(days=self.days_ahead + 1))
+        report['next_run'] = datetime.combine(upcoming.send_date - timedelta(days=self.days_ahead),
+                                              datetime.min.time())
+        if report['failed']:
+            report['next_run'] = min(report['next_run'], datetime.now() + timedelta(seconds=RETRY_SECONDS))
+
+        if report['rendered'] or report['failed']:
+            get_logger().log_activity(
+                action="Menus Pre-rendered",
+                details={k: v for k, v in report.items() if k != 'next_run'},
+                status="warning" if report['failed'] else "success"
+            )
+        return report
+
+    def prerender(self, period: MenuPeriod, force: bool = False) -> Optional[Dict[str, Any]]:
+        """Render one period unless a current render exists; returns the new record or None"""
+        template, header = self._sources(period.season, period.week)
+        existing = self._record(period.period_start, period.season, period.week)
+        if not force and existing and self._is_current(existing, template, header):
+            return None
+
+        data = self.menu_service.merge_header_with_template(
+            source_image=header['template_url'],
+            template_path=template['template_url'],
+            return_bytes=True,
+            upload=False  # Stored below under prerendered/, which preview eviction leaves alone
+        )
+        if not data:
+            raise ValueError("Merge returned no image")
+
+        path, url = self.store.save(data, 'png', 'image/png')
+        record = {
+            'period_start': period.period_start.isoformat(),
+            'season': period.season,
+            'week': period.week,
+            'file_path': path,
+            'file_url': url,
+            'checksum': content_digest(data),
+            'size': len(data),
+            'template_path': template.get('file_path'),
+            'header_path': header.get('file_path'),
+            'built_at': datetime.now().isoformat()
+        }
+        self.db.table(PRERENDER_TABLE).upsert(record, on_conflict='period_start,season,week').execute()
+        debug_print(f"✅ Pre-rendered {period.period_start} {period.season} week {period.week}: {path}")
+        return record
+
+    def get_artifact(self, period_start, season: str, week) -> Optional[bytes]:
+        """
+        The pre-built menu bytes for a period, or None if there is no usable render.
+
+        A render is only used while its template and dates header are the
+        ones currently uploaded and the downloaded bytes match its checksum.
+        """
+        try:
+            season, week = season.lower(), int(week)
+            record = self._record(to_date(period_start), season, week)
+            if not record:
+                return None
+            template, header = self._sources(season, week)
+            if not self._is_current(record, template, header):
+                debug_print("⚠️ Pre-rendered menu is stale, templates changed since it was built")
+                return None
+            data = get_download_client().get(record['file_url'])
+            if content_digest(data) != record['checksum']:
+                get_logger().log_activity(
+                    action="Pre-rendered Menu Checksum Mismatch",
+                    details={'file_path': record['file_path']},
+                    status="error"
+                )
+                return None
+            return data
+        except Exception as e:
+            debug_print(f"⚠️ Pre-rendered menu unavailable: {str(e)}")
+            return None
+
+    def prune(self, today: date) -> int:
+        """Delete renders for periods that started more than RETAIN_DAYS ago"""
+        cutoff = (today - timedelta(days=RETAIN_DAYS)).isoformat()
+        old = self.db.table(PRERENDER_TABLE).select('*').lt('period_start', cutoff).execute().data or []
+        if not old:
+            return 0
+        kept = self.db.table(PRERENDER_TABLE).select('file_path').gte('period_start', cutoff).execute().data or []
+        in_use = {row['file_path'] for row in kept}
+        # Identical renders share one object; only remove unreferenced ones
+        paths = sorted({row['file_path'] for row in old} - in_use)
+        if paths:
+            remove_paths(self.menu_service.storage.from_(self.menu_service.template_bucket), paths)
+        self.db.table(PRERENDER_TABLE).delete().lt('period_start', cutoff).execute()
+        return len(old)
+
+    def _sources(self, season: str, week):
+        template = self.menu_service.get_template(season, week)
+        if not template:
+            raise ValueError(f"No template found for {season} week {week}")
+        header = self.menu_service.get_template('dates', 0)
+        if not header:
+            raise ValueError("Dates header template not found")
+        return template, header
+
+    @staticmethod
+    def _is_current(record: Dict[str, Any], template: Dict[str, Any], header: Dict[str, Any]) -> bool:
+        return (record.get('template_path') == template.get('file_path')
+                and record.get('header_path') == header.get('file_path'))
+
+    def _record(self, period_start: date, season: str, week: int) -> Optional[Dict[str, Any]]:
+        response = self.db.table(PRERENDER_TABLE)\
+            .select('*')\
+            .eq('period_start', period_start.isoformat())\
+            .eq('season', season)\
+            .eq('week', week)\
+            .execute()
+        return response.data[0] if response.data else None
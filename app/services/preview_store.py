@@ -0,0 +1,158 @@
+import re
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.utils.debug import debug_print
+from app.utils.logger import get_logger
+from app.utils.merge_cache import content_digest, get_merge_cache, REDIS_TTL_SECONDS
+from app.utils.storage import list_folder, remove_paths
+
+PREVIEW_PREFIX = 'previews'
+
+# Previews untouched for longer than this are evicted. Kept above the merge
+# cache's Redis TTL so a cached URL never points at an evicted object.
+DEFAULT_TTL_SECONDS = REDIS_TTL_SECONDS + 24 * 3600
+
+# Total size the previews folder is trimmed back to, oldest first
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Content-addressed preview names (older uploads use merged_<timestamp>)
+CONTENT_NAME = re.compile(r'^merged_[0-9a-f]{32}\.\w+$')
+
+class PreviewStore:
+    """Content-addressed storage for merged menu renders.
+
+    Renders are stored under previews/merged_<content hash>.<ext>, so
+    identical renders share one object; uploading again only refreshes its
+    timestamp. evict() applies a TTL and a total size cap (least recently
+    written first) and usage_report() summarises what is stored.
+    """
+
+    def __init__(self, storage, bucket: str = 'menu-templates', prefix: str = PREVIEW_PREFIX):
+        self.storage = storage
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def object_path(self, data: bytes, output_format: str) -> str:
+        """Storage path for an encoded render"""
+        return f"{self.prefix}/merged_{content_digest(data)[:32]}.{output_format}"
+
+    def save(self, data: bytes, output_format: str, content_type: str) -> Tuple[str, str]:
+        """Upload a render (or refresh an identical one) and return (path, public URL)"""
+        path = self.object_path(data, output_format)
+        self.storage.from_(self.bucket).upload(
+            path=path,
+            file=data,
+            file_options={
+                "content-type": content_type,
+                "cache-control": "31536000",  # Content-addressed, never changes
+                "x-upsert": "true"
+            }
+        )
+        return path, self.storage.from_(self.bucket).get_public_url(path)
+
+    def list_objects(self) -> List[Dict[str, Any]]:
+        """List every object in the previews folder"""
+        return list_folder(self.storage.from_(self.bucket), self.prefix)
+
+    def usage_report(self, objects: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Summarise preview storage: object count, bytes, age and format split"""
+        objects = self.list_objects() if objects is None else objects
+        by_format: Dict[str, Dict[str, int]] = {}
+        total_bytes = 0
+        legacy = 0
+        for obj in objects:
+            size = _object_size(obj)
+            total_bytes += size
+            ext = obj['name'].rsplit('.', 1)[-1].lower() if '.' in obj['name'] else ''
+            entry = by_format.setdefault(ext, {'objects': 0, 'bytes': 0})
+            entry['objects'] += 1
+            entry['bytes'] += size
+            if not CONTENT_NAME.match(obj['name']):
+                legacy += 1
+
+        times = sorted(_last_used(obj) for obj in objects)
+        return {
+            'objects': len(objects),
+            'bytes': total_bytes,
+            'legacy_objects': legacy,
+            'by_format': by_format,
+            'oldest': _iso(times[0]) if times else None,
+            'newest': _iso(times[-1]) if times else None
+        }
+
+    def evict(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES,
+              dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Delete expired previews, then the least recently written ones until
+        the folder fits in max_bytes.
+
+        Merge cache entries pointing at deleted objects are dropped so no
+        caller is handed a dead URL.
+
+        Returns:
+            Report with the deleted paths, bytes freed and what remains
+        """
+        objects = sorted(self.list_objects(), key=_last_used)
+        cutoff = time.time() - ttl_seconds
+
+        expired = [obj for obj in objects if _last_used(obj) < cutoff]
+        kept = [obj for obj in objects if _last_used(obj) >= cutoff]
+        kept_bytes = sum(_object_size(obj) for obj in kept)
+
+        over_quota = []
+        while kept and kept_bytes > max_bytes:
+            obj = kept.pop(0)
+            kept_bytes -= _object_size(obj)
+            over_quota.append(obj)
+
+        victims = expired + over_quota
+        paths = [f"{self.prefix}/{obj['name']}" for obj in victims]
+        deleted = 0
+        errors = []
+        if not dry_run:
+            cache = get_merge_cache()
+            for result in remove_paths(self.storage.from_(self.bucket), paths):
+                if result['status'] == 'failed':
+                    errors.append(f"{result['path']}: {result['error']}")
+                    continue
+                deleted += 1
+                cache.forget_url(self.storage.from_(self.bucket).get_public_url(result['path']))
+
+        report = {
+            'dry_run': dry_run,
+            'deleted': deleted,
+            'expired': len(expired),
+            'over_quota': len(over_quota),
+            'freed_bytes': sum(_object_size(obj) for obj in victims),
+            'remaining_objects': len(kept),
+            'remaining_bytes': kept_bytes,
+            'paths': paths,
+            'errors': errors
+        }
+        debug_print(f"Preview eviction: {report['expired']} expired, {report['over_quota']} over quota")
+        get_logger().log_activity(
+            action="Preview Storage Cleanup",
+            details={k: v for k, v in report.items() if k != 'paths'},
+            status="error" if errors else "success"
+        )
+        return report
+
+def _object_size(obj: Dict[str, Any]) -> int:
+    return int((obj.get('metadata') or {}).get('size') or 0)
+
+def _parse_time(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0.0
+
+def _last_used(obj: Dict[str, Any]) -> float:
+    """Latest write/access time of a storage object (epoch seconds)"""
+    return max(_parse_time(obj.get(field)) for field in ('updated_at', 'created_at', 'last_accessed_at'))
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
@@ -0,0 +1,172 @@
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Iterable, Callable
+
+from app.utils.debug import debug_print
+
+SENDS_TABLE = 'menu_sends'
+
+# A claim that is neither sent nor released after this long belongs to a
+# worker that died mid-send and may be taken over
+CLAIM_TIMEOUT_SECONDS = 15 * 60
+
+CLAIMED = 'claimed'
+SENT = 'sent'
+
+def menu_version(season: str, week, template: Optional[Dict[str, Any]] = None) -> str:
+    """Identify the menu sent for a period: the week's template and the file uploaded for it"""
+    version = f"{str(season).lower()}_week_{int(week)}"
+    if template and template.get('file_path'):
+        version += f":{template['file_path']}"
+    return version
+
+class SendLedger:
+    """
+    Record of which menu went to which recipient, shared by every worker.
+
+    Rows in menu_sends are unique on (period_start, recipient, menu_version),
+    so claim() is a single insert that exactly one worker can win; the
+    winner sends and then calls mark_sent(), or release() if sending failed
+    so a later check can retry. Claims left behind by a worker that died
+    mid-send are taken over after CLAIM_TIMEOUT_SECONDS with a
+    compare-and-set on claimed_at.
+    """
+
+    def __init__(self, db, claim_timeout: float = CLAIM_TIMEOUT_SECONDS):
+        self.db = db
+        self.claim_timeout = claim_timeout
+
+    @property
+    def worker_id(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def claim(self, period_start, recipient: str, version: str) -> bool:
+        """Take the right to send this menu to this recipient; False if another worker has it"""
+        key = self._key(period_start, recipient, version)
+        row = dict(key, status=CLAIMED, claimed_by=self.worker_id, claimed_at=_now())
+        try:
+            self.db.table(SENDS_TABLE).insert(row).execute()
+            return True
+        except Exception as e:
+            if not _is_duplicate(e):
+                raise
+        return self._take_over_stale(key)
+
+    def mark_sent(self, period_start, recipient: str, version: str) -> None:
+        """Record a successful send for a claim held by this worker"""
+        self._query(self.db.table(SENDS_TABLE).update({
+            'status': SENT,
+            'sent_at': _now()
+        }), self._key(period_start, recipient, version)).execute()
+
+    def release(self, period_start, recipient: str, version: str) -> None:
+        """Drop an unsent claim so the menu can be sent again"""
+        query = self._query(self.db.table(SENDS_TABLE).delete(), self._key(period_start, recipient, version))
+        query.eq('status', CLAIMED).eq('claimed_by', self.worker_id).execute()
+
+    def is_sent(self, period_start, recipient: str, version: str) -> bool:
+        """Whether this menu has already gone to this recipient"""
+        query = self._query(self.db.table(SENDS_TABLE).select('status'), self._key(period_start, recipient, version))
+        response = query.eq('status', SENT).limit(1).execute()
+        return bool(response.data)
+
+    def pending(self, period_start, recipients: Iterable[str], version: str) -> List[str]:
+        """Recipients this menu has not been sent to yet"""
+        response = self.db.table(SENDS_TABLE)\
+            .select('recipient')\
+            .eq('period_start', _iso_date(period_start))\
+            .eq('menu_version', version)\
+            .eq('status', SENT)\
+            .execute()
+        sent = {row['recipient'] for row in response.data or []}
+        return [recipient for recipient in recipients if recipient.strip().lower() not in sent]
+
+    def deliver(self, period_start, recipients: Iterable[str], version: str,
+                send: Callable[[str], bool]) -> Dict[str, List[str]]:
+        """
+        Send a menu to each recipient whose claim this worker wins.
+
+        send(recipient) returns True on success. Recipients already sent to
+        or claimed by another worker are skipped; failed sends are released
+        for a later retry.
+
+        Returns:
+            {'sent': [...], 'skipped': [...], 'failed': [...]}
+        """
+        result = {'sent': [], 'skipped': [], 'failed': []}
+        for recipient in recipients:
+            if not self.claim(period_start, recipient, version):
+                result['skipped'].append(recipient)
+                continue
+            try:
+                success = send(recipient)
+            except Exception as e:
+                debug_print(f"❌ Send to {recipient} failed: {str(e)}")
+                success = False
+            if success:
+                self.mark_sent(period_start, recipient, version)
+                result['sent'].append(recipient)
+            else:
+                self.release(period_start, recipient, version)
+                result['failed'].append(recipient)
+        return result
+
+    def _take_over_stale(self, key: Dict[str, str]) -> bool:
+        response = self._query(self.db.table(SENDS_TABLE).select('*'), key).limit(1).execute()
+        if not response.data:
+            return False
+        existing = response.data[0]
+        if existing.get('status') != CLAIMED:
+            return False
+        claimed_at = datetime.fromisoformat(existing['claimed_at'].replace('Z', '+00:00'))
+        if claimed_at.tzinfo is None:
+            claimed_at = claimed_at.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - claimed_at < timedelta(seconds=self.claim_timeout):
+            return False
+        # Only one worker's update can still match the old claimed_at
+        response = self._query(self.db.table(SENDS_TABLE).update({
+            'claimed_by': self.worker_id,
+            'claimed_at': _now()
+        }), key).eq('status', CLAIMED).eq('claimed_at', existing['claimed_at']).execute()
+        if response.data:
+            debug_print(f"⚠️ Took over stale send claim from {existing.get('claimed_by')}")
+        return bool(response.data)
+
+    @staticmethod
+    def _key(period_start, recipient: str, version: str) -> Dict[str, str]:
+        return {
+            'period_start': _iso_date(period_start),
+            'recipient': recipient.strip().lower(),
+            'menu_version': version
+        }
+
+    @staticmethod
+    def _query(query, key: Dict[str, str]):
+        for column, value in key.items():
+            query = query.eq(column, value)
+        return query
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _iso_date(value) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def _is_duplicate(error: Exception) -> bool:
+    # Postgres unique_violation, as surfaced by postgrest
+    code = getattr(error, 'code', None)
+    return code == '23505' or '23505' in str(error) or 'duplicate key' in str(error).lower()
+
+_ledgers: Dict[int, SendLedger] = {}
+_ledgers_lock = threading.Lock()
+
+def get_send_ledger(db) -> SendLedger:
+    """Get the send ledger for a database client"""
+    with _ledgers_lock:
+        ledger = _ledgers.get(id(db))
+        if ledger is None or ledger.db is not db:
+            ledger = SendLedger(db)
+            _ledgers[id(db)] = ledger
+        return ledger
@@ -0,0 +1,180 @@
+import copy
+import sys
+import time
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from app.utils.debug import debug_print
+from app.utils.events import get_event_bus
+from app.services.menu_calendar import MenuCalendar
+
+SETTINGS_TABLE = 'menu_settings'
+
+# Event published when a new settings row is saved
+SETTINGS_CHANGED = 'settings_changed'
+
+# Settings fields stored as YYYY-MM-DD strings
+DATE_FIELDS = ('start_date', 'season_change_date')
+
+# Cache lifetime when changes are broadcast between processes. The TTL only
+# matters for rows written outside the app.
+DEFAULT_TTL_SECONDS = 3600
+
+# Without Redis pub/sub other processes never hear about a change, so the
+# cached row is only trusted briefly
+FALLBACK_TTL_SECONDS = 30
+
+def parse_settings(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a settings row with its date strings converted to dates"""
+    settings = copy.deepcopy(row)
+    for field in DATE_FIELDS:
+        if isinstance(settings.get(field), str) and settings[field]:
+            settings[field] = datetime.strptime(settings[field], '%Y-%m-%d').date()
+    return settings
+
+class SettingsProvider:
+    """Cached copy of the latest menu_settings row.
+
+    The row is fetched once and kept, raw and with dates parsed, until
+    save() (or invalidate()) publishes a change, which every process
+    subscribed to the event bus acts on. If the database cannot be
+    reached when the cache is stale or invalidated, the last row read is
+    served until a reload succeeds.
+    """
+
+    def __init__(self, db, event_bus=None, ttl_seconds: Optional[float] = None):
+        self.db = db
+        self.event_bus = event_bus
+        if ttl_seconds is None:
+            distributed = event_bus is not None and event_bus.distributed
+            ttl_seconds = DEFAULT_TTL_SECONDS if distributed else FALLBACK_TTL_SECONDS
+        self.ttl_seconds = ttl_seconds
+        self._snapshot = None  # (loaded_at, raw row or None, parsed row or None)
+        self._invalidated = False  # Snapshot kept only as a fallback until the next reload
+        self._calendar = None  # (snapshot it was built from, MenuCalendar)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loads = 0
+        if event_bus is not None:
+            event_bus.subscribe(SETTINGS_CHANGED, self._on_changed)
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Latest settings with start_date and season_change_date as dates"""
+        parsed = self._load()[2]
+        return copy.deepcopy(parsed) if parsed is not None else None
+
+    def get_raw(self) -> Optional[Dict[str, Any]]:
+        """Latest settings row as stored"""
+        raw = self._load()[1]
+        return copy.deepcopy(raw) if raw is not None else None
+
+    def calendar(self) -> Optional[MenuCalendar]:
+        """Menu calendar for the latest settings, rebuilt only when they change"""
+        snapshot = self._load()
+        if snapshot[2] is None:
+            return None
+        with self._lock:
+            if self._calendar is not None and self._calendar[0] is snapshot:
+                return self._calendar[1]
+        calendar = MenuCalendar.from_settings(snapshot[2])
+        with self._lock:
+            self._calendar = (snapshot, calendar)
+        return calendar
+
+    def save(self, settings_data: Dict[str, Any]):
+        """Insert a new settings row and tell every process about it"""
+        result = self.db.table(SETTINGS_TABLE).insert(settings_data).execute()
+        self.invalidate()
+        return result
+
+    def invalidate(self, broadcast: bool = True) -> None:
+        """Drop the cached row here and, with broadcast, in every process"""
+        self._drop()
+        if broadcast and self.event_bus is not None:
+            self.event_bus.publish(SETTINGS_CHANGED)
+
+    def stats(self) -> Dict[str, Any]:
+        """Load count and age of the cached row"""
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'loads': self.loads,
+                'ttl_seconds': self.ttl_seconds,
+                'age_seconds': round(time.monotonic() - snapshot[0], 1) if snapshot else None
+            }
+
+    def _on_changed(self, data: Optional[Dict[str, Any]]) -> None:
+        self._drop()
+
+    def _drop(self) -> None:
+        # The row stays as the fallback for a failed reload
+        with self._lock:
+            self._invalidated = True
+            self._generation += 1
+
+    def _fresh(self):
+        with self._lock:
+            snapshot = None if self._invalidated else self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot[0] < self.ttl_seconds:
+            return snapshot
+        return None
+
+    def _load(self):
+        snapshot = self._fresh()
+        if snapshot is not None:
+            return snapshot
+
+        with self._load_lock:
+            snapshot = self._fresh()
+            if snapshot is not None:
+                return snapshot
+            with self._lock:
+                generation = self._generation
+                stale = self._snapshot
+            try:
+                response = self.db.table(SETTINGS_TABLE)\
+                    .select('*')\
+                    .order('created_at', desc=True)\
+                    .limit(1)\
+                    .execute()
+            except Exception as e:
+                if stale is None:
+                    raise
+                debug_print(f"⚠️ Settings refresh failed, serving cached row: {str(e)}")
+                return stale
+
+            raw = response.data[0] if response.data else None
+            snapshot = (time.monotonic(), raw, parse_settings(raw) if raw is not None else None)
+            with self._lock:
+                self.loads += 1
+                # Keep the result only if nothing was saved while loading
+                if self._generation == generation:
+                    self._snapshot = snapshot
+                    self._invalidated = False
+            return snapshot
+
+_providers: Dict[int, SettingsProvider] = {}
+_providers_lock = threading.Lock()
+
+def get_settings_provider(db) -> SettingsProvider:
+    """Get the process-wide settings provider for a database client"""
+    with _providers_lock:
+        provider = _providers.get(id(db))
+        if provider is None or provider.db is not db:
+            provider = SettingsProvider(db, event_bus=get_event_bus())
+            _providers[id(db)] = provider
+        return provider
+
+def get_menu_settings() -> Optional[Dict[str, Any]]:
+    """Latest settings row for the shared database client, or None when it is unavailable.
+
+    For the standalone scripts, which have no client of their own.
+    """
+    try:
+        from config import supabase
+        return get_settings_provider(supabase).get_raw()
+    except Exception as e:
+        print(f"Could not load menu settings: {str(e)}", file=sys.stderr)
+        return None
@@ -0,0 +1,130 @@
+import time
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.utils.debug import debug_print
+from app.utils.events import get_event_bus
+
+TEMPLATES_TABLE = 'menu_templates'
+MENUS_TABLE = 'menus'
+
+# Event published when either table changes
+TEMPLATES_CHANGED = 'templates_changed'
+
+# Snapshots are reloaded after this long even without an invalidation, in
+# case a change was made outside the app or its event was missed
+DEFAULT_TTL_SECONDS = 300
+
+class TemplateRegistry:
+    """In-process copy of the menu_templates and menus tables.
+
+    Each table is loaded with one select the first time it is needed and
+    lookups are then served from memory. save/delete call invalidate(),
+    which drops the snapshot here and, through the event bus, in every
+    other process, so the next lookup reloads it.
+    """
+
+    def __init__(self, db, event_bus=None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.db = db
+        self.event_bus = event_bus
+        self.ttl_seconds = ttl_seconds
+        self._snapshots: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loads = 0
+        if event_bus is not None:
+            event_bus.subscribe(TEMPLATES_CHANGED, self._on_changed)
+
+    def templates(self) -> List[Dict[str, Any]]:
+        """All menu_templates rows"""
+        return [dict(row) for row in self._rows(TEMPLATES_TABLE)]
+
+    def get_template(self, season: str, week) -> Optional[Dict[str, Any]]:
+        """The template row for a season and week (the dates header is week 0)"""
+        season = season.lower()
+        week = 0 if season == 'dates' else int(week)
+        for row in self._rows(TEMPLATES_TABLE):
+            if row.get('season') == season and row.get('week') == week:
+                return dict(row)
+        return None
+
+    def menus(self) -> List[Dict[str, Any]]:
+        """All menus rows"""
+        return [dict(row) for row in self._rows(MENUS_TABLE)]
+
+    def get_menu(self, name: str) -> Optional[Dict[str, Any]]:
+        """The menus row with this name"""
+        for row in self._rows(MENUS_TABLE):
+            if row.get('name') == name:
+                return dict(row)
+        return None
+
+    def invalidate(self, table: Optional[str] = None, broadcast: bool = True) -> None:
+        """Drop the snapshot of one table (or both) here and, with broadcast, everywhere"""
+        self._drop(table)
+        if broadcast and self.event_bus is not None:
+            self.event_bus.publish(TEMPLATES_CHANGED, {'table': table})
+
+    def stats(self) -> Dict[str, Any]:
+        """Loaded tables, row counts and snapshot ages"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'loads': self.loads,
+                'tables': {
+                    table: {'rows': len(rows), 'age_seconds': round(now - loaded_at, 1)}
+                    for table, (loaded_at, rows) in self._snapshots.items()
+                }
+            }
+
+    def _on_changed(self, data: Optional[Dict[str, Any]]) -> None:
+        # Published locally by invalidate(), which already dropped the snapshot;
+        # dropping again is harmless
+        self._drop((data or {}).get('table'))
+
+    def _drop(self, table: Optional[str]) -> None:
+        with self._lock:
+            for name in ([table] if table else [TEMPLATES_TABLE, MENUS_TABLE]):
+                self._snapshots.pop(name, None)
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+    def _fresh(self, table: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            snapshot = self._snapshots.get(table)
+        if snapshot is not None and time.monotonic() - snapshot[0] < self.ttl_seconds:
+            return snapshot[1]
+        return None
+
+    def _rows(self, table: str) -> List[Dict[str, Any]]:
+        rows = self._fresh(table)
+        if rows is not None:
+            return rows
+
+        # One select per table at a time; waiting callers reuse its result
+        with self._load_lock:
+            rows = self._fresh(table)
+            if rows is not None:
+                return rows
+            with self._lock:
+                generation = self._generations.get(table, 0)
+            debug_print(f"Loading {table} into template registry")
+            rows = self.db.table(table).select('*').execute().data or []
+            with self._lock:
+                self.loads += 1
+                # Skip caching if the table was invalidated while loading
+                if self._generations.get(table, 0) == generation:
+                    self._snapshots[table] = (time.monotonic(), rows)
+            return rows
+
+_registries: Dict[int, TemplateRegistry] = {}
+_registries_lock = threading.Lock()
+
+def get_template_registry(db) -> TemplateRegistry:
+    """Get the process-wide registry for a database client"""
+    with _registries_lock:
+        registry = _registries.get(id(db))
+        if registry is None:
+            registry = TemplateRegistry(db, event_bus=get_event_bus())
+            _registries[id(db)] = registry
+        return registry
@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Callable, List, Optional, Any
+
+class DeadlineExceeded(Exception):
+    """Raised when concurrent tasks do not finish before their shared deadline"""
+
+_executor: Optional[ThreadPoolExecutor] = None
+_render_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Get the process-wide thread pool used for fetch and decode stages"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='menu-io')
+    return _executor
+
+def get_render_executor() -> ThreadPoolExecutor:
+    """Get the process-wide pool for CPU-bound merge/encode work.
+
+    One thread per core: OpenCV releases the GIL while resizing, decoding
+    and encoding, so renders run on all cores while sharing the decoded
+    header and the in-process caches.
+    """
+    global _render_executor
+    if _render_executor is None:
+        with _executor_lock:
+            if _render_executor is None:
+                _render_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2,
+                                                      thread_name_prefix='menu-render')
+    return _render_executor
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until a time.monotonic() deadline (None means no deadline)"""
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+def run_with_deadline(tasks: List[Callable[[], Any]], deadline: Optional[float] = None) -> List[Any]:
+    """Run tasks concurrently and return their results in order.
+
+    All tasks share one deadline (a time.monotonic() value). If any task
+    fails, or the deadline passes, tasks that have not started are
+    cancelled and the error is raised straight away; running tasks are left
+    to finish on their own timeouts.
+    """
+    if len(tasks) == 1:
+        return [tasks[0]()]
+
+    executor = get_io_executor()
+    futures = [executor.submit(task) for task in tasks]
+    done, pending = wait(futures, timeout=remaining(deadline), return_when=FIRST_EXCEPTION)
+
+    failed = next((f for f in done if f.exception() is not None), None)
+    if failed is not None or pending:
+        for future in pending:
+            future.cancel()
+        if failed is not None:
+            raise failed.exception()
+        raise DeadlineExceeded(f"{len(pending)} of {len(tasks)} tasks missed the deadline")
+
+    return [future.result() for future in futures]
@@ -0,0 +1,148 @@
+import os
+import json
+import uuid
+import threading
+from typing import Callable, Optional, Dict, Any, List
+
+from app.utils.debug import debug_print
+
+EVENT_CHANNEL = 'menu_events'
+
+# Published by the dashboard when sending is switched on/off (service_state
+# or debug_mode) and after a forced send
+SERVICE_STATE_CHANGED = 'service_state_changed'
+FORCE_SEND = 'force_send'
+
+# Seconds between reconnect attempts when the Redis subscription drops
+RECONNECT_SECONDS = 5
+
+Handler = Callable[[Optional[Dict[str, Any]]], None]
+
+class EventBus:
+    """Process-to-process change notifications over Redis pub/sub.
+
+    Handlers for an event run in the publishing process straight away and
+    in every other subscribed process when the message arrives. Pub/sub
+    does not queue messages for a disconnected subscriber, so after every
+    (re)connect each handler is also called once with data=None. Handlers
+    must therefore be idempotent (invalidations, wake-ups). Without a
+    Redis client that supports pub/sub, events stay within the process.
+    """
+
+    def __init__(self, redis_client=None, channel: str = EVENT_CHANNEL):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._listener_pid: Optional[int] = None
+        self._stopped = threading.Event()
+
+    @property
+    def distributed(self) -> bool:
+        """Whether events reach other processes"""
+        return self.redis_client is not None and hasattr(self.redis_client, 'pubsub')
+
+    def subscribe(self, event: str, handler: Handler) -> None:
+        """Call handler(data) whenever event is published by any process"""
+        with self._lock:
+            self._handlers.setdefault(event, []).append(handler)
+        self._ensure_listener()
+
+    def unsubscribe(self, event: str, handler: Handler) -> None:
+        """Remove a handler registered with subscribe"""
+        with self._lock:
+            handlers = self._handlers.get(event, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Notify local handlers, then broadcast to the other processes"""
+        self._dispatch(event, data)
+        if not self.distributed:
+            return
+        try:
+            message = json.dumps({'event': event, 'data': data, 'origin': self.origin}, default=str)
+            self.redis_client.publish(self.channel, message)
+        except Exception as e:
+            debug_print(f"⚠️ Event publish failed for {event}: {str(e)}")
+
+    def stop(self) -> None:
+        """Stop the background listener"""
+        self._stopped.set()
+
+    def _ensure_listener(self) -> None:
+        if not self.distributed:
+            return
+        with self._lock:
+            # Threads do not survive a fork, so each process starts its own
+            if self._listener is not None and self._listener.is_alive() and self._listener_pid == os.getpid():
+                return
+            self._stopped.clear()
+            self._listener_pid = os.getpid()
+            self._listener = threading.Thread(target=self._listen, name='menu-events', daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything published while we were not subscribed is lost
+                self._dispatch_all()
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self._handle_message(message.get('data'))
+            except Exception as e:
+                debug_print(f"⚠️ Event subscription lost: {str(e)}")
+                self._stopped.wait(RECONNECT_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _handle_message(self, raw) -> None:
+        try:
+            message = json.loads(raw.decode() if isinstance(raw, bytes) else raw)
+        except (TypeError, ValueError):
+            debug_print(f"⚠️ Ignoring malformed event: {raw!r}")
+            return
+        if message.get('origin') == self.origin:
+            return  # Already handled when published
+        self._dispatch(message.get('event'), message.get('data'))
+
+    def _dispatch_all(self) -> None:
+        with self._lock:
+            events = list(self._handlers)
+        for event in events:
+            self._dispatch(event, None)
+
+    def _dispatch(self, event: str, data: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(event, []))
+        for handler in handlers:
+            try:
+                handler(data)
+            except Exception as e:
+                debug_print(f"⚠️ Event handler failed for {event}: {str(e)}")
+
+_event_bus: Optional[EventBus] = None
+_event_bus_lock = threading.Lock()
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus"""
+    global _event_bus
+    if _event_bus is None:
+        with _event_bus_lock:
+            if _event_bus is None:
+                try:
+                    from config import redis_client
+                except Exception:
+                    redis_client = None
+                _event_bus = EventBus(redis_client=redis_client)
+    return _event_bus
@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils.debug import debug_print
+from app.utils.concurrency import run_with_deadline, remaining, DeadlineExceeded
+
+# (connect, read) timeouts in seconds for storage downloads
+DEFAULT_TIMEOUT = (5, 30)
+
+class DownloadError(Exception):
+    """Raised when a storage download fails"""
+
+class DownloadClient:
+    """Shared HTTP client for public storage downloads.
+
+    Keeps pooled keep-alive connections per host and revalidates repeat
+    downloads with ETag / Last-Modified, so an unchanged template costs a
+    304 on a warm connection instead of a full transfer on a new one.
+    """
+
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 4,
+                 timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+                 max_cached_bytes: int = 64 * 1024 * 1024):
+        self.timeout = timeout
+        self.max_cached_bytes = max_cached_bytes
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,  # Cap concurrent connections per host
+            max_retries=Retry(total=2, backoff_factor=0.2,
+                              status_forcelist=(502, 503, 504),
+                              allowed_methods=frozenset(['GET']))
+        )
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self._validated: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            'requests': 0,
+            'not_modified': 0,
+            'errors': 0
+        }
+
+    def get(self, url: str, timeout: Optional[Union[float, Tuple[float, float]]] = None) -> bytes:
+        """Download a URL and return its body.
+
+        Raises DownloadError on network errors or non-200 responses.
+        """
+        headers = {}
+        with self._lock:
+            cached = self._validated.get(url)
+            if cached is not None:
+                self._validated.move_to_end(url)
+                if cached.get('etag'):
+                    headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            self._count('errors')
+            raise DownloadError(f"Download failed for {url}: {str(e)}") from e
+
+        self._count('requests')
+
+        if response.status_code == 304 and cached is not None:
+            self._count('not_modified')
+            debug_print(f"Not modified, reusing cached body: {url}")
+            return cached['content']
+
+        if response.status_code != 200:
+            self._count('errors')
+            raise DownloadError(f"Download failed for {url}: HTTP {response.status_code}")
+
+        content = response.content
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self._remember(url, {
+                'etag': etag,
+                'last_modified': last_modified,
+                'content': content
+            })
+        return content
+
+    def cached(self, url: str) -> Optional[bytes]:
+        """The last body downloaded for a URL, without a request (None if not kept)"""
+        with self._lock:
+            entry = self._validated.get(url)
+            return entry['content'] if entry is not None else None
+
+    def get_many(self, urls: List[str], deadline: Optional[float] = None) -> List[bytes]:
+        """Download several URLs concurrently under one shared deadline.
+
+        The deadline is a time.monotonic() value. If any download fails the
+        remaining ones are cancelled and the error is raised.
+        """
+        def fetch(url):
+            return self.get(url, timeout=self._timeout_before(deadline))
+
+        return run_with_deadline([lambda url=url: fetch(url) for url in urls], deadline)
+
+    def _timeout_before(self, deadline: Optional[float]):
+        """Clamp the configured timeouts to the time left before a deadline"""
+        left = remaining(deadline)
+        if left is None:
+            return self.timeout
+        if left <= 0:
+            raise DeadlineExceeded("Download deadline already passed")
+        if isinstance(self.timeout, tuple):
+            return tuple(min(t, left) for t in self.timeout)
+        return min(self.timeout, left)
+
+    def stats(self) -> Dict[str, int]:
+        """Return request counters and connection reuse figures"""
+        opened = 0
+        pooled_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            pooled_requests += pool.num_requests
+        with self._lock:
+            stats = dict(self._counters)
+            stats['cached_urls'] = len(self._validated)
+            stats['cached_bytes'] = self._cached_bytes
+        stats['connections_opened'] = opened
+        stats['connections_reused'] = max(pooled_requests - opened, 0)
+        return stats
+
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.session.close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _remember(self, url: str, entry: Dict[str, Any]) -> None:
+        size = len(entry['content'])
+        if size > self.max_cached_bytes:
+            return
+        with self._lock:
+            previous = self._validated.pop(url, None)
+            if previous is not None:
+                self._cached_bytes -= len(previous['content'])
+            self._validated[url] = entry
+            self._cached_bytes += size
+            while self._cached_bytes > self.max_cached_bytes and self._validated:
+                _, evicted = self._validated.popitem(last=False)
+                self._cached_bytes -= len(evicted['content'])
+
+_download_client: Optional[DownloadClient] = None
+_client_lock = threading.Lock()
+
+def get_download_client() -> DownloadClient:
+    """Get the process-wide download client"""
+    global _download_client
+    if _download_client is None:
+        with _client_lock:
+            if _download_client is None:
+                _download_client = DownloadClient()
+    return _download_client
@@ -0,0 +1,136 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Dict, Any
+
+from app.utils.debug import debug_print
+
+class ImagePoolBusy(Exception):
+    """Raised when the image pool already has its maximum number of jobs"""
+
+    def __init__(self, message: str, retry_after: int = 2):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ImagePool:
+    """Bounded process pool for CPU-heavy image work.
+
+    Decoding, resizing and encoding run in separate processes, so a request
+    thread only waits on the result and the web worker keeps serving other
+    requests. At most max_workers + max_queued jobs are accepted at once;
+    anything beyond that is rejected straight away with ImagePoolBusy
+    instead of queueing behind the running renders.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queued: int = 1, timeout: float = 60):
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queued
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {
+            'submitted': 0,
+            'rejected': 0,
+            'completed': 0,
+            'failed': 0
+        }
+
+    def submit(self, fn: Callable, *args):
+        """Queue fn(*args) in a worker process and return its future.
+
+        fn must be a picklable module-level function. Raises ImagePoolBusy
+        without waiting if the pool is saturated.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counters['rejected'] += 1
+                raise ImagePoolBusy(f"Image pool busy ({self._pending} jobs in progress)")
+            self._pending += 1
+            self._counters['submitted'] += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for this and later jobs
+            self._reset_executor()
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except Exception:
+                self._release(failed=True)
+                raise
+        except Exception:
+            self._release(failed=True)
+            raise
+
+        future.add_done_callback(lambda f: self._release(failed=f.cancelled() or f.exception() is not None))
+        return future
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """Run fn(*args) in the pool and wait for its result"""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"Image job did not finish within {timeout or self.timeout}s")
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and job counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pending'] = self._pending
+        stats['max_pending'] = self.max_pending
+        stats['workers'] = self.max_workers
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers only import the job's module, not the app
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                debug_print(f"Started image pool with {self.max_workers} worker(s)")
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        debug_print("⚠️ Image pool broken, restarting workers")
+        self.shutdown()
+
+    def _release(self, failed: bool = False) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._counters['failed' if failed else 'completed'] += 1
+
+_image_pool: Optional[ImagePool] = None
+_pool_lock = threading.Lock()
+
+def get_image_pool() -> ImagePool:
+    """Get the process-wide image pool.
+
+    Sized by IMAGE_POOL_WORKERS (default 1) and IMAGE_POOL_QUEUE (default 1)
+    per web worker process. Worker processes start on first use.
+    """
+    global _image_pool
+    if _image_pool is None:
+        with _pool_lock:
+            if _image_pool is None:
+                _image_pool = ImagePool(
+                    max_workers=int(os.getenv('IMAGE_POOL_WORKERS', '1')),
+                    max_queued=int(os.getenv('IMAGE_POOL_QUEUE', '1')),
+                    timeout=float(os.getenv('IMAGE_POOL_TIMEOUT', '60'))
+                )
+    return _image_pool
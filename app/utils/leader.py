@@ -0,0 +1,178 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional, List
+
+from app.utils.debug import debug_print
+
+# A leader that stops renewing loses the lease after this long
+LEASE_TTL_SECONDS = 9
+
+# How often the leader renews and standbys try to take over
+RENEW_INTERVAL_SECONDS = 3
+
+# Lease shared by every worker entry point that schedules menu sends
+SCHEDULER_LEASE = 'menu-scheduler'
+
+# Compare-and-set scripts so a replica only touches a lock it still owns
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def _owner_token() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class RedisLock:
+    """A Redis key held by one replica until released or its TTL runs out.
+
+    acquire() is SET NX EX; renew() and release() only act while the key
+    still holds this lock's token. Without a Redis client the lock is
+    always granted, since there is no other replica to coordinate with.
+    """
+
+    def __init__(self, redis_client, key: str, ttl: int):
+        self.redis_client = redis_client
+        self.key = key
+        self.ttl = ttl
+        self.token = _owner_token()
+
+    def acquire(self) -> bool:
+        if self.redis_client is None:
+            return True
+        return bool(self.redis_client.set(self.key, self.token, ex=self.ttl, nx=True))
+
+    def renew(self) -> bool:
+        if self.redis_client is None:
+            return True
+        if hasattr(self.redis_client, 'eval'):
+            return bool(self.redis_client.eval(RENEW_SCRIPT, 1, self.key, self.token, self.ttl))
+        # Development MockRedis is single-process, so check-then-act is safe there
+        return self._owned() and bool(self.redis_client.expire(self.key, self.ttl))
+
+    def release(self) -> bool:
+        if self.redis_client is None:
+            return True
+        if hasattr(self.redis_client, 'eval'):
+            return bool(self.redis_client.eval(RELEASE_SCRIPT, 1, self.key, self.token))
+        return self._owned() and bool(self.redis_client.delete(self.key))
+
+    def _owned(self) -> bool:
+        value = self.redis_client.get(self.key)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value == self.token
+
+class LeaderLease:
+    """Leader election between worker replicas with a renewed Redis lease.
+
+    A background thread tries to take the lease every renew_interval
+    seconds and, once held, keeps extending it. If the leader dies, its
+    lease expires after ttl seconds and a standby takes over on its next
+    attempt. A leader stops reporting is_leader as soon as its last
+    successful renewal is ttl seconds old, so it steps down before anyone
+    else can be elected even when Redis is unreachable.
+    """
+
+    def __init__(self, name: str, redis_client=None, ttl: int = LEASE_TTL_SECONDS,
+                 renew_interval: float = RENEW_INTERVAL_SECONDS):
+        self.lock = RedisLock(redis_client, f"leader:{name}", ttl)
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self._valid_until = 0.0
+        self._leader = False
+        self._callbacks: List[Callable[[bool], None]] = []
+        self._state_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.elections = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader and time.monotonic() < self._valid_until
+
+    def on_change(self, callback: Callable[[bool], None]) -> None:
+        """Call callback(is_leader) whenever this replica gains or loses the lease"""
+        self._callbacks.append(callback)
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease once; returns whether this replica leads"""
+        started = time.monotonic()
+        try:
+            held = self.lock.renew() if self._leader else self.lock.acquire()
+        except Exception as e:
+            debug_print(f"⚠️ Leader lease {self.name} check failed: {str(e)}")
+            held = self.is_leader  # Keep leading until the lease would have run out
+        else:
+            if held:
+                self._valid_until = started + self.ttl
+        self._set_leader(held)
+        return held
+
+    def guard(self, job: Callable):
+        """Wrap a scheduler job so it only runs on the leader (others wait to be woken)"""
+        def run():
+            if not self.is_leader:
+                return None
+            return job()
+        return run
+
+    def start(self) -> 'LeaderLease':
+        """Start campaigning in a background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self.try_acquire()
+            self._thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop renewing and hand the lease over straight away"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(self.renew_interval + 1)
+        if self._leader:
+            try:
+                self.lock.release()
+            except Exception as e:
+                debug_print(f"⚠️ Could not release leader lease {self.name}: {str(e)}")
+        self._set_leader(False)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.renew_interval):
+            self.try_acquire()
+
+    def _set_leader(self, leader: bool) -> None:
+        with self._state_lock:
+            changed = leader != self._leader
+            self._leader = leader
+        if not changed:
+            return
+        if leader:
+            self.elections += 1
+        debug_print(f"{'👑 Elected' if leader else '⚠️ Lost'} leader lease {self.name}")
+        for callback in list(self._callbacks):
+            try:
+                callback(leader)
+            except Exception as e:
+                debug_print(f"❌ Leader callback failed: {str(e)}")
+
+def get_redis_client():
+    """The shared Redis client, or None when it is unavailable"""
+    try:
+        from config import redis_client
+        return redis_client
+    except Exception:
+        return None
@@ -0,0 +1,231 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from app.utils.debug import debug_print
+
+REDIS_KEY_PREFIX = 'merge_cache:'
+REDIS_URL_PREFIX = 'merge_cache_url:'
+REDIS_TTL_SECONDS = 7 * 24 * 3600
+
+def content_digest(data: bytes) -> str:
+    """Return the SHA-256 hex digest of raw image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def make_merge_key(header_digest: str, template_digest: str,
+                   header_proportion: float, output_format: str, scale: int = 1,
+                   quality: Optional[int] = None) -> str:
+    """Build the cache key for one merge render.
+
+    The key only depends on what goes into the render, so the same header,
+    template, proportion, format, scale and quality always map to the same
+    entry.
+    """
+    raw = f"{header_digest}:{template_digest}:{header_proportion:.6f}:{output_format.lower()}"
+    # Full-size, default-quality keys stay as they were
+    if scale != 1:
+        raw += f":1/{scale}"
+    if quality is not None:
+        raw += f":q{quality}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+class MergeCache:
+    """Bounded LRU cache of merged menu renders.
+
+    Each entry holds the public storage URL of the render and, when
+    available, the encoded image bytes. URLs are also mirrored to Redis so
+    the web and worker processes share one render per template version.
+    """
+
+    def __init__(self, max_entries: int = 16, redis_client=None):
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a key, or None on a miss.
+
+        With Redis configured, a local entry only counts while its Redis
+        entry exists, so renders evicted from storage by any process stop
+        being served here too.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and (self.redis_client is None or not entry.get('url')):
+            return self._hit(key, entry)
+
+        url = self._redis_get(key)
+        if entry is not None:
+            if url == entry['url']:
+                return self._hit(key, entry)
+            with self._lock:
+                self._entries.pop(key, None)
+
+        if url:
+            entry = {'url': url, 'data': None}
+            self._store(key, entry)
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, url: Optional[str], data: Optional[bytes] = None) -> None:
+        """Store a render under its key"""
+        self._store(key, {'url': url, 'data': data})
+        if url:
+            self._redis_set(key, url)
+
+    def forget_url(self, url: str) -> None:
+        """Drop every entry whose render lives at url (e.g. after eviction)"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry.get('url') == url]:
+                del self._entries[key]
+        if self.redis_client is None:
+            return
+        try:
+            index_key = REDIS_URL_PREFIX + content_digest(url.encode())
+            key = self.redis_client.get(index_key)
+            if key:
+                key = key.decode() if isinstance(key, bytes) else key
+                self.redis_client.delete(REDIS_KEY_PREFIX + key)
+            self.redis_client.delete(index_key)
+        except Exception as e:
+            debug_print(f"⚠️ Merge cache Redis forget failed: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop all local entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _hit(self, key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _redis_get(self, key: str) -> Optional[str]:
+        if self.redis_client is None:
+            return None
+        try:
+            value = self.redis_client.get(REDIS_KEY_PREFIX + key)
+            if not value:
+                return None
+            return value.decode() if isinstance(value, bytes) else value
+        except Exception as e:
+            debug_print(f"⚠️ Merge cache Redis lookup failed: {str(e)}")
+            return None
+
+    def _redis_set(self, key: str, url: str) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            index_key = REDIS_URL_PREFIX + content_digest(url.encode())
+            for name, value in ((REDIS_KEY_PREFIX + key, url), (index_key, key)):
+                self.redis_client.set(name, value)
+                if hasattr(self.redis_client, 'expire'):
+                    self.redis_client.expire(name, REDIS_TTL_SECONDS)
+        except Exception as e:
+            debug_print(f"⚠️ Merge cache Redis store failed: {str(e)}")
+
+class HeaderBandCache:
+    """Bounded LRU cache of pre-rendered header bands.
+
+    Keyed by (header digest, template height, template width, header
+    proportion, decode scale). Each entry is the full-width band array, so applying the
+    header to a template of that size is one block copy. Entries are only
+    kept in process: a band is a few megabytes of raw pixels.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(header_digest: str, template_size: Tuple[int, int], header_proportion: float,
+                 scale: int = 1) -> Tuple:
+        """Build the key for a header version on a full-size (height, width) template"""
+        height, width = template_size
+        return (header_digest, int(height), int(width), round(header_proportion, 6), scale)
+
+    def get(self, key: Tuple):
+        """Return the cached band for a key, or None on a miss"""
+        with self._lock:
+            band = self._entries.get(key)
+            if band is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return band
+
+    def put(self, key: Tuple, band) -> None:
+        """Store a band, evicting the least recently used entries"""
+        band.setflags(write=False)  # Shared between merges, never modified
+        with self._lock:
+            self._entries[key] = band
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters, size and memory held"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(band.nbytes for band in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+_merge_cache: Optional[MergeCache] = None
+_header_band_cache: Optional[HeaderBandCache] = None
+
+def get_merge_cache() -> MergeCache:
+    """Get the process-wide merge cache instance"""
+    global _merge_cache
+    if _merge_cache is None:
+        try:
+            from config import redis_client
+        except Exception:
+            redis_client = None
+        _merge_cache = MergeCache(redis_client=redis_client)
+    return _merge_cache
+
+def get_header_band_cache() -> HeaderBandCache:
+    """Get the process-wide header band cache instance"""
+    global _header_band_cache
+    if _header_band_cache is None:
+        _header_band_cache = HeaderBandCache()
+    return _header_band_cache
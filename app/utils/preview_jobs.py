@@ -0,0 +1,158 @@
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Dict, Any, Tuple
+
+from app.utils.debug import debug_print
+from app.utils.image_pool import ImagePoolBusy
+
+REDIS_JOB_PREFIX = 'preview_job:'
+REDIS_INFLIGHT_PREFIX = 'preview_inflight:'
+JOB_TTL_SECONDS = 600
+INFLIGHT_TTL_SECONDS = 120
+
+# How often a job waits for a free image pool slot before giving up
+BUSY_RETRIES = 3
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+class PreviewJobs:
+    """Background preview renders with pollable status.
+
+    Jobs run on a small thread pool; their state is kept locally and
+    mirrored to Redis so whichever web worker receives the status poll can
+    answer it. Requests with the same key (template and header versions)
+    share the job that is already in flight instead of rendering again.
+    """
+
+    def __init__(self, redis_client=None, max_workers: int = 2, max_jobs: int = 100):
+        self.redis_client = redis_client
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='preview-job')
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Build the coalescing key for a preview from its input versions"""
+        return hashlib.sha256(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+    def submit(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[str, bool]:
+        """Start fn in the background unless an identical job is in flight.
+
+        Returns:
+            (job id, True if an existing job was reused)
+        """
+        with self._lock:
+            job_id = self._inflight.get(key)
+            if job_id and self._jobs.get(job_id, {}).get('status') in ACTIVE_STATUSES:
+                return job_id, True
+
+        job_id = uuid.uuid4().hex
+        winner = self._claim_inflight(key, job_id)
+        if winner != job_id:
+            job = self.get(winner)
+            if job and job.get('status') in ACTIVE_STATUSES:
+                return winner, True
+            # The claimed job is gone or finished; take over the key
+            self._redis_call('set', REDIS_INFLIGHT_PREFIX + key, job_id, ex=INFLIGHT_TTL_SECONDS)
+
+        with self._lock:
+            self._inflight[key] = job_id
+        self._update(job_id, status='pending', created_at=time.time())
+        self._executor.submit(self._run, job_id, key, fn)
+        return job_id, False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's state, from this process or from Redis"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        value = self._redis_call('get', REDIS_JOB_PREFIX + job_id)
+        if not value:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    def _run(self, job_id: str, key: str, fn: Callable[[], Dict[str, Any]]) -> None:
+        self._update(job_id, status='running')
+        try:
+            for attempt in range(BUSY_RETRIES + 1):
+                try:
+                    result = fn()
+                    break
+                except ImagePoolBusy as e:
+                    if attempt == BUSY_RETRIES:
+                        raise
+                    time.sleep(e.retry_after)
+            self._update(job_id, status='done', result=result, finished_at=time.time())
+        except ImagePoolBusy as e:
+            self._update(job_id, status='error', error=str(e), error_type='busy',
+                         retry_after=e.retry_after, finished_at=time.time())
+        except Exception as e:
+            debug_print(f"❌ Preview job {job_id} failed: {str(e)}")
+            self._update(job_id, status='error', error=str(e), error_type='system_error',
+                         finished_at=time.time())
+        finally:
+            with self._lock:
+                if self._inflight.get(key) == job_id:
+                    del self._inflight[key]
+            if self._redis_value(REDIS_INFLIGHT_PREFIX + key) == job_id:
+                self._redis_call('delete', REDIS_INFLIGHT_PREFIX + key)
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {'id': job_id})
+            job.update(fields)
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            snapshot = dict(job)
+        self._redis_call('set', REDIS_JOB_PREFIX + job_id, json.dumps(snapshot, default=str), ex=JOB_TTL_SECONDS)
+
+    def _claim_inflight(self, key: str, job_id: str) -> str:
+        """Register job_id as the in-flight job for key, or return the current one"""
+        if self.redis_client is None:
+            return job_id
+        if self._redis_call('set', REDIS_INFLIGHT_PREFIX + key, job_id, ex=INFLIGHT_TTL_SECONDS, nx=True):
+            return job_id
+        return self._redis_value(REDIS_INFLIGHT_PREFIX + key) or job_id
+
+    def _redis_value(self, key: str) -> Optional[str]:
+        value = self._redis_call('get', key)
+        if not value:
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _redis_call(self, method: str, *args, **kwargs):
+        if self.redis_client is None:
+            return None
+        try:
+            return getattr(self.redis_client, method)(*args, **kwargs)
+        except Exception as e:
+            debug_print(f"⚠️ Preview job Redis {method} failed: {str(e)}")
+            return None
+
+_preview_jobs: Optional[PreviewJobs] = None
+_jobs_lock = threading.Lock()
+
+def get_preview_jobs() -> PreviewJobs:
+    """Get the process-wide preview job runner"""
+    global _preview_jobs
+    if _preview_jobs is None:
+        with _jobs_lock:
+            if _preview_jobs is None:
+                try:
+                    from config import redis_client
+                except Exception:
+                    redis_client = None
+                _preview_jobs = PreviewJobs(redis_client=redis_client)
+    return _preview_jobs
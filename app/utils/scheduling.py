@@ -0,0 +1,140 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional, Dict, Iterable, Union
+
+from app.utils.debug import debug_print
+
+# Longest sleep when other processes can wake us over Redis pub/sub. Only
+# a backstop for missed events and wall-clock changes.
+MAX_SLEEP_SECONDS = 3600
+
+# Longest sleep when events cannot reach this process, so changes made
+# from the dashboard are still noticed within a minute
+FALLBACK_SLEEP_SECONDS = 60
+
+# Delay before retrying a job that raised
+ERROR_RETRY_SECONDS = 60
+
+# A job returns when it next wants to run: a datetime, a delay in seconds,
+# or None to wait for an event (or the maximum sleep)
+NextRun = Union[datetime, float, int, None]
+
+class WakeScheduler:
+    """Run jobs when they are due and sleep until the next one.
+
+    Jobs are kept in a priority queue keyed by their next due time. The
+    loop sleeps until the earliest one, runs everything that is due and
+    reschedules each job from its return value. Events published on the
+    event bus (settings saved, service toggled, force send...) make the
+    jobs that listen for them due immediately and wake the loop.
+    """
+
+    def __init__(self, event_bus=None, max_sleep: Optional[float] = None):
+        self.event_bus = event_bus
+        if max_sleep is None:
+            distributed = event_bus is not None and event_bus.distributed
+            max_sleep = MAX_SLEEP_SECONDS if distributed else FALLBACK_SLEEP_SECONDS
+        self.max_sleep = max_sleep
+        self._jobs: Dict[str, Callable[[], NextRun]] = {}
+        self._queue = []  # (due monotonic time, sequence, job name)
+        self._due: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self.runs = 0
+        self.wakeups = 0
+
+    def add(self, name: str, job: Callable[[], NextRun], wake_on: Iterable[str] = (),
+            first_run: NextRun = 0, lease=None) -> None:
+        """Register a job, due at first_run (now by default).
+
+        With a LeaderLease the job only runs on the replica holding it, and
+        is woken as soon as this replica is elected.
+        """
+        if lease is not None:
+            job = lease.guard(job)
+            lease.on_change(lambda leader, name=name: leader and self.wake(name))
+        with self._lock:
+            self._jobs[name] = job
+        self._schedule(name, self._delay(first_run))
+        for event in wake_on:
+            if self.event_bus is not None:
+                self.event_bus.subscribe(event, lambda data, name=name: self.wake(name))
+
+    def wake(self, name: Optional[str] = None) -> None:
+        """Make one job (or every job) due now"""
+        with self._lock:
+            names = [name] if name else list(self._jobs)
+        for job_name in names:
+            self._schedule(job_name, 0)
+
+    def next_due(self) -> Optional[float]:
+        """Seconds until the earliest job is due"""
+        with self._lock:
+            self._discard_stale()
+            if not self._queue:
+                return None
+            return max(self._queue[0][0] - time.monotonic(), 0.0)
+
+    def run_pending(self) -> int:
+        """Run every job that is due; returns how many ran"""
+        ran = 0
+        while True:
+            with self._lock:
+                self._discard_stale()
+                if not self._queue or self._queue[0][0] > time.monotonic():
+                    return ran
+                _, _, name = heapq.heappop(self._queue)
+                self._due.pop(name, None)
+                job = self._jobs[name]
+            try:
+                delay = self._delay(job())
+            except Exception as e:
+                debug_print(f"❌ Scheduled job {name} failed: {str(e)}")
+                delay = ERROR_RETRY_SECONDS
+            self.runs += 1
+            ran += 1
+            self._schedule(name, delay)
+
+    def run(self) -> None:
+        """Run jobs until stop() is called"""
+        while not self._stopped.is_set():
+            self.run_pending()
+            self._wakeup.clear()
+            # Re-check after clearing so a wake between the two is not lost
+            sleep_for = self.next_due()
+            sleep_for = self.max_sleep if sleep_for is None else min(sleep_for, self.max_sleep)
+            if self._wakeup.wait(sleep_for):
+                self.wakeups += 1
+
+    def stop(self) -> None:
+        """Stop run() after the current job"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _delay(self, next_run: NextRun) -> float:
+        if next_run is None:
+            return self.max_sleep
+        if isinstance(next_run, datetime):
+            return max((next_run - datetime.now()).total_seconds(), 0.0)
+        return max(float(next_run), 0.0)
+
+    def _schedule(self, name: str, delay: float) -> None:
+        due = time.monotonic() + min(delay, self.max_sleep)
+        with self._lock:
+            current = self._due.get(name)
+            # Keep the earlier due time if the job is already queued
+            if current is not None and current <= due:
+                return
+            self._due[name] = due
+            heapq.heappush(self._queue, (due, next(self._sequence), name))
+        self._wakeup.set()
+
+    def _discard_stale(self) -> None:
+        # Entries replaced by an earlier due time stay in the heap until they surface
+        while self._queue and self._due.get(self._queue[0][2]) != self._queue[0][0]:
+            heapq.heappop(self._queue)
@@ -0,0 +1,48 @@
+from typing import Optional, Dict, Any, List
+
+# Page size for storage list calls and batch size for remove calls
+LIST_PAGE_SIZE = 1000
+REMOVE_BATCH_SIZE = 100
+
+def list_folder(bucket, folder: str, search: Optional[str] = None) -> List[Dict[str, Any]]:
+    """List the objects directly inside one bucket folder.
+
+    Pages through the folder and, when search is given, lets storage filter
+    names by that prefix, so the cost follows the folder, not the bucket.
+    Sub-folder entries (no id) are skipped.
+    """
+    objects = []
+    offset = 0
+    while True:
+        options = {
+            'limit': LIST_PAGE_SIZE,
+            'offset': offset,
+            'sortBy': {'column': 'name', 'order': 'asc'}
+        }
+        if search:
+            options['search'] = search
+        page = bucket.list(folder, options) or []
+        objects.extend(obj for obj in page if obj.get('id'))
+        if len(page) < LIST_PAGE_SIZE:
+            return objects
+        offset += LIST_PAGE_SIZE
+
+def remove_paths(bucket, paths: List[str]) -> List[Dict[str, Any]]:
+    """Remove objects in batched calls and report the outcome per path.
+
+    Each report entry has 'path' and 'status': 'deleted', 'missing' (storage
+    did not have it) or 'failed' (with 'error').
+    """
+    results = []
+    for start in range(0, len(paths), REMOVE_BATCH_SIZE):
+        batch = paths[start:start + REMOVE_BATCH_SIZE]
+        try:
+            removed = bucket.remove(batch) or []
+        except Exception as e:
+            results.extend({'path': path, 'status': 'failed', 'error': str(e)} for path in batch)
+            continue
+        removed_names = {obj.get('name') for obj in removed if isinstance(obj, dict)}
+        for path in batch:
+            status = 'deleted' if path in removed_names else 'missing'
+            results.append({'path': path, 'status': status})
+    return results
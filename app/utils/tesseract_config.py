@@ -4,9 +4,12 @@ import platform
 import shutil
 from typing import Optional
 import pytesseract
-from PIL import Image, ImageEnhance
+from PIL import Image
 import logging
 
+from menu_ocr import preprocess_for_ocr
+from ocr_cache import cached_ocr
+
 logger = logging.getLogger(__name__)
 
 def get_tesseract_path() -> Optional[str]:
@@ -92,25 +95,8 @@ def configure_tesseract() -> bool:
 def optimize_image_for_ocr(image: Image.Image) -> Image.Image:
     """Optimize image for better OCR results"""
     try:
-        # Convert to RGB if needed
-        if image.mode not in ('L', 'RGB'):
-            image = image.convert('RGB')
-        
-        # Resize if too large (max dimension 2400px)
-        max_dimension = 2400
-        if max(image.size) > max_dimension:
-            ratio = max_dimension / max(image.size)
-            new_size = tuple(int(dim * ratio) for dim in image.size)
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Enhance image for OCR
-        image = ImageEnhance.Contrast(image).enhance(1.5)
-        image = ImageEnhance.Sharpness(image).enhance(1.5)
-        
-        # Convert to grayscale for OCR
-        image = image.convert('L')
-        
-        return image
+        # Downscale (max dimension 2400px), grayscale, contrast and sharpen in one pass
+        return preprocess_for_ocr(image)
         
     except Exception as e:
         logger.error(f"Failed to optimize image: {str(e)}")
@@ -125,8 +111,8 @@ def perform_ocr(image: Image.Image, config: Optional[str] = None) -> str:
         # Use custom OCR config for better results
         custom_config = config or '--psm 6 --oem 1'
         
-        # Perform OCR
-        text = pytesseract.image_to_string(optimized, config=custom_config)
+        # Perform OCR on a warm pooled engine, unless this page was read before
+        text = cached_ocr(optimized, config=custom_config)
         
         return text.strip()
         
@@ -0,0 +1,103 @@
+"""
+Benchmark header/template merging on the PNGs in menu_templates/.
+
+Each compositing mode runs in its own child process so the peak RSS
+figures do not bleed into each other. Every merge decodes the template,
+composites the header and encodes PNG bytes, as MenuService does.
+
+Usage:
+    python benchmarks/merge_benchmark.py [--iterations N] [--templates DIR]
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from menu_merge import decode_image, encode_image, merge_header
+
+MODES = {
+    'copy': False,      # Composite onto a copy of the template
+    'in_place': True,   # Write the header band into the template itself
+}
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_mode(mode: str, template_paths, iterations: int) -> dict:
+    """Merge the first PNG's header onto every template and collect figures"""
+    with open(template_paths[0], 'rb') as f:
+        source = decode_image(f.read())
+    templates = []
+    for path in template_paths:
+        with open(path, 'rb') as f:
+            templates.append(f.read())
+
+    rss_before = _peak_rss_mb()
+    merge_times = []
+    total_times = []
+    merge_peak = 0
+
+    for _ in range(iterations):
+        for data in templates:
+            started = time.perf_counter()
+            template = decode_image(data)
+
+            tracemalloc.start()
+            merge_started = time.perf_counter()
+            merged = merge_header(source, template, 0.20, in_place=MODES[mode])
+            merge_times.append(time.perf_counter() - merge_started)
+            merge_peak = max(merge_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            encode_image(merged, 'png')
+            total_times.append(time.perf_counter() - started)
+            del template, merged
+
+    return {
+        'mode': mode,
+        'merges': len(merge_times),
+        'merge_ms': 1000 * sum(merge_times) / len(merge_times),
+        'total_ms': 1000 * sum(total_times) / len(total_times),
+        'merge_alloc_mb': merge_peak / (1024 * 1024),
+        'peak_rss_mb': _peak_rss_mb(),
+        'rss_growth_mb': _peak_rss_mb() - rss_before,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--templates', default=os.path.join(ROOT, 'menu_templates'))
+    parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    template_paths = sorted(glob.glob(os.path.join(args.templates, '*.png')))
+    if not template_paths:
+        sys.exit(f"No PNG templates found in {args.templates}")
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, template_paths, args.iterations)))
+        return
+
+    print(f"{len(template_paths)} templates x {args.iterations} iterations\n")
+    print(f"{'mode':<10}{'merge ms':>10}{'total ms':>10}{'merge alloc MB':>16}{'peak RSS MB':>13}{'RSS growth MB':>15}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode,
+             '--iterations', str(args.iterations), '--templates', args.templates],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(output)
+        print(f"{r['mode']:<10}{r['merge_ms']:>10.2f}{r['total_ms']:>10.2f}"
+              f"{r['merge_alloc_mb']:>16.1f}{r['peak_rss_mb']:>13.1f}{r['rss_growth_mb']:>15.1f}")
+
+if __name__ == '__main__':
+    main()
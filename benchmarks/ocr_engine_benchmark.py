@@ -0,0 +1,81 @@
+"""
+Benchmark OCR calls per second: pytesseract subprocesses against the warm engine pool.
+
+Each sample menu's header band (the crop extract_dates_from_image sends
+to Tesseract) is OCR'd with --psm 6 --oem 1 by N threads at once, first
+through pytesseract, which starts a tesseract process per call, then
+through EnginePool. Both runs must return the same text.
+
+Usage:
+    python benchmarks/ocr_engine_benchmark.py [--calls N] [--threads T]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytesseract
+from PIL import Image
+
+from menu_ocr import crop_header
+from ocr_engine import EnginePool, SubprocessEngine, load_library
+
+PNG_PATTERN = os.path.join(ROOT, 'tests', 'test_menu_position_*.png')
+CONFIG = '--psm 6 --oem 1'
+
+def load_crops():
+    crops = []
+    for path in sorted(glob.glob(PNG_PATTERN)):
+        with Image.open(path) as img:
+            crops.append(crop_header(img.convert('RGB')).convert('L'))
+    return crops
+
+def run(engine, crops, calls: int, threads: int):
+    """(calls per second, text per crop) for calls OCR calls spread over threads"""
+    jobs = [crops[i % len(crops)] for i in range(calls)]
+    with ThreadPoolExecutor(threads) as executor:
+        started = time.perf_counter()
+        texts = list(executor.map(lambda crop: engine.image_to_string(crop, config=CONFIG), jobs))
+        elapsed = time.perf_counter() - started
+    return calls / elapsed, texts[:len(crops)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=60)
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        sys.exit(f"Tesseract is not available: {e}")
+    if load_library() is None:
+        sys.exit("libtesseract (4.1+) could not be loaded; set TESSERACT_LIBRARY to its path")
+
+    crops = load_crops()
+    if not crops:
+        sys.exit("No sample pages found")
+
+    pool = EnginePool(size=args.threads)
+    warm_started = time.perf_counter()
+    pool.warm(oem=1)
+    warm_ms = 1000 * (time.perf_counter() - warm_started)
+
+    print(f"{args.calls} calls on {len(crops)} header crops, {args.threads} threads\n")
+    subprocess_rate, subprocess_texts = run(SubprocessEngine(), crops, args.calls, args.threads)
+    pool_rate, pool_texts = run(pool, crops, args.calls, args.threads)
+
+    print(f"{'subprocess':<14}{subprocess_rate:>8.1f} calls/s")
+    print(f"{'engine pool':<14}{pool_rate:>8.1f} calls/s  ({pool_rate / subprocess_rate:.1f}x, "
+          f"{pool.stats()['engines']} engines warmed in {warm_ms:.0f} ms)")
+    same = sum(a == b for a, b in zip(subprocess_texts, pool_texts))
+    print(f"\nIdentical text on {same}/{len(crops)} crops")
+    pool.close()
+
+if __name__ == '__main__':
+    main()
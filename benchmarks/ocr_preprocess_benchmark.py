@@ -0,0 +1,90 @@
+"""
+Benchmark fused OCR preprocessing against the PIL ImageEnhance chain it replaced.
+
+Each sample page (tests/test_menu_position_*.png, plus a 1.5x upscale
+that exercises the 2400px downscale, and the sample PDFs when pdf2image
+can render them) is preprocessed both ways. The report shows time per
+page, how far the outputs differ in grey levels and, when Tesseract is
+installed, whether OCR of the header band finds the same dates.
+
+Usage:
+    python benchmarks/ocr_preprocess_benchmark.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pytesseract
+from PIL import Image, ImageEnhance
+
+from menu_ocr import crop_header, parse_day_dates, preprocess_for_ocr
+from ocr_roi_benchmark import load_pages
+
+def enhance_chain(img: Image.Image) -> Image.Image:
+    """The preprocessing optimize_image_for_ocr used to do"""
+    if img.mode not in ('L', 'RGB'):
+        img = img.convert('RGB')
+    if max(img.size) > 2400:
+        ratio = 2400 / max(img.size)
+        img = img.resize(tuple(int(dim * ratio) for dim in img.size), Image.Resampling.LANCZOS)
+    img = ImageEnhance.Contrast(img).enhance(1.5)
+    img = ImageEnhance.Sharpness(img).enhance(1.5)
+    return img.convert('L')
+
+def time_ms(run, iterations: int):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = run()
+    return 1000 * (time.perf_counter() - started) / iterations, result
+
+def ocr_dates(img: Image.Image):
+    return parse_day_dates(pytesseract.image_to_string(img, config='--psm 6 --oem 1'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--dpi', type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        pytesseract.get_tesseract_version()
+        have_tesseract = True
+    except Exception as e:
+        print(f"Tesseract is not available ({e}); comparing pixels only\n")
+        have_tesseract = False
+
+    pages = []
+    for label, page in load_pages(args.dpi):
+        pages.append((label, page))
+        pages.append((f"{label} x1.5", page.resize((page.size[0] * 3 // 2, page.size[1] * 3 // 2))))
+    if not pages:
+        sys.exit("No sample pages found")
+
+    print(f"{'page':<40}{'PIL ms':>8}{'fused ms':>10}{'speedup':>9}{'mean diff':>11}{'>32':>8}  dates")
+    chain_total = fused_total = 0.0
+    for label, page in pages:
+        chain_ms, chain = time_ms(lambda: enhance_chain(page), args.iterations)
+        fused_ms, fused = time_ms(lambda: preprocess_for_ocr(page), args.iterations)
+        chain_total += chain_ms
+        fused_total += fused_ms
+
+        diff = np.abs(np.asarray(chain, dtype=np.int16) - np.asarray(fused, dtype=np.int16))
+        agreement = '-'
+        if have_tesseract:
+            chain_dates = ocr_dates(enhance_chain(crop_header(page)))
+            fused_dates = ocr_dates(preprocess_for_ocr(crop_header(page)))
+            agreement = f"same ({len(fused_dates)})" if chain_dates == fused_dates else \
+                f"fused {fused_dates} / PIL {chain_dates}"
+        print(f"{label:<40}{chain_ms:>8.1f}{fused_ms:>10.1f}{chain_ms / fused_ms:>8.1f}x"
+              f"{diff.mean():>11.2f}{100 * (diff > 32).mean():>7.2f}%  {agreement}")
+
+    print(f"\n{'mean per page':<40}{chain_total / len(pages):>8.1f}{fused_total / len(pages):>10.1f}"
+          f"{chain_total / fused_total:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark date OCR on the header band against full-page OCR.
+
+Pages come from the sample PDFs (rendered with pdf2image, as
+MenuEmailMonitor does) and tests/test_menu_position_*.png. Each page is
+OCR'd with the same preprocessing and --psm 6 config as
+extract_dates_from_image, once over the whole page and once over the
+detected header band, and the dates found are compared.
+
+Usage:
+    python benchmarks/ocr_roi_benchmark.py [--iterations N] [--dpi DPI]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytesseract
+from PIL import Image
+
+from menu_ocr import header_band, parse_day_dates, preprocess_for_ocr
+
+PDF_PATHS = [
+    os.path.join(ROOT, 'menu_templates', 'menu_template.pdf'),
+    os.path.join(ROOT, 'tesseract-ocr-app', 'templates', 'menu_template.pdf'),
+]
+PNG_PATTERN = os.path.join(ROOT, 'tests', 'test_menu_position_*.png')
+
+def ocr(img: Image.Image) -> str:
+    return pytesseract.image_to_string(preprocess_for_ocr(img), config='--psm 6 --oem 1')
+
+def load_pages(dpi: int):
+    """(label, RGB page) for every sample page that can be loaded here"""
+    pages = []
+    try:
+        from pdf2image import convert_from_path
+        for path in PDF_PATHS:
+            if os.path.exists(path):
+                for number, page in enumerate(convert_from_path(path, dpi=dpi), 1):
+                    pages.append((f"{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)} p{number}",
+                                  page.convert('RGB')))
+    except Exception as e:
+        print(f"Skipping sample PDFs: {e}")
+    for path in sorted(glob.glob(PNG_PATTERN)):
+        with Image.open(path) as img:
+            pages.append((os.path.basename(path), img.convert('RGB')))
+    return pages
+
+def time_ocr(run, iterations: int):
+    times = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        text = run()
+        times.append(time.perf_counter() - started)
+    return 1000 * sum(times) / len(times), parse_day_dates(text)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--dpi', type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        sys.exit(f"Tesseract is not available: {e}")
+
+    pages = load_pages(args.dpi)
+    if not pages:
+        sys.exit("No sample pages found")
+
+    print(f"{len(pages)} pages x {args.iterations} iterations\n")
+    print(f"{'page':<40}{'band %':>8}{'full ms':>10}{'band ms':>10}{'speedup':>9}  dates")
+    full_total = band_total = 0.0
+    for label, page in pages:
+        band_started = time.perf_counter()
+        top, bottom = header_band(page)
+        crop = page.crop((0, top, page.size[0], bottom))
+        detect_ms = 1000 * (time.perf_counter() - band_started)
+
+        full_ms, full_dates = time_ocr(lambda: ocr(page), args.iterations)
+        band_ms, band_dates = time_ocr(lambda: ocr(crop), args.iterations)
+        band_ms += detect_ms
+        full_total += full_ms
+        band_total += band_ms
+
+        if band_dates == full_dates:
+            agreement = f"same ({len(band_dates)})"
+        else:
+            agreement = f"band {band_dates} / full {full_dates}"
+        print(f"{label:<40}{100 * (bottom - top) / page.size[1]:>7.1f}%{full_ms:>10.0f}{band_ms:>10.0f}"
+              f"{full_ms / band_ms:>8.1f}x  {agreement}")
+
+    print(f"\n{'mean per page':<48}{full_total / len(pages):>10.0f}{band_total / len(pages):>10.0f}"
+          f"{full_total / band_total:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import os
 import re
+import time
 from dotenv import load_dotenv
 import redis
 from supabase import create_client, Client
@@ -12,14 +13,44 @@ class MockRedis:
     """Mock Redis client for development"""
     def __init__(self):
         self._data = {}
+        self._expiry = {}
+        
+    def _expire_stale(self, key):
+        deadline = self._expiry.get(key)
+        if deadline is not None and time.monotonic() >= deadline:
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
         
     def get(self, key):
-        return self._data.get(key, '').encode()
+        self._expire_stale(key)
+        value = self._data.get(key, '')
+        return value.encode() if isinstance(value, str) else value
         
-    def set(self, key, value):
+    def set(self, key, value, ex=None, nx=False):
+        self._expire_stale(key)
+        if nx and key in self._data:
+            return None
         self._data[key] = value
+        self._expiry.pop(key, None)
+        if ex:
+            self.expire(key, ex)
+        return True
+        
+    def expire(self, key, seconds):
+        if key not in self._data:
+            return False
+        self._expiry[key] = time.monotonic() + seconds
         return True
         
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            self._expire_stale(key)
+            if self._data.pop(key, None) is not None:
+                removed += 1
+            self._expiry.pop(key, None)
+        return removed
+        
     def ping(self):
         return True
 
@@ -25,6 +25,7 @@ def calculate_next_menu_date(current_date):
     next_date = current_date + timedelta(days=14)
     
     # Get current settings
+    from app.services.settings_provider import get_menu_settings
     settings = get_menu_settings()
     if not settings:
         print("No settings found, using default season calculation", file=sys.stderr)
@@ -48,17 +49,12 @@ def calculate_next_menu_date(current_date):
         week_number = (weeks_since_start % 4) + 1
     else:
         print("Using settings-based season calculation", file=sys.stderr)
-        # Use settings-based season calculation
-        season = settings['season'].capitalize()
-        if settings.get('season_change_date'):
-            change_date = datetime.strptime(settings['season_change_date'], '%Y-%m-%d').date()
-            if next_date.date() >= change_date:
-                season = 'Winter' if season == 'Summer' else 'Summer'
-        
-        # Calculate week number (1-4) from start date
-        start_date = datetime.strptime(settings['start_date'], '%Y-%m-%d').date()
-        weeks_since_start = ((next_date.date() - start_date).days // 14)
-        week_number = (weeks_since_start % 4) + 1
+        # The next period in the shared rotation calendar
+        from app.services.menu_calendar import MenuCalendar
+        period = MenuCalendar.from_settings(settings).next_period(current_date)
+        next_date = datetime.combine(period.period_start, datetime.min.time())
+        season = period.season.capitalize()
+        week_number = period.week
         
         print(f"Settings season: {settings['season']}", file=sys.stderr)
         print(f"Change date: {settings.get('season_change_date')}", file=sys.stderr)
@@ -0,0 +1,211 @@
+from io import BytesIO
+from typing import Optional, NamedTuple, Tuple
+import cv2
+import numpy as np
+from PIL import Image
+
+# cv2.imencode extensions and parameters per output format
+ENCODE_FORMATS = {
+    'png': ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 3]),
+    'jpg': ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 90]),
+    'jpeg': ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 90]),
+    'webp': ('.webp', [cv2.IMWRITE_WEBP_QUALITY, 90]),
+}
+
+# Quality parameter per lossy format
+QUALITY_PARAMS = {
+    'jpg': cv2.IMWRITE_JPEG_QUALITY,
+    'jpeg': cv2.IMWRITE_JPEG_QUALITY,
+    'webp': cv2.IMWRITE_WEBP_QUALITY,
+}
+
+# imdecode flags that downscale while decoding, keyed by scale divisor
+DECODE_SCALES = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def decode_image(data: bytes, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """Decode encoded image bytes into a BGR array"""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    if image is None:
+        raise ValueError("Failed to decode image data")
+    return image
+
+def decode_flags(scale: int = 1) -> int:
+    """imdecode flags for decoding at 1/scale of full resolution"""
+    if scale not in DECODE_SCALES:
+        raise ValueError(f"Unsupported decode scale: {scale} (use 1, 2, 4 or 8)")
+    return DECODE_SCALES[scale]
+
+def read_image_size(data: bytes, scale: int = 1) -> Tuple[int, int]:
+    """Return (height, width) of encoded image bytes decoded at 1/scale, from the file header only"""
+    with Image.open(BytesIO(data)) as image:
+        width, height = image.size
+        jpeg = image.format == 'JPEG'
+    if scale == 1:
+        return height, width
+    decode_flags(scale)
+    # libjpeg scales while decoding and rounds up; other formats are resized down
+    if jpeg:
+        return -(-height // scale), -(-width // scale)
+    return height // scale, width // scale
+
+def load_image(path: str, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """Read an image file into a BGR array"""
+    image = cv2.imread(path, flags)
+    if image is None:
+        raise ValueError(f"Failed to read image: {path}")
+    return image
+
+def encode_image(image: np.ndarray, output_format: str = 'png', quality: Optional[int] = None) -> bytes:
+    """Encode an array to image bytes without touching disk"""
+    output_format = output_format.lower().lstrip('.')
+    if output_format not in ENCODE_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    ext, params = ENCODE_FORMATS[output_format]
+    if quality is not None and output_format in QUALITY_PARAMS:
+        params = [QUALITY_PARAMS[output_format], int(quality)]
+
+    success, encoded = cv2.imencode(ext, image, params)
+    if not success:
+        raise ValueError(f"Failed to encode image as {output_format}")
+    return encoded.tobytes()
+
+class HeaderLayout(NamedTuple):
+    """Where and how big the header lands on a template"""
+    header_height: int     # Rows of the source image used as the header
+    band_height: int       # Height of the header band on the template
+    band_width: int        # Template width
+    resized_width: int     # Header width after resizing to band_height
+    crop_start: int        # Columns cropped from the left of a wide header
+    x_offset: int          # Left edge of the header within the band
+
+def compute_header_layout(source_shape, template_shape, header_proportion: float = 0.20) -> HeaderLayout:
+    """
+    Work out the header band geometry for a source/template size pair.
+
+    The header is resized to the template's header height keeping its
+    aspect ratio, centred, and cropped from the centre if it ends up wider
+    than the template.
+    """
+    source_height, source_width = source_shape[:2]
+    template_height, template_width = template_shape[:2]
+
+    # Calculate header heights
+    header_height = int(source_height * header_proportion)
+    band_height = int(template_height * header_proportion)
+    if header_height <= 0 or band_height <= 0:
+        raise ValueError("Header proportion too small for image size")
+
+    resized_width = int(band_height * (source_width / header_height))
+
+    # Handle wide headers
+    crop_start = 0
+    if resized_width > template_width:
+        crop_start = (resized_width - template_width) // 2
+
+    x_offset = max((template_width - resized_width) // 2, 0)
+
+    return HeaderLayout(header_height, band_height, template_width, resized_width, crop_start, x_offset)
+
+def resize_header(source: np.ndarray, layout: HeaderLayout) -> np.ndarray:
+    """Resize the source header to the band height, cropped to the band width"""
+    header = source[0:layout.header_height, :]
+    header_resized = cv2.resize(header, (layout.resized_width, layout.band_height))
+    if layout.crop_start:
+        header_resized = header_resized[:, layout.crop_start:layout.crop_start + layout.band_width]
+    return header_resized
+
+def composite_header_band(target: np.ndarray, header: np.ndarray, x_offset: int) -> None:
+    """
+    Write a resized header into the top band of target, centred on white.
+
+    Works on views of target only: the side margins are filled with white
+    and the header is copied between them, so no page-sized buffer is
+    allocated.
+    """
+    band_height, header_width = header.shape[:2]
+    band = target[0:band_height]
+    band[:, :x_offset] = 255
+    band[:, x_offset:x_offset + header_width] = header
+    band[:, x_offset + header_width:] = 255
+
+def render_header_band(source: np.ndarray, layout: HeaderLayout) -> np.ndarray:
+    """Render the full-width header band (header plus white margins) for a layout"""
+    band = np.empty((layout.band_height, layout.band_width) + source.shape[2:], dtype=source.dtype)
+    composite_header_band(band, resize_header(source, layout), layout.x_offset)
+    return band
+
+def apply_header_band(target: np.ndarray, band: np.ndarray) -> np.ndarray:
+    """Copy a pre-rendered header band onto the top of target in one block"""
+    if band.shape[1:] != target.shape[1:] or band.shape[0] > target.shape[0]:
+        raise ValueError(f"Header band {band.shape} does not fit template {target.shape}")
+    target[0:band.shape[0]] = band
+    return target
+
+def band_fits(band: np.ndarray, template_shape, header_proportion: float) -> bool:
+    """Whether a pre-rendered band was laid out for this template shape"""
+    return (band.shape[1:] == tuple(template_shape[1:])
+            and band.shape[0] == int(template_shape[0] * header_proportion))
+
+def render_merge(header_data: bytes, template_data: bytes, header_proportion: float = 0.20,
+                 output_format: str = 'png', band: Optional[np.ndarray] = None, scale: int = 1,
+                 quality: Optional[int] = None):
+    """
+    Decode, merge and encode one menu from encoded bytes.
+
+    Self-contained so it can run in a worker process. Both images are
+    decoded at 1/scale resolution and composited at that size. A
+    pre-rendered band is used when it fits the decoded template; otherwise
+    the header is decoded and laid out here.
+
+    Returns:
+        (merged bytes, band rendered by this call or None)
+    """
+    flags = decode_flags(scale)
+    template = decode_image(template_data, flags)
+    new_band = None
+    if band is None or not band_fits(band, template.shape, header_proportion):
+        source = decode_image(header_data, flags)
+        band = new_band = render_header_band(
+            source, compute_header_layout(source.shape, template.shape, header_proportion))
+    return encode_image(apply_header_band(template, band), output_format, quality), new_band
+
+def merge_header(source: np.ndarray, template: np.ndarray, header_proportion: float = 0.20,
+                 in_place: bool = False) -> np.ndarray:
+    """
+    Copy the header band of the source image onto the top of the template.
+
+    Args:
+        source: Image holding the dates header
+        template: Menu template image
+        header_proportion: Proportion of image height to use for header
+        in_place: Write the header straight into the template's top band
+            instead of compositing onto a copy. Only the resized header is
+            allocated, so use this when the caller owns the template array.
+
+    Returns:
+        Merged image array (the template itself when in_place is set)
+    """
+    layout = compute_header_layout(source.shape, template.shape, header_proportion)
+    result = template if in_place else template.copy()
+    composite_header_band(result, resize_header(source, layout), layout.x_offset)
+    return result
+
+def merge_header_bytes(header_data: bytes, template_data: bytes, header_proportion: float = 0.20,
+                       output_format: str = 'png') -> bytes:
+    """Merge encoded header and template images and return encoded bytes"""
+    source = decode_image(header_data)
+    template = decode_image(template_data)
+    return encode_image(merge_header(source, template, header_proportion, in_place=True), output_format)
+
+def merge_header_files(source_path: str, template_path: str, header_proportion: float = 0.20,
+                       output_format: str = 'png') -> bytes:
+    """Merge header and template image files and return encoded bytes"""
+    source = load_image(source_path)
+    template = load_image(template_path)
+    return encode_image(merge_header(source, template, header_proportion, in_place=True), output_format)
@@ -11,13 +11,14 @@ import logging
 from ProcessToImage import convert_pdf_to_images, correct_orientation
 from menu_scheduler import load_config
 from menu_utils import add_dates_to_menu
+from menu_merge import merge_header_files
+from menu_ocr import parse_day_dates
+from ocr_planner import get_ocr_planner
 import re
 import pytesseract
-from PIL import Image, ImageDraw, ImageEnhance
+from PIL import Image, ImageDraw
 import cv2
-import numpy as np
 import smtplib
-import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
@@ -39,12 +40,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds between inbox checks, backing off from 3 to 4 minutes while no mail
+# arrives. Nothing signals new mail, so the maximum bounds how late a menu is
+# picked up.
+CHECK_INTERVAL = 180
+MAX_CHECK_INTERVAL = 240
+
+# Seconds a monitor replica holds a message it is processing
+MESSAGE_CLAIM_SECONDS = 1800
+
 class MenuEmailMonitor:
     def __init__(self):
         """Initialize the menu email monitor"""
         try:
             print("Initializing MenuEmailMonitor...")
             
+            # Set by main() so several monitors can share the inbox
+            self.redis_client = None
+            self._claims = {}
+            
             # Load configuration
             print("Loading configuration...")
             with open('config.yaml', 'r') as f:
@@ -95,6 +109,21 @@ class MenuEmailMonitor:
         # We don't need to check - we only get UNSEEN messages in process_new_emails
         return False
 
+    def claim_message(self, message_id: str) -> bool:
+        """Take a message for this monitor; False if another replica is processing it"""
+        from app.utils.leader import RedisLock
+        claim = RedisLock(self.redis_client, f"menu_monitor:message:{message_id}", MESSAGE_CLAIM_SECONDS)
+        if not claim.acquire():
+            return False
+        self._claims[message_id] = claim
+        return True
+
+    def release_message(self, message_id: str):
+        """Let another run pick up a message that failed to process"""
+        claim = self._claims.pop(message_id, None)
+        if claim is not None:
+            claim.release()
+
     def mark_as_processed(self, mail: imaplib.IMAP4_SSL, msg_num: bytes, message_id: str):
         """Mark email as processed by setting the Seen flag"""
         try:
@@ -188,57 +217,21 @@ class MenuEmailMonitor:
             logger.error(f"Failed to connect to IMAP server: {e}")
             raise
 
-    def extract_dates_from_image(self, image_path: str) -> Optional[Dict[str, str]]:
-        """Extract dates from the image using OCR"""
+    def extract_dates_from_image(self, image_path: str, pdf_path: Optional[str] = None,
+                                 page_number: int = 0) -> Optional[Dict[str, str]]:
+        """Extract dates from a page, trying its PDF text layer and then cheap OCR tiers first"""
         try:
-            # Open and optimize image for OCR
             with Image.open(image_path) as img:
-                # Convert to RGB if needed
-                if img.mode not in ('L', 'RGB'):
-                    img = img.convert('RGB')
-                
-                # Resize if too large (max dimension 2400px)
-                max_dimension = 2400
-                if max(img.size) > max_dimension:
-                    ratio = max_dimension / max(img.size)
-                    new_size = tuple(int(dim * ratio) for dim in img.size)
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
-                
-                # Enhance image for OCR
-                img = ImageEnhance.Contrast(img).enhance(1.5)
-                img = ImageEnhance.Sharpness(img).enhance(1.5)
-                
-                # Convert to grayscale for OCR
-                img = img.convert('L')
-                
-                # Use custom OCR config for better memory usage
-                custom_config = '--psm 6 --oem 1'
-                text = pytesseract.image_to_string(img, config=custom_config)
-                
-                # Clean up memory
-                img = None
-                
-            # Process text to extract dates
-            dates = {}
-            lines = text.split('\n')
-            for line in lines:
-                # Process one line at a time
-                match = re.search(r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*\s+(\d+(?:st|nd|rd|th)?\s+[A-Za-z]+)', line)
-                if match:
-                    day = match.group(1)[:3]  # Standardize to 3 letters
-                    date = match.group(2)
-                    dates[day] = date
+                plan = get_ocr_planner().run(parse_day_dates, image=img, pdf_path=pdf_path,
+                                             page_number=page_number)
             
-            return dates if dates else None
+            if plan['tier']:
+                print(f"Dates read at OCR tier {plan['tier']} ({len(plan['tiers'])} attempt(s))")
+            return plan['result']
             
         except Exception as e:
             print(f"Error extracting dates: {str(e)}")
             return None
-        finally:
-            # Ensure we clean up any temporary files
-            if 'img' in locals():
-                del img
-            gc.collect()
 
     def combine_with_master_menu(self, dates: Dict[str, str], master_menu_path: str) -> str:
         """
@@ -297,7 +290,7 @@ class MenuEmailMonitor:
             logger.error(f"Error finding template: {e}")
             return None
 
-    def merge_header_with_template(self, source_image: str, template_path: str, header_proportion: float = 0.12) -> Optional[str]:
+    def merge_header_with_template(self, source_image: str, template_path: str, header_proportion: float = 0.12) -> Optional[bytes]:
         """
         Copy header from source image to template.
         
@@ -305,85 +298,14 @@ class MenuEmailMonitor:
             source_image: Path to source image
             template_path: Path to template image
             header_proportion: Proportion of image height to use for header (default 0.12)
+        
+        Returns:
+            Encoded PNG bytes of the merged menu, ready to attach or upload
         """
         try:
-            # Read images
-            source = cv2.imread(source_image)
-            template = cv2.imread(template_path)
-            
-            if source is None or template is None:
-                logger.error("Failed to read source or template image")
-                return None
-            
-            # Get dimensions
-            source_height = source.shape[0]
-            template_height = template.shape[0]
-            template_width = template.shape[1]
-            
-            # Copy header using specified proportion
-            header_height = int(source_height * header_proportion)
-            template_header_height = int(template_height * header_proportion)
-            
-            # Extract header
-            header = source[0:header_height, :]
-            
-            # Calculate the aspect ratio of the header
-            header_aspect_ratio = header.shape[1] / header.shape[0]
-            
-            # Calculate new header width maintaining aspect ratio
-            new_header_width = int(template_header_height * header_aspect_ratio)
-            
-            # Resize header maintaining aspect ratio
-            header_resized = cv2.resize(header, (new_header_width, template_header_height))
-            
-            # Create new image
-            result = template.copy()
-            
-            # Calculate centering position
-            x_offset = (template_width - new_header_width) // 2
-            
-            # If header is wider than template, crop it from center
-            if new_header_width > template_width:
-                crop_start = (new_header_width - template_width) // 2
-                header_resized = header_resized[:, crop_start:crop_start + template_width]
-                x_offset = 0
-            
-            # Create the header region with white background
-            header_region = np.full((template_header_height, template_width, 3), 255, dtype=np.uint8)
-            
-            # Place the resized header in the center
-            if x_offset >= 0:
-                header_region[:, x_offset:x_offset + header_resized.shape[1]] = header_resized
-            
-            # Copy the header region to the template
-            result[0:template_header_height, :] = header_region
-            
-            # Save result with unique timestamp to avoid conflicts
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-            output_path = os.path.join(
-                self.config['temp_dir'],
-                f'merged_menu_{timestamp}.png'
-            )
-            
-            # Save and verify
-            success = cv2.imwrite(output_path, result)
-            if not success:
-                logger.error("Failed to save merged image")
-                return None
-                
-            # Verify file was created and is valid
-            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
-                logger.error("Merged file is missing or empty")
-                return None
-                
-            # Verify the saved image can be read back
-            test_img = cv2.imread(output_path)
-            if test_img is None:
-                logger.error("Saved merged image cannot be read back")
-                return None
-            
-            logger.info(f"Successfully merged header with template: {output_path}")
-            return output_path
+            merged = merge_header_files(source_image, template_path, header_proportion)
+            logger.info(f"Successfully merged header with template ({len(merged)} bytes)")
+            return merged
             
         except Exception as e:
             logger.error(f"Error merging header with template: {e}")
@@ -538,7 +460,7 @@ class MenuEmailMonitor:
                     
                     # Try to extract dates from this image
                     if dates is None:
-                        dates = self.extract_dates_from_image(image_path)
+                        dates = self.extract_dates_from_image(image_path, pdf_path, page_number=i)
                     
                     # Clean up memory after each page
                     image = None
@@ -615,8 +537,8 @@ Holly Lodge Menu System"""
             logger.error(f"Error sending response email: {e}")
             raise
 
-    def process_new_emails(self):
-        """Process new unread emails in the Menus folder"""
+    def process_new_emails(self) -> int:
+        """Process new unread emails in the Menus folder; returns how many were found"""
         try:
             print("\n🔍 Starting email processing...")
             mail = self.connect()
@@ -628,11 +550,12 @@ Holly Lodge Menu System"""
             
             if not message_list:
                 print("📭 No unread messages found")
-                return
+                return 0
             
             print(f"📬 Found {len(message_list)} unread messages")
             
             for msg_num in message_list:
+                message_id = None
                 try:
                     print(f"\n📨 Processing message {msg_num.decode()}...")
                     
@@ -640,7 +563,13 @@ Holly Lodge Menu System"""
                     _, msg_data = mail.fetch(msg_num, '(RFC822)')
                     email_body = msg_data[0][1]
                     message = email.message_from_bytes(email_body)
-                    message_id = message['Message-ID']
+                    message_id = message['Message-ID'] or msg_num.decode()
+                    
+                    # Another monitor replica may have picked it up in the same poll
+                    if not self.claim_message(message_id):
+                        print("✓ Message is being processed by another monitor, skipping")
+                        message_id = None
+                        continue
                     
                     # Skip if already processed
                     if self.is_email_processed(mail, message_id):
@@ -692,9 +621,16 @@ Holly Lodge Menu System"""
                     
                 except Exception as e:
                     print(f"❌ Error processing message: {str(e)}")
+                    if message_id:
+                        self.release_message(message_id)
                     continue
+                finally:
+                    # Done with it; the claim stays in Redis until it expires
+                    if message_id:
+                        self._claims.pop(message_id, None)
             
             print("\n✨ Email processing complete!")
+            return len(message_list)
             
         except Exception as e:
             print(f"❌ Error in process_new_emails: {str(e)}")
@@ -787,19 +723,31 @@ def main():
     logger.info("Monitoring 'Menus' folder for new emails...")
     logger.info(f"Email account being monitored: {os.getenv('SMTP_USERNAME')}")
     
+    from app.utils.scheduling import WakeScheduler
+    from app.utils.leader import get_redis_client
+    
     monitor = MenuEmailMonitor()
+    monitor.redis_client = get_redis_client()
+    scheduler = WakeScheduler(max_sleep=MAX_CHECK_INTERVAL)
+    interval = CHECK_INTERVAL
+    
+    def check_inbox():
+        nonlocal interval
+        try:
+            logger.info("Checking Menus folder for new emails...")
+            found = monitor.process_new_emails()
+        except Exception as e:
+            logger.error(f"Error in main loop: {e}")
+            logger.info("Waiting 1 minute before retry...")
+            return 60
+        # Check less often while the inbox stays empty
+        interval = CHECK_INTERVAL if found else min(interval * 2, MAX_CHECK_INTERVAL)
+        logger.info(f"Waiting {interval // 60} minutes before next check...")
+        return interval
     
     try:
-        while True:
-            try:
-                logger.info("Checking Menus folder for new emails...")
-                monitor.process_new_emails()
-                logger.info("Waiting 3 minutes before next check...")
-                time.sleep(180)
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                logger.info("Waiting 1 minute before retry...")
-                time.sleep(60)
+        scheduler.add('check_inbox', check_inbox)
+        scheduler.run()
     except KeyboardInterrupt:
         logger.info("Shutting down Menu Email Monitor...")
         logger.info("Cleaning up temporary files...")
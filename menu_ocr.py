@@ -0,0 +1,148 @@
+import os
+import re
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from PIL import Image
+
+# "Mon 10 Feb", "Tuesday 11th February"...
+DAY_DATE_PATTERN = re.compile(r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*\s+(\d+(?:st|nd|rd|th)?\s+[A-Za-z]+)')
+
+# Header band used when none is configured or detected, as fractions of page height
+DEFAULT_HEADER_BAND = (0.0, 0.30)
+
+# Overrides detection, e.g. OCR_HEADER_BAND=0.05,0.2
+HEADER_BAND_ENV = 'OCR_HEADER_BAND'
+
+# Detection looks for the dark title/day bar in the top half of a downscaled copy
+ANALYSIS_WIDTH = 400
+SEARCH_FRACTION = 0.5
+DARK_LEVEL = 110
+
+# Rows through the white date boxes are still over a quarter dark
+DARK_ROW_FRACTION = 0.25
+MIN_BAND_FRACTION = 0.02
+MAX_GAP_FRACTION = 0.01
+BAND_MARGIN_FRACTION = 0.01
+
+# Preprocessing before Tesseract, with the factors the ImageEnhance chain used
+MAX_OCR_DIMENSION = 2400
+CONTRAST_FACTOR = 1.5
+SHARPNESS_FACTOR = 1.5
+
+# PIL's ImageFilter.SMOOTH, the blur ImageEnhance.Sharpness pushes away from
+SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+IDENTITY_KERNEL = np.array([[0, 0, 0], [0, 1, 0], [0, 0, 0]], dtype=np.float32)
+
+# Optional adaptive threshold: neighbourhood size (odd) and offset below its mean
+THRESHOLD_BLOCK = 31
+THRESHOLD_OFFSET = 15
+
+def preprocess_for_ocr(image: Image.Image, max_dimension: int = MAX_OCR_DIMENSION,
+                       contrast: float = CONTRAST_FACTOR, sharpness: float = SHARPNESS_FACTOR,
+                       threshold: bool = False) -> Image.Image:
+    """
+    Downscale, grayscale, contrast-stretch and sharpen an image for Tesseract.
+
+    Matches resizing, then ImageEnhance.Contrast and ImageEnhance.Sharpness,
+    then convert('L') to within rounding and clipping, but works on one
+    uint8 buffer: the image goes to grayscale first, so the resize touches a
+    third of the data, and contrast (a blend with the mean grey) and
+    sharpening (a blend with SMOOTH) are both linear, so they fold into a
+    single 3x3 kernel plus offset applied by one filter2D pass.
+
+    Returns:
+        An 'L' image, binarised with an adaptive threshold if threshold is set
+    """
+    gray = np.asarray(image if image.mode == 'L' else image.convert('L'))
+    height, width = gray.shape
+    if max(height, width) > max_dimension:
+        ratio = max_dimension / max(height, width)
+        gray = cv2.resize(gray, (int(width * ratio), int(height * ratio)), interpolation=cv2.INTER_AREA)
+
+    # ImageEnhance.Contrast blends with the rounded mean grey level
+    mean = int(gray.mean() + 0.5)
+    kernel = contrast * (sharpness * IDENTITY_KERNEL + (1 - sharpness) * SMOOTH_KERNEL)
+    result = cv2.filter2D(gray, -1, kernel, delta=mean * (1 - contrast), borderType=cv2.BORDER_REPLICATE)
+    if threshold:
+        result = cv2.adaptiveThreshold(result, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                       THRESHOLD_BLOCK, THRESHOLD_OFFSET)
+    return Image.fromarray(result)
+
+def configured_header_band() -> Optional[Tuple[float, float]]:
+    """The header band set in OCR_HEADER_BAND as (top, bottom) fractions, if any"""
+    value = os.getenv(HEADER_BAND_ENV)
+    if not value:
+        return None
+    try:
+        top, bottom = (float(part) for part in value.split(','))
+    except ValueError:
+        return None
+    if not 0 <= top < bottom <= 1:
+        return None
+    return top, bottom
+
+def detect_header_band(image: Image.Image) -> Optional[Tuple[int, int]]:
+    """
+    Find the dark header bar holding the day/date boxes.
+
+    Rows with a large share of dark pixels are grouped into runs (bridging thin light
+    gaps such as the line between the title and the day row); the first
+    run tall enough to be a bar rather than a table border is the header.
+
+    Returns:
+        (top, bottom) pixel rows of the band, or None if no bar was found
+    """
+    width, height = image.size
+    # reduce() box-averages by an integer factor, far cheaper than resize() on a full page
+    factor = max(1, width // ANALYSIS_WIDTH)
+    small = image.reduce(factor) if factor > 1 else image
+    scale = small.size[1] / height
+    pixels = np.asarray(small.convert('L'))
+    search = pixels[:max(1, int(pixels.shape[0] * SEARCH_FRACTION))]
+    dark_rows = (search < DARK_LEVEL).mean(axis=1) > DARK_ROW_FRACTION
+
+    rows = pixels.shape[0]
+    max_gap = max(1, int(rows * MAX_GAP_FRACTION))
+    min_height = max(1, int(rows * MIN_BAND_FRACTION))
+    start = end = None
+    for row in np.flatnonzero(dark_rows):
+        if start is not None and row - end > max_gap:
+            if end - start + 1 >= min_height:
+                break
+            start = None
+        if start is None:
+            start = row
+        end = row
+    if start is None or end - start + 1 < min_height:
+        return None
+
+    margin = int(rows * BAND_MARGIN_FRACTION)
+    top = max(0, start - margin)
+    bottom = min(rows, end + 1 + margin)
+    return int(top / scale), min(height, int(bottom / scale))
+
+def header_band(image: Image.Image, band: Optional[Tuple[float, float]] = None) -> Tuple[int, int]:
+    """Pixel rows to OCR: an explicit or configured band, else the detected bar, else the default"""
+    band = band or configured_header_band()
+    if band is None:
+        detected = detect_header_band(image)
+        if detected is not None:
+            return detected
+        band = DEFAULT_HEADER_BAND
+    height = image.size[1]
+    return int(height * band[0]), max(int(height * band[0]) + 1, int(height * band[1]))
+
+def crop_header(image: Image.Image, band: Optional[Tuple[float, float]] = None) -> Image.Image:
+    """Crop an image to its header band"""
+    top, bottom = header_band(image, band)
+    return image.crop((0, top, image.size[0], bottom))
+
+def parse_day_dates(text: str) -> Dict[str, str]:
+    """Map 3-letter day names to the dates found next to them in OCR text"""
+    dates = {}
+    for line in text.split('\n'):
+        # A header band puts every day on one line
+        for match in DAY_DATE_PATTERN.finditer(line):
+            dates[match.group(1)[:3]] = match.group(2)
+    return dates
@@ -39,7 +39,19 @@ def load_config():
 
 def determine_menu_details(current_date):
     """Determine which menu template to use based on the current date"""
-    pass  # We'll implement this later if needed
+    from app.services.settings_provider import get_menu_settings
+    settings = get_menu_settings()
+    if not settings:
+        raise ValueError("No menu settings found")
+    
+    # The next period in the shared rotation calendar
+    from app.services.menu_calendar import MenuCalendar
+    period = MenuCalendar.from_settings(settings).next_period(current_date)
+    return {
+        'start_date': datetime.combine(period.period_start, datetime.min.time()),
+        'season': period.season.capitalize(),
+        'week_number': period.week
+    }
 
 def get_menu_file_path(menu_details, config):
     """Get the path to the correct menu template file"""
@@ -268,6 +280,7 @@ def validate_template_structure(config):
     print(f"Current date: {current_date}", file=sys.stderr)
     
     # Get current settings
+    from app.services.settings_provider import get_menu_settings
     settings = get_menu_settings()
     if not settings:
         print("No settings found, using default season calculation", file=sys.stderr)
@@ -290,11 +303,8 @@ def validate_template_structure(config):
     else:
         print("Using settings-based season calculation", file=sys.stderr)
         # Use settings-based season calculation
-        current_season = settings['season']
-        if settings.get('season_change_date'):
-            change_date = datetime.strptime(settings['season_change_date'], '%Y-%m-%d').date()
-            if current_date.date() >= change_date:
-                current_season = 'winter' if current_season == 'summer' else 'summer'
+        from app.services.menu_calendar import MenuCalendar
+        current_season = MenuCalendar.from_settings(settings).season_on(current_date)
         
         print(f"Settings season: {settings['season']}", file=sys.stderr)
         print(f"Change date: {settings.get('season_change_date')}", file=sys.stderr)
@@ -0,0 +1,14 @@
+-- Ledger of menus sent, shared by every worker instance
+create table if not exists public.menu_sends (
+    id uuid default uuid_generate_v4() primary key,
+    period_start date not null,
+    recipient text not null,
+    menu_version text not null,
+    status text not null default 'claimed' check (status in ('claimed', 'sent')),
+    claimed_by text,
+    claimed_at timestamp with time zone default now(),
+    sent_at timestamp with time zone,
+    -- One row per menu and recipient; inserting a second one is how a claim is lost
+    unique(period_start, recipient, menu_version)
+);
+
@@ -0,0 +1,18 @@
+-- Menus rendered ahead of their send date
+create table if not exists public.prerendered_menus (
+    id uuid default uuid_generate_v4() primary key,
+    period_start date not null,
+    season text not null check (season in ('summer', 'winter')),
+    week integer not null check (week between 1 and 4),
+    file_path text not null,
+    file_url text not null,
+    checksum text not null,
+    size integer,
+    template_path text,
+    header_path text,
+    built_at timestamp with time zone default now(),
+    unique(period_start, season, week)
+);
+
+-- Add indexes for performance
+create index idx_prerendered_menus_period_start on public.prerendered_menus(period_start);
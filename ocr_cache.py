@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from ocr_engine import get_engine_pool
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = 'ocr_cache:'
+REDIS_TTL_SECONDS = 30 * 24 * 3600
+
+# Hash grid width: fine enough that a changed digit in the date row changes
+# the hash (a digit in a 2400px-wide header spans several columns)
+HASH_WIDTH = 512
+
+# Neighbouring cells must differ by more than this to set a bit, so flat
+# areas stay 0 under compression noise instead of flipping at random
+HASH_THRESHOLD = 12
+
+def perceptual_hash(image: Image.Image) -> str:
+    """Difference hash of an image on a HASH_WIDTH-wide grid, as hex.
+
+    Each bit says whether a cell is clearly brighter than its right-hand
+    neighbour. It depends on the rendered page rather than the file it
+    came in, so resent and forwarded copies of a PDF match, and noise too
+    faint to cross the threshold is ignored. It errs towards misses: a
+    near-duplicate that hashes differently only costs a Tesseract run,
+    whereas a collision would return another menu's dates.
+    """
+    width, height = image.size
+    rows = max(1, round(height * HASH_WIDTH / width))
+    small = image.convert('L').resize((HASH_WIDTH + 1, rows), Image.Resampling.BOX)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, :-1] - pixels[:, 1:]) > HASH_THRESHOLD
+    digest = hashlib.sha256(f"{rows}x{HASH_WIDTH}:".encode() + np.packbits(bits).tobytes())
+    return digest.hexdigest()
+
+def make_ocr_key(image_hash: str, config: str = '', lang: Optional[str] = None) -> str:
+    """Build the cache key for one image OCR'd with one Tesseract config"""
+    raw = f"{image_hash}:{lang or ''}:{' '.join((config or '').split())}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+class OcrCache:
+    """Bounded LRU cache of OCR text keyed by image hash and Tesseract config.
+
+    Text is also mirrored to Redis, when configured, so a page OCR'd by
+    the web app, the worker or the email monitor is not OCR'd again by
+    the others.
+    """
+
+    def __init__(self, max_entries: int = 256, redis_client=None):
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for a key, or None on a miss"""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+
+        text = self._redis_get(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._store(key, text)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """Store OCR text under its key"""
+        self._store(key, text)
+        self._redis_set(key, text)
+
+    def clear(self) -> None:
+        """Drop all local entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _store(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _redis_get(self, key: str) -> Optional[str]:
+        if self.redis_client is None:
+            return None
+        try:
+            value = self.redis_client.get(REDIS_KEY_PREFIX + key)
+            if value is None or value == b'':
+                return None
+            return value.decode() if isinstance(value, bytes) else value
+        except Exception as e:
+            logger.warning(f"OCR cache Redis lookup failed: {str(e)}")
+            return None
+
+    def _redis_set(self, key: str, text: str) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.set(REDIS_KEY_PREFIX + key, text, ex=REDIS_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"OCR cache Redis store failed: {str(e)}")
+
+def cached_ocr(image: Image.Image, config: str = '', lang: Optional[str] = None,
+               cache: Optional[OcrCache] = None) -> str:
+    """OCR an already preprocessed image, reusing the text of any identical-looking image"""
+    cache = cache or get_ocr_cache()
+    key = make_ocr_key(perceptual_hash(image), config, lang)
+    text = cache.get(key)
+    if text is None:
+        text = get_engine_pool().image_to_string(image, config=config, lang=lang)
+        cache.put(key, text)
+    return text
+
+_ocr_cache: Optional[OcrCache] = None
+
+def get_ocr_cache() -> OcrCache:
+    """Get the process-wide OCR cache instance"""
+    global _ocr_cache
+    if _ocr_cache is None:
+        try:
+            from config import redis_client
+        except Exception:
+            redis_client = None
+        _ocr_cache = OcrCache(redis_client=redis_client)
+    return _ocr_cache
@@ -0,0 +1,397 @@
+"""
+OCR engines behind one interface, with a pool of warm in-process engines.
+
+pytesseract runs the tesseract binary for every call: it writes the image
+to a temp file, forks a process and loads the traineddata again each
+time. TesseractApiEngine instead keeps a libtesseract handle initialised
+(through its C API, so no extra Python dependency is needed) and
+EnginePool lends one warm handle per concurrent caller, up to the CPU
+count. Both engines return the same strings as pytesseract's
+image_to_string/image_to_osd. When libtesseract cannot be loaded, or a
+config uses options the API engine does not support, calls go through
+pytesseract as before.
+"""
+import ctypes
+import ctypes.util
+import os
+import shlex
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pytesseract
+from PIL import Image
+
+# Each pooled engine recognises on one thread; without this every engine
+# would also start an OpenMP thread per core and oversubscribe the CPU.
+# Must be set before libtesseract is loaded.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+# Overrides where libtesseract is looked for
+LIBRARY_ENV = 'TESSERACT_LIBRARY'
+LIBRARY_NAMES = ['libtesseract.so.5', 'libtesseract.so.4', 'libtesseract.dylib', 'libtesseract-5.dll',
+                 'libtesseract-4.dll']
+
+# Tesseract 4.0 aborts the process unless the locale is "C"; 4.1 fixed that
+MIN_API_VERSION = (4, 1)
+
+# Engines created per (language, OCR engine mode); also the most callers
+# that OCR at once before the rest wait for a free engine
+POOL_SIZE_ENV = 'OCR_POOL_SIZE'
+
+DEFAULT_LANG = 'eng'
+DEFAULT_OEM = 3  # Tesseract's default: LSTM if available
+DEFAULT_PSM = 3  # Tesseract's default: fully automatic segmentation
+PSM_OSD_ONLY = 0
+
+# Clockwise rotation that makes the page upright, by orientation id (deg / 90)
+OSD_ROTATE = {0: 0, 1: 270, 2: 180, 3: 90}
+
+class OcrConfig(NamedTuple):
+    """A pytesseract config string split into what the API engine needs"""
+    lang: str
+    oem: int
+    psm: int
+    variables: Tuple[Tuple[str, str], ...]
+    dpi: Optional[int]
+    supported: bool  # False if it has options only the tesseract binary understands
+
+def parse_config(config: str = '', lang: Optional[str] = None) -> OcrConfig:
+    """Parse a pytesseract config string such as '--psm 6 --oem 1 -c key=value'"""
+    oem, psm, dpi = DEFAULT_OEM, DEFAULT_PSM, None
+    variables: List[Tuple[str, str]] = []
+    supported = True
+    args = shlex.split(config or '')
+    i = 0
+    while i < len(args):
+        arg, value = args[i], args[i + 1] if i + 1 < len(args) else None
+        if arg in ('--psm', '--oem', '--dpi', '-l', '-c') and value is not None:
+            if arg == '--psm':
+                psm = int(value)
+            elif arg == '--oem':
+                oem = int(value)
+            elif arg == '--dpi':
+                dpi = int(value)
+            elif arg == '-l':
+                lang = value
+            elif '=' in value:
+                variables.append(tuple(value.split('=', 1)))
+            else:
+                supported = False
+            i += 2
+        else:
+            supported = False
+            i += 1
+    return OcrConfig(lang or DEFAULT_LANG, oem, psm, tuple(variables), dpi, supported)
+
+class SubprocessEngine:
+    """The existing path: one tesseract process per call through pytesseract"""
+
+    def image_to_string(self, image: Image.Image, config: str = '', lang: Optional[str] = None) -> str:
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+
+    def image_to_osd(self, image: Image.Image, config: str = '') -> str:
+        return pytesseract.image_to_osd(image, config=config)
+
+    def close(self) -> None:
+        pass
+
+_library = None
+_library_lock = threading.Lock()
+
+def load_library():
+    """Load libtesseract and declare the C API calls used here; None if unavailable"""
+    global _library
+    with _library_lock:
+        if _library is not None:
+            return _library or None
+        _library = False
+        candidates = [os.getenv(LIBRARY_ENV), ctypes.util.find_library('tesseract')] + LIBRARY_NAMES
+        for name in filter(None, candidates):
+            try:
+                lib = ctypes.CDLL(name)
+                break
+            except OSError:
+                continue
+        else:
+            return None
+
+        try:
+            lib.TessVersion.restype = ctypes.c_char_p
+            version = tuple(int(part) for part in lib.TessVersion().decode().lstrip('v').split('.')[:2])
+            if version < MIN_API_VERSION:
+                return None
+
+            handle = ctypes.c_void_p
+            lib.TessBaseAPICreate.restype = handle
+            lib.TessBaseAPIInit2.argtypes = [handle, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+            lib.TessBaseAPIInit2.restype = ctypes.c_int
+            lib.TessBaseAPISetVariable.argtypes = [handle, ctypes.c_char_p, ctypes.c_char_p]
+            lib.TessBaseAPISetVariable.restype = ctypes.c_int
+            lib.TessBaseAPIGetIntVariable.argtypes = [handle, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
+            lib.TessBaseAPIGetIntVariable.restype = ctypes.c_int
+            lib.TessBaseAPIGetBoolVariable.argtypes = [handle, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
+            lib.TessBaseAPIGetBoolVariable.restype = ctypes.c_int
+            lib.TessBaseAPIGetDoubleVariable.argtypes = [handle, ctypes.c_char_p, ctypes.POINTER(ctypes.c_double)]
+            lib.TessBaseAPIGetDoubleVariable.restype = ctypes.c_int
+            lib.TessBaseAPIGetStringVariable.argtypes = [handle, ctypes.c_char_p]
+            lib.TessBaseAPIGetStringVariable.restype = ctypes.c_char_p
+            lib.TessBaseAPISetPageSegMode.argtypes = [handle, ctypes.c_int]
+            lib.TessBaseAPISetImage.argtypes = [handle, ctypes.c_char_p, ctypes.c_int, ctypes.c_int,
+                                                ctypes.c_int, ctypes.c_int]
+            lib.TessBaseAPISetSourceResolution.argtypes = [handle, ctypes.c_int]
+            lib.TessBaseAPIGetUTF8Text.argtypes = [handle]
+            lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p  # Freed with TessDeleteText
+            lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+            lib.TessBaseAPIDetectOrientationScript.argtypes = [
+                handle, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_float),
+                ctypes.POINTER(ctypes.c_char_p), ctypes.POINTER(ctypes.c_float)]
+            lib.TessBaseAPIDetectOrientationScript.restype = ctypes.c_int
+            lib.TessBaseAPIClear.argtypes = [handle]
+            lib.TessBaseAPIEnd.argtypes = [handle]
+            lib.TessBaseAPIDelete.argtypes = [handle]
+        except (AttributeError, ValueError):
+            return None
+        _library = lib
+        return lib
+
+class TesseractApiEngine:
+    """A libtesseract handle initialised once for a language and engine mode.
+
+    Not thread-safe: EnginePool hands each engine to one caller at a time.
+    """
+
+    def __init__(self, lang: str = DEFAULT_LANG, oem: int = DEFAULT_OEM, lib=None):
+        self.lib = lib or load_library()
+        if self.lib is None:
+            raise RuntimeError("libtesseract is not available")
+        self.lang = lang
+        self.oem = oem
+        self.handle = self.lib.TessBaseAPICreate()
+        self._saved_variables: List[Tuple[bytes, bytes]] = []
+        datapath = os.getenv('TESSDATA_PREFIX')
+        if self.lib.TessBaseAPIInit2(self.handle, datapath.encode() if datapath else None,
+                                     lang.encode(), oem) != 0:
+            self.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+            raise RuntimeError(f"Could not initialise Tesseract for {lang} (oem {oem})")
+
+    def image_to_string(self, image: Image.Image, config: str = '', lang: Optional[str] = None) -> str:
+        options = parse_config(config, lang)
+        self._set_image(image, options)
+        text = self._recognise_text()
+        # The tesseract binary ends every page with a form feed
+        return text + '\f'
+
+    def image_to_osd(self, image: Image.Image, config: str = '') -> str:
+        options = parse_config(config)._replace(psm=PSM_OSD_ONLY)
+        self._set_image(image, options)
+        degrees, orientation_conf = ctypes.c_int(), ctypes.c_float()
+        script, script_conf = ctypes.c_char_p(), ctypes.c_float()
+        ok = self.lib.TessBaseAPIDetectOrientationScript(self.handle, ctypes.byref(degrees),
+                                                         ctypes.byref(orientation_conf),
+                                                         ctypes.byref(script), ctypes.byref(script_conf))
+        self._clear()
+        if not ok:
+            raise pytesseract.TesseractError(1, "Orientation detection failed (too few characters)")
+        # Same layout as the binary's OSD output, which callers parse
+        return (f"Page number: 0\n"
+                f"Orientation in degrees: {degrees.value}\n"
+                f"Rotate: {OSD_ROTATE[degrees.value // 90 % 4]}\n"
+                f"Orientation confidence: {orientation_conf.value:.2f}\n"
+                f"Script: {script.value.decode() if script.value else ''}\n"
+                f"Script confidence: {script_conf.value:.2f}\n")
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.lib.TessBaseAPIEnd(self.handle)
+            self.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+
+    def _set_image(self, image: Image.Image, options: OcrConfig) -> None:
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('L' if image.mode in ('1', 'LA', 'I', 'I;16', 'F') else 'RGB')
+        depth = 1 if image.mode == 'L' else 3
+        width, height = image.size
+        self._image_data = image.tobytes()  # Tesseract reads it until Clear()
+
+        self.lib.TessBaseAPISetPageSegMode(self.handle, options.psm)
+        for name, value in options.variables:
+            # -c only applies to this call; the handle goes back to the pool afterwards
+            previous = self._get_variable(name.encode())
+            if self.lib.TessBaseAPISetVariable(self.handle, name.encode(), value.encode()) and previous is not None:
+                self._saved_variables.append((name.encode(), previous))
+        self.lib.TessBaseAPISetImage(self.handle, self._image_data, width, height, depth, width * depth)
+        dpi = options.dpi or _image_dpi(image)
+        if dpi:
+            self.lib.TessBaseAPISetSourceResolution(self.handle, dpi)
+
+    def _recognise_text(self) -> str:
+        pointer = self.lib.TessBaseAPIGetUTF8Text(self.handle)
+        try:
+            return ctypes.string_at(pointer).decode('utf-8') if pointer else ''
+        finally:
+            if pointer:
+                self.lib.TessDeleteText(pointer)
+            self._clear()
+
+    def _clear(self) -> None:
+        """Free the image and results and put back variables changed for this call"""
+        self.lib.TessBaseAPIClear(self.handle)
+        self._image_data = None
+        while self._saved_variables:
+            name, value = self._saved_variables.pop()
+            self.lib.TessBaseAPISetVariable(self.handle, name, value)
+
+    def _get_variable(self, name: bytes) -> Optional[bytes]:
+        """A variable's current value as SetVariable takes it, or None if there is no such variable"""
+        number = ctypes.c_int()
+        if self.lib.TessBaseAPIGetIntVariable(self.handle, name, ctypes.byref(number)):
+            return str(number.value).encode()
+        if self.lib.TessBaseAPIGetBoolVariable(self.handle, name, ctypes.byref(number)):
+            return b'1' if number.value else b'0'
+        real = ctypes.c_double()
+        if self.lib.TessBaseAPIGetDoubleVariable(self.handle, name, ctypes.byref(real)):
+            return repr(real.value).encode()
+        return self.lib.TessBaseAPIGetStringVariable(self.handle, name)
+
+def _image_dpi(image: Image.Image) -> Optional[int]:
+    # pytesseract passes image.info to the temp file, so the binary sees the same DPI
+    dpi = image.info.get('dpi')
+    try:
+        return int(round(dpi[0])) if dpi else None
+    except (TypeError, ValueError):
+        return None
+
+class EnginePool:
+    """Warm OCR engines shared by the threads of one process.
+
+    Engines are created lazily, up to size per (language, engine mode),
+    and reused; a caller waits when every engine is busy. If the API
+    engine cannot be created the pool serves pytesseract instead.
+    """
+
+    def __init__(self, size: Optional[int] = None, engine_factory=None):
+        self.size = size or int(os.getenv(POOL_SIZE_ENV, 0)) or os.cpu_count() or 1
+        self.engine_factory = engine_factory or TesseractApiEngine
+        self.fallback = SubprocessEngine()
+        self._idle: Dict[Tuple[str, int], List] = {}
+        self._created: Dict[Tuple[str, int], int] = {}
+        self._cond = threading.Condition()
+        self._api_available = True
+        self._pid = os.getpid()
+        self.calls = 0
+        self.fallback_calls = 0
+        self.waits = 0
+
+    def image_to_string(self, image: Image.Image, config: str = '', lang: Optional[str] = None) -> str:
+        """Same contract as pytesseract.image_to_string"""
+        options = parse_config(config, lang)
+        with self.engine(options) as engine:
+            return engine.image_to_string(image, config=config, lang=lang)
+
+    def image_to_osd(self, image: Image.Image, config: str = '') -> str:
+        """Same contract as pytesseract.image_to_osd"""
+        options = parse_config(config)
+        with self.engine(options) as engine:
+            return engine.image_to_osd(image, config=config)
+
+    @contextmanager
+    def engine(self, options: OcrConfig):
+        """Borrow a warm engine for these options (the subprocess engine if none can be had)"""
+        engine = self._checkout(options) if options.supported else None
+        if engine is None:
+            self.fallback_calls += 1
+            yield self.fallback
+            return
+        try:
+            yield engine
+        except Exception:
+            # A handle that raised may be in a bad state; replace it
+            self._discard(engine)
+            raise
+        else:
+            self._checkin(engine)
+
+    def warm(self, lang: str = DEFAULT_LANG, oem: int = DEFAULT_OEM, count: Optional[int] = None) -> int:
+        """Create engines ahead of the first call; returns how many are idle"""
+        options = OcrConfig(lang, oem, DEFAULT_PSM, (), None, True)
+        engines = [engine for engine in (self._checkout(options) for _ in range(count or self.size)) if engine]
+        for engine in engines:
+            self._checkin(engine)
+        return len(engines)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'size': self.size,
+                'engines': sum(self._created.values()),
+                'idle': sum(len(idle) for idle in self._idle.values()),
+                'calls': self.calls,
+                'fallback_calls': self.fallback_calls,
+                'waits': self.waits,
+                'api_available': int(self._api_available),
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            for idle in self._idle.values():
+                for engine in idle:
+                    engine.close()
+            self._idle.clear()
+            self._created.clear()
+
+    def _checkout(self, options: OcrConfig):
+        key = (options.lang, options.oem)
+        with self._cond:
+            if os.getpid() != self._pid:
+                # Handles inherited over fork belong to the parent; start afresh
+                self._idle, self._created, self._pid = {}, {}, os.getpid()
+            while self._api_available:
+                idle = self._idle.setdefault(key, [])
+                if idle:
+                    self.calls += 1
+                    return idle.pop()
+                if self._created.get(key, 0) < self.size:
+                    self._created[key] = self._created.get(key, 0) + 1
+                    break
+                self.waits += 1
+                self._cond.wait()
+            else:
+                return None
+        try:
+            engine = self.engine_factory(lang=options.lang, oem=options.oem)
+        except Exception:
+            with self._cond:
+                self._created[key] -= 1
+                self._api_available = False
+                self._cond.notify_all()
+            return None
+        with self._cond:
+            self.calls += 1
+        return engine
+
+    def _checkin(self, engine) -> None:
+        with self._cond:
+            self._idle.setdefault((engine.lang, engine.oem), []).append(engine)
+            self._cond.notify()
+
+    def _discard(self, engine) -> None:
+        try:
+            engine.close()
+        finally:
+            with self._cond:
+                self._created[(engine.lang, engine.oem)] -= 1
+                self._cond.notify()
+
+_pool: Optional[EnginePool] = None
+_pool_lock = threading.Lock()
+
+def get_engine_pool() -> EnginePool:
+    """Get the process-wide OCR engine pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = EnginePool()
+    return _pool
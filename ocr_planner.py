@@ -0,0 +1,163 @@
+"""
+Tiered, early-exit OCR for reading dates and menu weeks off menu pages.
+
+Each page goes through the cheapest way of getting its text first and
+only moves to a more expensive one when the caller's parser finds
+nothing: the PDF's own text layer, then a low-resolution OCR of the
+header band, then the full-resolution band, a sparse-text page
+segmentation, the whole page and finally the whole page after
+orientation correction. Which tier answered is logged and counted, so
+the share of pages reaching the expensive tiers can be checked.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+from menu_ocr import MAX_OCR_DIMENSION, crop_header, preprocess_for_ocr
+from ocr_cache import cached_ocr
+from ocr_engine import get_engine_pool
+
+logger = logging.getLogger(__name__)
+
+TIER_TEXT_LAYER = 'text_layer'
+OCR_CONFIG = '--psm 6 --oem 1'  # One uniform block of text
+SPARSE_CONFIG = '--psm 11 --oem 1'  # As much text as possible, in no particular order
+
+# Scale for the first header pass: a full-size header is ~2400px wide, so
+# this keeps two thirds of the date text's height at under half the pixels
+FAST_MAX_DIMENSION = 1600
+
+class Tier(NamedTuple):
+    """One OCR attempt: which part of the page, at what size, with what settings"""
+    name: str
+    region: str  # 'header' or 'page'
+    max_dimension: int
+    config: str
+    correct_orientation: bool = False
+
+# Cheapest first
+OCR_TIERS = (
+    Tier('header_fast', 'header', FAST_MAX_DIMENSION, OCR_CONFIG),
+    Tier('header', 'header', MAX_OCR_DIMENSION, OCR_CONFIG),
+    Tier('header_sparse', 'header', MAX_OCR_DIMENSION, SPARSE_CONFIG),
+    Tier('page', 'page', MAX_OCR_DIMENSION, OCR_CONFIG),
+    Tier('page_rotated', 'page', MAX_OCR_DIMENSION, OCR_CONFIG, correct_orientation=True),
+)
+
+def pdf_page_text(pdf_path: str, page_number: int = 0) -> str:
+    """Text layer of one PDF page ('' for scanned pages or unreadable PDFs)"""
+    try:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(pdf_path)
+        if page_number >= len(reader.pages):
+            return ''
+        return reader.pages[page_number].extract_text() or ''
+    except Exception as e:
+        logger.warning(f"Could not read text layer of {pdf_path}: {str(e)}")
+        return ''
+
+def upright(image: Image.Image) -> Optional[Image.Image]:
+    """The image rotated upright using Tesseract's orientation detection, or None if it already is"""
+    try:
+        osd = get_engine_pool().image_to_osd(image)
+        rotation = int(osd.split("Rotate:")[1].split("\n")[0].strip())
+    except Exception as e:
+        logger.warning(f"Orientation detection failed: {str(e)}")
+        return None
+    if rotation not in (90, 180, 270):
+        return None
+    return image.rotate(360 - rotation, expand=True)
+
+def ocr_image(image: Image.Image, max_dimension: int, config: str) -> str:
+    """Preprocess and OCR an image region"""
+    return cached_ocr(preprocess_for_ocr(image, max_dimension=max_dimension), config=config)
+
+class OcrPlanner:
+    """Runs the OCR tiers for a page until a parser accepts the text.
+
+    Counts the tier each page was answered at ('failed' when none was),
+    per process.
+    """
+
+    def __init__(self, tiers=OCR_TIERS, ocr: Callable[[Image.Image, int, str], str] = ocr_image):
+        self.tiers = tiers
+        self.ocr = ocr
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def run(self, parse: Callable[[str], Any], image: Optional[Image.Image] = None,
+            pdf_path: Optional[str] = None, page_number: int = 0) -> Dict[str, Any]:
+        """
+        Read a page, stopping at the first tier whose text parse() accepts.
+
+        Args:
+            parse: Turns text into a result; a falsy result moves on to the next tier
+            image: The rendered page, for the OCR tiers
+            pdf_path: The PDF the page came from, for the text layer tier
+            page_number: Zero-based page index in the PDF
+
+        Returns:
+            dict with the parsed 'result' (None if every tier failed), the
+            'tier' that produced it, its 'text' and the 'tiers' tried
+        """
+        started = time.perf_counter()
+        tried: List[str] = []
+
+        if pdf_path:
+            tried.append(TIER_TEXT_LAYER)
+            text = pdf_page_text(pdf_path, page_number)
+            result = parse(text) if text.strip() else None
+            if result:
+                return self._finish(TIER_TEXT_LAYER, result, text, tried, started)
+
+        if image is not None:
+            if image.mode not in ('L', 'RGB'):
+                image = image.convert('RGB')
+            # Pages and header crops by (orientation corrected, region), made once each
+            regions: Dict[tuple, Optional[Image.Image]] = {(False, 'page'): image}
+            for tier in self.tiers:
+                key = (tier.correct_orientation, tier.region)
+                if key not in regions:
+                    page_key = (tier.correct_orientation, 'page')
+                    if page_key not in regions:
+                        regions[page_key] = upright(image)
+                    page = regions[page_key]
+                    regions[key] = crop_header(page) if page is not None and tier.region == 'header' else page
+                region = regions[key]
+                if region is None:
+                    continue  # Already upright, so the earlier tiers saw this image
+                tried.append(tier.name)
+                text = self.ocr(region, tier.max_dimension, tier.config)
+                result = parse(text)
+                if result:
+                    return self._finish(tier.name, result, text, tried, started)
+
+        return self._finish(None, None, '', tried, started)
+
+    def stats(self) -> Dict[str, int]:
+        """Pages answered per tier, and 'failed' for pages no tier could read"""
+        with self._lock:
+            return dict(self._counts)
+
+    def _finish(self, tier: Optional[str], result, text: str, tried: List[str], started: float) -> Dict[str, Any]:
+        with self._lock:
+            self._counts[tier or 'failed'] += 1
+        elapsed_ms = 1000 * (time.perf_counter() - started)
+        if tier:
+            logger.info(f"OCR answered at tier {tier} after {len(tried)} attempt(s) in {elapsed_ms:.0f} ms")
+        else:
+            logger.warning(f"OCR found nothing after tiers {tried} ({elapsed_ms:.0f} ms)")
+        return {'result': result, 'tier': tier, 'text': text, 'tiers': tried}
+
+_planner: Optional[OcrPlanner] = None
+
+def get_ocr_planner() -> OcrPlanner:
+    """Get the process-wide OCR planner instance"""
+    global _planner
+    if _planner is None:
+        _planner = OcrPlanner()
+    return _planner
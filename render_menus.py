@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables before the app config is imported
+if os.path.exists('development.env'):
+    load_dotenv('development.env')
+else:
+    load_dotenv()
+
+def main():
+    """Render every season/week menu with the current dates header in one pass."""
+    parser = argparse.ArgumentParser(description="Render all menu templates with the current dates header")
+    parser.add_argument("--season", action="append", choices=['summer', 'winter'],
+                        help="Season to render (repeatable, default: both)")
+    parser.add_argument("--format", dest="output_format", default="png", choices=['png', 'jpg'],
+                        help="Output image format")
+    parser.add_argument("--output_folder", type=str, default=None,
+                        help="Also save the rendered menus to this folder")
+    args = parser.parse_args()
+
+    from config import supabase
+    from app.services.menu_service import MenuService
+
+    menu_service = MenuService(db=supabase, storage=supabase.storage)
+    seasons = tuple(args.season or ('summer', 'winter'))
+
+    started = time.perf_counter()
+    result = menu_service.render_all_menus(
+        seasons=seasons,
+        output_format=args.output_format,
+        return_bytes=bool(args.output_folder)
+    )
+    elapsed = time.perf_counter() - started
+
+    if result.get('error'):
+        print(f"❌ Render failed: {result['error']}")
+        sys.exit(1)
+
+    if args.output_folder:
+        os.makedirs(args.output_folder, exist_ok=True)
+
+    rendered = 0
+    for season, weeks in result['menus'].items():
+        for week, output in weeks.items():
+            rendered += 1
+            if args.output_folder:
+                path = os.path.join(args.output_folder, f"{season}_week_{week}.{args.output_format}")
+                with open(path, 'wb') as f:
+                    f.write(output)
+                print(f"✅ {season} week {week}: {path}")
+            else:
+                print(f"✅ {season} week {week}: {output}")
+
+    for name, error in result['errors'].items():
+        print(f"❌ {name}: {error}")
+
+    print(f"\nRendered {rendered} menu(s) in {elapsed:.2f}s")
+    sys.exit(0 if result['success'] else 1)
+
+if __name__ == "__main__":
+    main()
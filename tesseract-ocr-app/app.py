@@ -5,6 +5,15 @@ import pytesseract
 import io
 import re
 import os
+import sys
+
+# Use the shared tiered OCR (on warm pooled engines) when deployed from the
+# full repository; a standalone build of this directory calls the tesseract binary
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from ocr_planner import get_ocr_planner
+except ImportError:
+    get_ocr_planner = None
 
 app = Flask(__name__)
 CORS(app)
@@ -177,17 +186,20 @@ def ocr():
         if image.mode not in ('L', 'RGB'):
             image = image.convert('RGB')
             
-        # Extract text with specific configuration for text detection
-        text = pytesseract.image_to_string(
-            image,
-            config='--psm 6'  # Assume uniform block of text
-        )
-        
-        # Find menu week pattern
-        menu_week = find_menu_week(text)
+        if get_ocr_planner is not None:
+            # Quick header OCR first, escalating only while no menu week is found
+            plan = get_ocr_planner().run(find_menu_week, image=image)
+            menu_week, tier = plan['result'], plan['tier']
+        else:
+            # Extract text with specific configuration for text detection
+            text = pytesseract.image_to_string(
+                image,
+                config='--psm 6'  # Assume uniform block of text
+            )
+            menu_week, tier = find_menu_week(text), None
         
         if menu_week:
-            return jsonify({'menu_week': menu_week})
+            return jsonify({'menu_week': menu_week, 'ocr_tier': tier})
         else:
             return jsonify({'error': 'No menu week pattern found in the image.'}), 404
             
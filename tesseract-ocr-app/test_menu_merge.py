@@ -1,19 +1,21 @@
 import os
 import sys
-from PIL import Image, ImageEnhance, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont
 import pytesseract
-import re
-from datetime import datetime
 import gc
 from typing import Dict, Optional, Tuple
 import logging
-import cv2
-import numpy as np
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from PyPDF2 import PdfReader, PdfWriter
 import tempfile
 
+# Share the merge engine with the main app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from menu_merge import merge_header_files
+from menu_ocr import parse_day_dates
+from ocr_planner import get_ocr_planner
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,52 +44,21 @@ def print_debug_info():
         print(f"Error getting languages: {e}")
 
 def extract_dates_from_image(image_path: str) -> Optional[Dict[str, str]]:
-    """Extract dates from the image using OCR"""
+    """Extract dates from the image, escalating from a quick header OCR only when needed"""
     try:
         print(f"Processing image: {image_path}")
         print(f"Tesseract command: {pytesseract.pytesseract.tesseract_cmd}")
         
         # Open and optimize image for OCR
         with Image.open(image_path) as img:
-            # Convert to RGB if needed
-            if img.mode not in ('L', 'RGB'):
-                img = img.convert('RGB')
-            
-            # Resize if too large (max dimension 2400px)
-            max_dimension = 2400
-            if max(img.size) > max_dimension:
-                ratio = max_dimension / max(img.size)
-                new_size = tuple(int(dim * ratio) for dim in img.size)
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # Enhance image for OCR
-            img = ImageEnhance.Contrast(img).enhance(1.5)
-            img = ImageEnhance.Sharpness(img).enhance(1.5)
-            
-            # Convert to grayscale for OCR
-            img = img.convert('L')
-            
-            # Use custom OCR config for better memory usage
-            custom_config = '--psm 6 --oem 1'
-            text = pytesseract.image_to_string(img, config=custom_config)
-            print(f"Extracted text:\n{text}")
+            plan = get_ocr_planner().run(parse_day_dates, image=img)
             
             # Clean up memory
             img = None
-            
-        # Process text to extract dates
-        dates = {}
-        lines = text.split('\n')
-        for line in lines:
-            # Process one line at a time
-            match = re.search(r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*\s+(\d+(?:st|nd|rd|th)?\s+[A-Za-z]+)', line)
-            if match:
-                day = match.group(1)[:3]  # Standardize to 3 letters
-                date = match.group(2)
-                dates[day] = date
         
-        print(f"Extracted dates: {dates}")
-        return dates if dates else None
+        print(f"Extracted text:\n{plan['text']}")
+        print(f"Extracted dates: {plan['result']} (OCR tier {plan['tier']}, tried {plan['tiers']})")
+        return plan['result']
         
     except Exception as e:
         print(f"Error extracting dates: {str(e)}")
@@ -164,78 +135,12 @@ def add_dates_to_menu(master_path: str, dates: Dict[str, str], output_path: str)
             except Exception as e:
                 print(f"Warning: Failed to delete temp file: {e}")
 
-def merge_header_with_template(source_image: str, template_path: str, header_proportion: float = 0.12) -> Optional[str]:
-    """Copy header from source image to template"""
+def merge_header_with_template(source_image: str, template_path: str, header_proportion: float = 0.12) -> Optional[bytes]:
+    """Copy header from source image to template, returning encoded PNG bytes"""
     try:
-        # Read images
-        source = cv2.imread(source_image)
-        template = cv2.imread(template_path)
-        
-        if source is None or template is None:
-            print("Failed to read source or template image")
-            return None
-        
-        # Get dimensions
-        source_height = source.shape[0]
-        template_height = template.shape[0]
-        template_width = template.shape[1]
-        
-        # Copy header using specified proportion
-        header_height = int(source_height * header_proportion)
-        template_header_height = int(template_height * header_proportion)
-        
-        # Extract header
-        header = source[0:header_height, :]
-        
-        # Calculate the aspect ratio of the header
-        header_aspect_ratio = header.shape[1] / header.shape[0]
-        
-        # Calculate new header width maintaining aspect ratio
-        new_header_width = int(template_header_height * header_aspect_ratio)
-        
-        # Resize header maintaining aspect ratio
-        header_resized = cv2.resize(header, (new_header_width, template_header_height))
-        
-        # Create new image
-        result = template.copy()
-        
-        # Calculate centering position
-        x_offset = (template_width - new_header_width) // 2
-        
-        # If header is wider than template, crop it from center
-        if new_header_width > template_width:
-            crop_start = (new_header_width - template_width) // 2
-            header_resized = header_resized[:, crop_start:crop_start + template_width]
-            x_offset = 0
-        
-        # Create the header region with white background
-        header_region = np.full((template_header_height, template_width, 3), 255, dtype=np.uint8)
-        
-        # Place the resized header in the center
-        if x_offset >= 0:
-            header_region[:, x_offset:x_offset + header_resized.shape[1]] = header_resized
-        
-        # Copy the header region to the template
-        result[0:template_header_height, :] = header_region
-        
-        # Save result with unique timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-        output_path = os.path.join(
-            'temp_images',
-            f'merged_menu_{timestamp}.png'
-        )
-        
-        # Ensure output directory exists
-        os.makedirs('temp_images', exist_ok=True)
-        
-        # Save and verify
-        success = cv2.imwrite(output_path, result)
-        if not success:
-            print("Failed to save merged image")
-            return None
-        
-        print(f"Successfully merged header with template: {output_path}")
-        return output_path
+        merged = merge_header_files(source_image, template_path, header_proportion)
+        print(f"Successfully merged header with template ({len(merged)} bytes)")
+        return merged
         
     except Exception as e:
         print(f"Error merging header with template: {e}")
@@ -297,11 +202,11 @@ def test_menu_processing():
             print(f"Menu merge result: {result}")
         
         print("\nTesting header merging...")
-        merged_path = merge_header_with_template(
+        merged = merge_header_with_template(
             'temp_images/test_menu.png',
             'templates/template.png'
         )
-        print(f"Header merge result: {merged_path}")
+        print(f"Header merge result: {len(merged) if merged else 0} bytes")
         
     except Exception as e:
         print(f"Test failed: {e}")
@@ -0,0 +1,46 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services import menu_service as menu_service_module
+from app.services.menu_service import MenuService
+
+@pytest.fixture(autouse=True)
+def clear_bucket_status():
+    menu_service_module._bucket_status.clear()
+    yield
+    menu_service_module._bucket_status.clear()
+
+def test_bucket_checked_once_per_process(mock_db, mock_storage):
+    """Only the first service in the process hits storage"""
+    MenuService(db=mock_db, storage=mock_storage)
+    MenuService(db=mock_db, storage=mock_storage)
+    service = MenuService(db=mock_db, storage=mock_storage)
+
+    assert service._ensure_bucket_exists()
+    mock_storage.get_bucket.assert_called_once_with('menu-templates')
+    mock_storage.from_.return_value.list.assert_not_called()
+
+def test_lightweight_construction_does_no_storage_calls(mock_db):
+    storage = MagicMock()
+    MenuService(db=mock_db, storage=storage, check_bucket=False)
+    assert storage.method_calls == []
+
+def test_failed_check_retried_after_backoff(mock_db, mock_storage):
+    mock_storage.get_bucket.side_effect = Exception("storage down")
+    mock_storage.create_bucket.side_effect = Exception("storage down")
+    service = MenuService(db=mock_db, storage=mock_storage, check_bucket=False)
+
+    with patch('time.monotonic', return_value=1000.0):
+        assert not service._ensure_bucket_exists()
+        assert not service._ensure_bucket_exists()
+    assert mock_storage.get_bucket.call_count == 1
+
+    mock_storage.get_bucket.side_effect = None
+    retry_at = 1000.0 + menu_service_module.BUCKET_RETRY_SECONDS
+    with patch('time.monotonic', return_value=retry_at):
+        assert service._ensure_bucket_exists()
+    assert mock_storage.get_bucket.call_count == 2
+
+def test_refresh_forces_recheck(mock_db, mock_storage):
+    service = MenuService(db=mock_db, storage=mock_storage)
+    service._ensure_bucket_exists(refresh=True)
+    assert mock_storage.get_bucket.call_count == 2
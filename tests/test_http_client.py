@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.utils.http_client import DownloadClient, DownloadError
+
+BODY = b'template-bytes' * 100
+
+class StorageHandler(BaseHTTPRequestHandler):
+    """Minimal storage endpoint that honours If-None-Match"""
+    protocol_version = 'HTTP/1.1'
+    full_responses = 0
+
+    def do_GET(self):
+        if self.path != '/template.png':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        StorageHandler.full_responses += 1
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def storage_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StorageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StorageHandler.full_responses = 0
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_conditional_get_reuses_body_and_connection(storage_url):
+    """Repeat downloads revalidate with ETag over the pooled connection"""
+    client = DownloadClient()
+    try:
+        for _ in range(3):
+            assert client.get(f"{storage_url}/template.png") == BODY
+        stats = client.stats()
+        assert client.cached(f"{storage_url}/template.png") == BODY
+        assert client.cached(f"{storage_url}/other.png") is None
+    finally:
+        client.close()
+
+    assert StorageHandler.full_responses == 1
+    assert stats['requests'] == 3
+    assert stats['not_modified'] == 2
+    assert stats['connections_opened'] == 1
+    assert stats['connections_reused'] == 2
+
+def test_error_status_raises(storage_url):
+    """Non-200 responses raise instead of returning an error page"""
+    client = DownloadClient()
+    try:
+        with pytest.raises(DownloadError):
+            client.get(f"{storage_url}/missing.png")
+    finally:
+        client.close()
+
+def test_concurrent_fetch_is_bounded_by_slowest(storage_url):
+    """Parallel downloads take about as long as the slowest one"""
+    import time
+    from unittest.mock import patch
+    client = DownloadClient()
+    original_get = client.get
+
+    def slow_get(url, timeout=None):
+        time.sleep(0.3)
+        return original_get(url, timeout=timeout)
+
+    try:
+        with patch.object(client, 'get', side_effect=slow_get):
+            start = time.monotonic()
+            results = client.get_many([f"{storage_url}/template.png"] * 2,
+                                      deadline=time.monotonic() + 5)
+            elapsed = time.monotonic() - start
+    finally:
+        client.close()
+
+    assert results == [BODY, BODY]
+    assert elapsed < 0.55
+
+def test_concurrent_fetch_fails_fast(storage_url):
+    """One failed download fails the whole fetch stage"""
+    client = DownloadClient()
+    try:
+        with pytest.raises(DownloadError):
+            client.get_many([f"{storage_url}/template.png", f"{storage_url}/missing.png"],
+                            deadline=time.monotonic() + 5)
+    finally:
+        client.close()
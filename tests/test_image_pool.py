@@ -0,0 +1,37 @@
+import time
+import numpy as np
+import pytest
+from app.utils.image_pool import ImagePool, ImagePoolBusy
+from menu_merge import encode_image, decode_image, render_merge
+
+def _image(height, width, value):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+@pytest.fixture
+def pool():
+    pool = ImagePool(max_workers=1, max_queued=0, timeout=30)
+    yield pool
+    pool.shutdown()
+
+def test_merge_runs_in_worker_process(pool):
+    """A merge in the pool matches the same merge in process"""
+    header = encode_image(_image(100, 400, 0))
+    template = encode_image(_image(500, 400, 180))
+    merged, band = pool.run(render_merge, header, template, 0.20, 'png', None)
+
+    assert merged == render_merge(header, template, 0.20, 'png')[0]
+    assert band.shape == (100, 400, 3)
+    assert (decode_image(merged)[100:] == 180).all()
+
+def test_saturated_pool_rejects_immediately(pool):
+    """Jobs beyond the queue limit fail fast instead of waiting"""
+    running = pool.submit(time.sleep, 1)
+    started = time.monotonic()
+    with pytest.raises(ImagePoolBusy):
+        pool.submit(time.sleep, 0)
+    assert time.monotonic() - started < 0.1
+
+    running.result(timeout=30)
+    assert pool.stats()['pending'] == 0
+    pool.run(time.sleep, 0)
+    assert pool.stats()['rejected'] == 1
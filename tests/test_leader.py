@@ -0,0 +1,72 @@
+import time
+from unittest.mock import MagicMock
+from config import MockRedis
+from app.utils.leader import LeaderLease, RedisLock
+from app.utils.scheduling import WakeScheduler
+
+def test_lock_held_by_one_owner():
+    redis_client = MockRedis()
+    first = RedisLock(redis_client, 'prerender:2024-01-15', 60)
+    second = RedisLock(redis_client, 'prerender:2024-01-15', 60)
+    assert first.acquire()
+    assert not second.acquire()
+    assert not second.release()  # Cannot release someone else's lock
+    assert first.release()
+    assert second.acquire()
+
+def test_lock_without_redis_always_granted():
+    assert RedisLock(None, 'key', 60).acquire()
+
+def test_only_one_leader():
+    redis_client = MockRedis()
+    leases = [LeaderLease('menu-scheduler', redis_client) for _ in range(3)]
+    assert [lease.try_acquire() for lease in leases] == [True, False, False]
+    # Renewals keep the leader in place
+    assert [lease.try_acquire() for lease in leases] == [True, False, False]
+    assert leases[0].is_leader and not leases[1].is_leader
+
+def test_failover_after_release_and_expiry():
+    redis_client = MockRedis()
+    leader = LeaderLease('menu-scheduler', redis_client, ttl=1)
+    standby = LeaderLease('menu-scheduler', redis_client, ttl=1)
+    changes = []
+    standby.on_change(changes.append)
+    leader.try_acquire()
+    assert not standby.try_acquire()
+
+    leader.stop()  # Graceful shutdown hands over straight away
+    assert standby.try_acquire() and changes == [True]
+
+    # A leader that dies without releasing is replaced once the lease expires
+    replacement = LeaderLease('menu-scheduler', redis_client, ttl=1)
+    assert not replacement.try_acquire()
+    time.sleep(1.1)
+    assert not standby.is_leader  # Steps down on its own once the lease ran out
+    assert replacement.try_acquire()
+
+def test_leader_keeps_lease_through_brief_redis_errors():
+    redis_client = MagicMock()
+    redis_client.set.return_value = True
+    redis_client.eval.side_effect = ConnectionError("redis down")
+    lease = LeaderLease('menu-scheduler', redis_client, ttl=30)
+    assert lease.try_acquire()
+    assert lease.try_acquire()  # Renewal failed, but the lease is still valid
+    assert lease.is_leader
+
+def test_scheduler_runs_guarded_job_only_on_leader():
+    redis_client = MockRedis()
+    other = LeaderLease('menu-scheduler', redis_client)
+    other.try_acquire()
+
+    lease = LeaderLease('menu-scheduler', redis_client)
+    scheduler = WakeScheduler(max_sleep=1000)
+    job = MagicMock(return_value=500)
+    scheduler.add('menu_send', job, lease=lease)
+    scheduler.run_pending()
+    assert job.call_count == 0
+
+    other.stop()
+    assert lease.try_acquire()
+    assert scheduler.next_due() == 0  # Election wakes the job
+    scheduler.run_pending()
+    assert job.call_count == 1
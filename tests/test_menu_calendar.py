@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+from app.services.menu_calendar import MenuCalendar, PERIOD_DAYS
+
+SETTINGS = {
+    'start_date': '2024-01-01',
+    'days_in_advance': 4,
+    'season': 'summer',
+    'season_change_date': '2024-04-01'
+}
+
+def make_calendar(**overrides):
+    return MenuCalendar.from_settings(dict(SETTINGS, **overrides), today=date(2024, 1, 10))
+
+def test_periods_alternate_week_pairs():
+    calendar = make_calendar()
+    first, second, third = (calendar.period(i) for i in range(3))
+    assert first.period_start == date(2024, 1, 1) and first.menu_pair == '1_2'
+    assert second.period_start == date(2024, 1, 15) and second.week == 3
+    assert third.week == 1 and third.weeks == (1, 2)
+    assert first.period_end == date(2024, 1, 14)
+    assert first.send_date == date(2023, 12, 28)
+
+def test_season_changes_with_period_start():
+    calendar = make_calendar()
+    assert calendar.period_for(date(2024, 3, 31)).season == 'summer'
+    assert calendar.period_for(date(2024, 4, 8)).season == 'winter'
+    assert calendar.season_on(date(2024, 4, 1)) == 'winter'
+
+def test_next_send_and_due_on():
+    calendar = make_calendar()
+    # Second period starts 15 Jan and is sent on 11 Jan
+    assert calendar.next_send(date(2024, 1, 11)).period_start == date(2024, 1, 15)
+    assert calendar.next_send(date(2024, 1, 12)).period_start == date(2024, 1, 29)
+    assert calendar.due_on(date(2024, 1, 11)).index == 1
+    assert calendar.due_on(date(2024, 1, 12)) is None
+    assert calendar.next_period(date(2024, 1, 11)).period_start == date(2024, 1, 15)
+
+def test_lookups_outside_precomputed_window():
+    calendar = make_calendar(years=1)
+    far = date(2030, 6, 1)
+    period = calendar.period_for(far)
+    assert period.period_start <= far <= period.period_end
+    assert (period.period_start - date(2024, 1, 1)).days % PERIOD_DAYS == 0
+    before = calendar.period_for(date(2023, 12, 20))
+    assert before.index == -1 and before.week == 3
+
+def test_sends_between_matches_arithmetic():
+    calendar = make_calendar()
+    start, end = date(2024, 2, 1), date(2024, 5, 1)
+    sends = calendar.sends_between(start, end)
+    assert all(start <= p.send_date <= end for p in sends)
+    assert [p.index for p in sends] == list(range(sends[0].index, sends[-1].index + 1))
+    assert calendar.period(sends[0].index - 1).send_date < start
+    assert calendar.period(sends[-1].index + 1).send_date > end
+    assert calendar.sends_between(date(2040, 1, 1), date(2040, 3, 1))
+
+def test_upcoming():
+    upcoming = make_calendar().upcoming(date(2024, 1, 11), count=3)
+    assert [p.period_start for p in upcoming] == [date(2024, 1, 15) + timedelta(days=14 * i) for i in range(3)]
+
+def test_parsed_settings_accepted():
+    calendar = MenuCalendar.from_settings(dict(SETTINGS, start_date=date(2024, 1, 1), season_change_date=None),
+                                          today=date(2024, 1, 10))
+    assert calendar.period(10).season == 'summer'
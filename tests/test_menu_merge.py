@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from menu_merge import (merge_header, encode_image, decode_image, merge_header_bytes, read_image_size, render_merge,
+                        compute_header_layout, render_header_band, apply_header_band, decode_flags)
+
+def _image(height, width, value):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+def test_header_band_replaced_and_body_untouched():
+    """Only the top band of the template changes"""
+    source = _image(200, 400, 10)
+    template = _image(1000, 400, 200)
+    result = merge_header(source, template, header_proportion=0.20)
+
+    assert result.shape == template.shape
+    assert (result[:200] == 10).all()
+    assert (result[200:] == 200).all()
+    assert (template == 200).all(), "Template must not be modified"
+
+def test_narrow_header_centred_on_white():
+    """A narrow header is centred with white padding"""
+    source = _image(500, 100, 0)
+    template = _image(500, 400, 128)
+    result = merge_header(source, template, header_proportion=0.20)
+
+    # Header band is 100px high, resized header is 100px wide
+    assert (result[:100, 150:250] == 0).all()
+    assert (result[:100, :150] == 255).all()
+    assert (result[:100, 250:] == 255).all()
+
+def test_wide_header_cropped_from_centre():
+    """A header wider than the template is cropped to fit"""
+    source = np.zeros((100, 1000, 3), dtype=np.uint8)
+    source[:, 450:550] = 50
+    template = _image(500, 200, 128)
+    result = merge_header(source, template, header_proportion=0.20)
+
+    assert result.shape == template.shape
+    assert (result[:100, 50:150] == 50).all()
+
+def test_encode_roundtrip_without_disk(tmp_path):
+    """Merged bytes decode back to the merged image"""
+    header = encode_image(_image(100, 200, 0))
+    template = encode_image(_image(400, 200, 180))
+    merged = merge_header_bytes(header, template, header_proportion=0.25)
+
+    image = decode_image(merged)
+    assert image.shape == (400, 200, 3)
+    assert (image[:100] == 0).all()
+    assert (image[100:] == 180).all()
+    assert list(tmp_path.iterdir()) == []
+
+def test_unsupported_format_rejected():
+    with pytest.raises(ValueError):
+        encode_image(_image(10, 10, 0), 'gif')
+
+def test_in_place_matches_copy_and_reuses_template():
+    """In-place compositing gives the same pixels without a page copy"""
+    source = np.random.default_rng(0).integers(0, 255, (300, 250, 3), dtype=np.uint8)
+    template = _image(1000, 400, 200)
+    expected = merge_header(source, template, header_proportion=0.20)
+
+    result = merge_header(source, template, header_proportion=0.20, in_place=True)
+    assert result is template
+    assert np.array_equal(result, expected)
+
+def test_in_place_allocates_only_header_band():
+    """Peak allocation stays far below one full page"""
+    import tracemalloc
+    source = _image(400, 400, 10)
+    template = _image(2000, 1500, 200)
+    tracemalloc.start()
+    merge_header(source, template, header_proportion=0.20, in_place=True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < template.nbytes / 2
+
+def test_prerendered_band_matches_merge():
+    """Applying a pre-rendered band gives the same result as a full merge"""
+    source = np.random.default_rng(1).integers(0, 255, (300, 900, 3), dtype=np.uint8)
+    template = _image(1000, 400, 200)
+    layout = compute_header_layout(source.shape, template.shape, 0.20)
+    band = render_header_band(source, layout)
+
+    assert band.shape == (200, 400, 3)
+    expected = merge_header(source, template, header_proportion=0.20)
+    assert np.array_equal(apply_header_band(template.copy(), band), expected)
+
+def test_band_for_other_template_size_rejected():
+    band = render_header_band(_image(200, 400, 0), compute_header_layout((200, 400), (1000, 400), 0.20))
+    with pytest.raises(ValueError):
+        apply_header_band(_image(1000, 500, 0), band)
+
+def test_image_size_read_from_header():
+    assert read_image_size(encode_image(_image(120, 80, 0))) == (120, 80)
+
+@pytest.mark.parametrize('output_format', ['png', 'jpg'])
+@pytest.mark.parametrize('scale', [2, 4, 8])
+def test_image_size_at_scale_matches_decode(output_format, scale):
+    data = encode_image(_image(1001, 703, 0), output_format)
+    assert read_image_size(data, scale) == decode_image(data, decode_flags(scale)).shape[:2]
+
+@pytest.mark.parametrize('scale', [2, 4, 8])
+def test_reduced_render_composites_at_scale(scale):
+    """Reduced renders decode, merge and encode at 1/scale resolution"""
+    header = encode_image(_image(200, 800, 0))
+    template = encode_image(_image(1600, 800, 180))
+    merged, band = render_merge(header, template, 0.20, 'jpg', scale=scale, quality=70)
+
+    image = decode_image(merged)
+    assert image.shape == (1600 // scale, 800 // scale, 3)
+    assert band.shape == (320 // scale, 800 // scale, 3)
+    assert image[:320 // scale].mean() < 5
+    assert abs(image[320 // scale + 2:].mean() - 180) < 5
+    assert len(merged) < len(render_merge(header, template, 0.20, 'png')[0])
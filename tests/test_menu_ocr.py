@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+from menu_ocr import (detect_header_band, header_band, crop_header, parse_day_dates, preprocess_for_ocr,
+                      DEFAULT_HEADER_BAND, HEADER_BAND_ENV)
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+@pytest.mark.parametrize('number', [1, 2, 3])
+def test_detects_header_bar_on_sample_menus(number):
+    with Image.open(os.path.join(TESTS_DIR, f'test_menu_position_{number}.png')) as img:
+        top, bottom = detect_header_band(img)
+        height = img.size[1]
+    # Title and day/date row sit between ~7% and ~16% of the page
+    assert top / height < 0.07
+    assert 0.16 < bottom / height < 0.20
+
+def test_blank_page_falls_back_to_default_band():
+    img = Image.new('RGB', (800, 600), 'white')
+    assert detect_header_band(img) is None
+    assert header_band(img) == (0, int(600 * DEFAULT_HEADER_BAND[1]))
+
+def test_configured_band_overrides_detection(monkeypatch):
+    monkeypatch.setenv(HEADER_BAND_ENV, '0.1,0.3')
+    img = Image.new('RGB', (800, 1000), 'white')
+    assert header_band(img) == (100, 300)
+    assert crop_header(img).size == (800, 200)
+    assert header_band(img, band=(0.0, 0.5)) == (0, 500)
+
+    monkeypatch.setenv(HEADER_BAND_ENV, 'bogus')
+    assert header_band(img) == (0, 300)
+
+def test_parse_day_dates_reads_every_day_on_a_line():
+    text = "Meal Mon 10 Feb Select Tue 11th Feb Select\nWednesday 12 Feb\nLunch Soup"
+    assert parse_day_dates(text) == {'Mon': '10 Feb', 'Tue': '11th Feb', 'Wed': '12 Feb'}
+    assert parse_day_dates("no dates here") == {}
+
+def _enhance_chain(img):
+    """The PIL preprocessing preprocess_for_ocr replaced"""
+    if max(img.size) > 2400:
+        ratio = 2400 / max(img.size)
+        img = img.resize(tuple(int(dim * ratio) for dim in img.size), Image.Resampling.LANCZOS)
+    img = ImageEnhance.Contrast(img).enhance(1.5)
+    img = ImageEnhance.Sharpness(img).enhance(1.5)
+    return img.convert('L')
+
+@pytest.mark.parametrize('number, scale', [(1, 1), (2, 1), (3, 1), (1, 1.5)])
+def test_fused_preprocessing_matches_enhance_chain(number, scale):
+    with Image.open(os.path.join(TESTS_DIR, f'test_menu_position_{number}.png')) as img:
+        page = img.convert('RGB')
+    page = page.resize((int(page.size[0] * scale), int(page.size[1] * scale)))
+    expected = _enhance_chain(page)
+    result = preprocess_for_ocr(page)
+
+    assert result.mode == 'L' and result.size == expected.size
+    diff = np.abs(np.asarray(result, dtype=np.int16) - np.asarray(expected, dtype=np.int16))
+    assert diff.mean() < 2
+    assert (diff > 32).mean() < 0.005
+    # Header detection, which runs on the same pages, is unaffected
+    assert detect_header_band(result) == detect_header_band(expected)
+
+def test_adaptive_threshold_binarises():
+    img = Image.linear_gradient('L').resize((300, 200))
+    result = np.asarray(preprocess_for_ocr(img, threshold=True))
+    assert set(np.unique(result)) <= {0, 255}
@@ -0,0 +1,225 @@
+import pytest
+from datetime import datetime
+import cv2
+import numpy as np
+from unittest.mock import MagicMock, patch
+from app.utils.merge_cache import MergeCache, HeaderBandCache, make_merge_key, content_digest
+from app.services.menu_service import MenuService
+from menu_merge import decode_image, decode_flags, band_fits
+
+def _png_bytes(height, width, value):
+    ok, encoded = cv2.imencode('.png', np.full((height, width, 3), value, dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+@pytest.fixture
+def menu_service(mock_db, mock_storage):
+    mock_storage.from_.return_value.get_public_url.return_value = 'https://example.com/merged.png'
+    return MenuService(db=mock_db, storage=mock_storage)
+
+def test_merge_key_depends_on_all_inputs():
+    """Changing any merge input changes the key"""
+    base = make_merge_key('a', 'b', 0.2, 'png')
+    assert base == make_merge_key('a', 'b', 0.2, 'PNG')
+    assert base != make_merge_key('c', 'b', 0.2, 'png')
+    assert base != make_merge_key('a', 'c', 0.2, 'png')
+    assert base != make_merge_key('a', 'b', 0.25, 'png')
+    assert base != make_merge_key('a', 'b', 0.2, 'jpg')
+
+def test_cache_evicts_least_recently_used():
+    """Cache stays bounded and keeps recently used entries"""
+    cache = MergeCache(max_entries=2)
+    cache.put('one', 'url-1')
+    cache.put('two', 'url-2')
+    assert cache.get('one')['url'] == 'url-1'
+    cache.put('three', 'url-3')
+    assert cache.get('two') is None
+    assert cache.get('one')['url'] == 'url-1'
+    assert cache.get('three')['url'] == 'url-3'
+
+def test_cache_shares_urls_through_redis():
+    """A second process finds the render URL through Redis"""
+    store = {}
+    redis_client = MagicMock()
+    redis_client.set.side_effect = lambda key, value: store.__setitem__(key, value)
+    redis_client.get.side_effect = lambda key: store.get(key)
+    MergeCache(redis_client=redis_client).put('key', 'https://example.com/a.png', b'data')
+    entry = MergeCache(redis_client=redis_client).get('key')
+    assert entry == {'url': 'https://example.com/a.png', 'data': None}
+
+def test_repeated_merge_reuses_render(menu_service, mock_storage):
+    """Merging unchanged inputs twice uploads only once"""
+    header = _png_bytes(100, 200, 0)
+    template = _png_bytes(400, 300, 128)
+    responses = {
+        'https://example.com/header.png': header,
+        'https://example.com/template.png': template
+    }
+    cache = MergeCache()
+    client = MagicMock()
+    client.get.side_effect = lambda url, **kwargs: responses[url]
+    client.get_many.side_effect = lambda urls, **kwargs: [responses[url] for url in urls]
+    with patch('app.services.menu_service.get_merge_cache', return_value=cache), \
+         patch('app.services.menu_service.get_download_client', return_value=client):
+        first = menu_service.merge_header_with_template(
+            'https://example.com/header.png', 'https://example.com/template.png')
+        second = menu_service.merge_header_with_template(
+            'https://example.com/header.png', 'https://example.com/template.png')
+        data = menu_service.merge_header_with_template(
+            'https://example.com/header.png', 'https://example.com/template.png',
+            return_bytes=True)
+
+    assert first == second == 'https://example.com/merged.png'
+    assert mock_storage.from_.return_value.upload.call_count == 1
+    merged = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    assert merged.shape == (400, 300, 3)
+    assert cache.stats()['hits'] == 2
+
+def test_merge_without_upload_keeps_render_local(menu_service, mock_storage):
+    """A render for a caller that stores it itself is not uploaded as a preview"""
+    responses = {
+        'https://example.com/header.png': _png_bytes(100, 200, 0),
+        'https://example.com/template.png': _png_bytes(400, 300, 128)
+    }
+    client = MagicMock()
+    client.get_many.side_effect = lambda urls, **kwargs: [responses[url] for url in urls]
+    with patch('app.services.menu_service.get_merge_cache', return_value=MergeCache()), \
+         patch('app.services.menu_service.get_download_client', return_value=client):
+        data = menu_service.merge_header_with_template(
+            'https://example.com/header.png', 'https://example.com/template.png',
+            return_bytes=True, upload=False)
+        url = menu_service.merge_header_with_template(
+            'https://example.com/header.png', 'https://example.com/template.png')
+
+    assert decode_image(data).shape == (400, 300, 3)
+    # The later preview request still uploads its own copy
+    assert url == 'https://example.com/merged.png'
+    assert mock_storage.from_.return_value.upload.call_count == 1
+
+def test_header_band_cache_bounded():
+    """Band cache evicts least recently used entries"""
+    cache = HeaderBandCache(max_entries=1)
+    first = cache.make_key('a', (400, 300), 0.2)
+    second = cache.make_key('a', (500, 300), 0.2)
+    cache.put(first, np.zeros((80, 300, 3), dtype=np.uint8))
+    cache.put(second, np.zeros((100, 300, 3), dtype=np.uint8))
+    assert cache.get(first) is None
+    assert cache.get(second).shape == (100, 300, 3)
+    assert cache.stats()['bytes'] == 100 * 300 * 3
+
+def test_saved_template_gets_header_band(menu_service):
+    """Saving a menu template lays out the current dates header for its size"""
+    header = _png_bytes(100, 200, 0)
+    template = _png_bytes(400, 300, 128)
+    band_cache = HeaderBandCache()
+    client = MagicMock()
+    client.get.return_value = header
+    with patch('app.services.menu_service.get_header_band_cache', return_value=band_cache), \
+         patch('app.services.menu_service.get_download_client', return_value=client), \
+         patch.object(menu_service, 'get_template',
+                      return_value={'template_url': 'https://example.com/header.png'}):
+        # Full size plus the preview and thumbnail scales
+        assert menu_service._prepare_header_bands('summer', template, 'image/png') == 3
+
+    key = band_cache.make_key(content_digest(header), (400, 300), 0.20)
+    assert band_cache.get(key).shape == (80, 300, 3)
+    for scale in (2, 4):
+        band = band_cache.get(band_cache.make_key(content_digest(header), (400, 300), 0.20, scale))
+        assert band_fits(band, decode_image(template, decode_flags(scale)).shape, 0.20)
+
+def test_saved_header_uses_downloaded_template_sizes(menu_service):
+    """A new dates header is laid out for templates already downloaded, without fetching them"""
+    header = _png_bytes(100, 200, 0)
+    template = _png_bytes(400, 300, 128)
+    band_cache = HeaderBandCache()
+    client = MagicMock()
+    client.cached.side_effect = lambda url: template if url.endswith('week1.png') else None
+    templates = {'summer': {1: {'template_url': 'https://example.com/week1.png', 'file_path': 'week1.png'},
+                            2: {'template_url': 'https://example.com/week2.png', 'file_path': 'week2.png'}}}
+    with patch('app.services.menu_service.get_header_band_cache', return_value=band_cache), \
+         patch('app.services.menu_service.get_download_client', return_value=client), \
+         patch.object(menu_service, 'get_templates', return_value=templates):
+        assert menu_service._prepare_header_bands('dates', header, 'image/png') == 3
+
+    client.get.assert_not_called()
+    assert band_cache.get(band_cache.make_key(content_digest(header), (400, 300), 0.20, 2)).shape == (40, 150, 3)
+
+def test_merge_with_cached_band_skips_header_decode(menu_service):
+    """A laid-out header is applied without decoding the header image again"""
+    header = _png_bytes(100, 200, 0)
+    responses = {
+        'https://example.com/header.png': header,
+        'https://example.com/week1.png': _png_bytes(400, 300, 128),
+        'https://example.com/week2.png': _png_bytes(400, 300, 64)
+    }
+    client = MagicMock()
+    client.get_many.side_effect = lambda urls, **kwargs: [responses[url] for url in urls]
+    band_cache = HeaderBandCache()
+    with patch('app.services.menu_service.get_merge_cache', return_value=MergeCache()), \
+         patch('app.services.menu_service.get_download_client', return_value=client), \
+         patch('app.services.menu_service.get_header_band_cache', return_value=band_cache):
+        first = menu_service.merge_header_with_template(
+            'https://example.com/header.png', 'https://example.com/week1.png', return_bytes=True)
+        with patch('app.services.menu_service.decode_image', wraps=decode_image) as decode:
+            second = menu_service.merge_header_with_template(
+                'https://example.com/header.png', 'https://example.com/week2.png', return_bytes=True)
+
+    assert decode.call_count == 1
+    assert band_cache.stats()['hits'] == 1
+    merged = decode_image(second)
+    assert (merged[:80] == 0).all() and (merged[80:] == 64).all()
+    assert (decode_image(first)[80:] == 128).all()
+
+def test_render_all_menus_decodes_header_once(menu_service):
+    """Batch render downloads once, decodes the header once and renders every week"""
+    header = _png_bytes(100, 200, 0)
+    templates = {
+        'summer': {str(week): {'template_url': f'https://example.com/summer{week}.png',
+                               'file_path': f'summer/week_{week}.png'} for week in range(1, 5)},
+        'winter': {'1': {'template_url': 'https://example.com/winter.pdf', 'file_path': 'winter/week_1.pdf'}},
+        'dates': {'header': {'template_url': 'https://example.com/header.png'}}
+    }
+    responses = {'https://example.com/header.png': header}
+    for week in range(1, 5):
+        responses[f'https://example.com/summer{week}.png'] = _png_bytes(400, 300, 10 * week)
+    client = MagicMock()
+    client.get_many.side_effect = lambda urls, **kwargs: [responses[url] for url in urls]
+    with patch('app.services.menu_service.get_merge_cache', return_value=MergeCache()), \
+         patch('app.services.menu_service.get_download_client', return_value=client), \
+         patch('app.services.menu_service.get_header_band_cache', return_value=HeaderBandCache()), \
+         patch.object(menu_service, 'get_templates', return_value=templates), \
+         patch('app.services.menu_service.decode_image', wraps=decode_image) as decode:
+        result = menu_service.render_all_menus(return_bytes=True)
+
+    assert result['success'] and result['errors'] == {}
+    assert sorted(result['menus']['summer']) == ['1', '2', '3', '4']
+    assert result['menus']['winter'] == {}
+    assert client.get_many.call_count == 1
+    assert decode.call_count == 5  # header once, each template once
+    for week, data in result['menus']['summer'].items():
+        assert (decode_image(data)[80:] == 10 * int(week)).all()
+
+def test_preview_renders_reduced_jpeg(menu_service, mock_storage):
+    """Dashboard previews are small JPEGs; full quality keeps template resolution"""
+    responses = {
+        'https://example.com/header.png': _png_bytes(100, 200, 0),
+        'https://example.com/week1.png': _png_bytes(400, 300, 128)
+    }
+    client = MagicMock()
+    client.get_many.side_effect = lambda urls, **kwargs: [responses[url] for url in urls]
+    template = {'season': 'summer', 'week': '1', 'template_url': 'https://example.com/week1.png'}
+    uploads = mock_storage.from_.return_value.upload
+    with patch('app.services.menu_service.get_merge_cache', return_value=MergeCache()), \
+         patch('app.services.menu_service.get_download_client', return_value=client), \
+         patch('app.services.menu_service.get_header_band_cache', return_value=HeaderBandCache()), \
+         patch.object(menu_service, 'get_template',
+                      return_value={'template_url': 'https://example.com/header.png'}):
+        preview = menu_service.generate_preview(template, datetime(2024, 1, 1))
+        menu_service.generate_preview(template, datetime(2024, 1, 1), quality='full')
+
+    assert preview['template']['quality'] == 'preview'
+    reduced, full = [call.kwargs for call in uploads.call_args_list]
+    assert reduced['path'].endswith('.jpg') and reduced['file_options']['content-type'] == 'image/jpeg'
+    assert decode_image(reduced['file']).shape == (200, 150, 3)
+    assert full['path'].endswith('.png')
+    assert decode_image(full['file']).shape == (400, 300, 3)
@@ -0,0 +1,59 @@
+import os
+from unittest.mock import MagicMock
+from PIL import Image, ImageDraw, ImageFont
+from config import MockRedis
+import ocr_cache
+from ocr_cache import OcrCache, cached_ocr, make_ocr_key, perceptual_hash
+from menu_ocr import crop_header
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _header(dates):
+    img = Image.new('L', (2400, 180), 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    for i, date in enumerate(dates):
+        draw.text((40 + 470 * i, 80), date, fill=0, font=font)
+    return img
+
+def test_hash_separates_dates_but_not_copies():
+    """Copies of a page hash the same; a different date does not"""
+    with Image.open(os.path.join(TESTS_DIR, 'test_menu_position_1.png')) as img:
+        crop = crop_header(img.convert('RGB'))
+    assert perceptual_hash(crop) == perceptual_hash(crop.convert('L'))
+
+    week = ['Mon 10 Feb', 'Tue 11 Feb', 'Wed 12 Feb', 'Thu 13 Feb', 'Fri 14 Feb']
+    next_week = ['Mon 17 Feb', 'Tue 18 Feb', 'Wed 19 Feb', 'Thu 20 Feb', 'Fri 21 Feb']
+    assert perceptual_hash(_header(week)) == perceptual_hash(_header(week))
+    assert perceptual_hash(_header(week)) != perceptual_hash(_header(next_week))
+    assert perceptual_hash(_header(week)) != perceptual_hash(_header(week[:4] + ['Fri 15 Feb']))
+
+def test_key_depends_on_config():
+    assert make_ocr_key('h', '--psm 6  --oem 1') == make_ocr_key('h', '--psm 6 --oem 1')
+    assert make_ocr_key('h', '--psm 6') != make_ocr_key('h', '--psm 3')
+    assert make_ocr_key('h', '--psm 6') != make_ocr_key('h', '--psm 6', lang='deu')
+
+def test_cache_evicts_least_recently_used():
+    cache = OcrCache(max_entries=2)
+    cache.put('one', 'text-1')
+    cache.put('two', 'text-2')
+    assert cache.get('one') == 'text-1'
+    cache.put('three', 'text-3')
+    assert cache.get('two') is None
+    assert cache.get('one') == 'text-1'
+    assert cache.stats() == {'entries': 2, 'hits': 2, 'misses': 1}
+
+def test_duplicate_page_skips_tesseract(monkeypatch):
+    """A second copy of a page, even in another process, is not OCR'd again"""
+    pool = MagicMock()
+    pool.image_to_string.return_value = 'Mon 10 Feb\f'
+    monkeypatch.setattr(ocr_cache, 'get_engine_pool', lambda: pool)
+    redis_client = MockRedis()
+    page = _header(['Mon 10 Feb'])
+
+    assert cached_ocr(page, config='--psm 6', cache=OcrCache(redis_client=redis_client)) == 'Mon 10 Feb\f'
+    assert cached_ocr(page.copy(), config='--psm 6', cache=OcrCache(redis_client=redis_client)) == 'Mon 10 Feb\f'
+    assert pool.image_to_string.call_count == 1
+
+    cached_ocr(page, config='--psm 3', cache=OcrCache(redis_client=redis_client))
+    assert pool.image_to_string.call_count == 2
@@ -0,0 +1,151 @@
+import ctypes
+import threading
+import time
+import pytest
+from PIL import Image
+import ocr_engine
+from ocr_engine import EnginePool, parse_config, DEFAULT_LANG, DEFAULT_OEM
+
+class FakeEngine:
+    created = 0
+
+    def __init__(self, lang=DEFAULT_LANG, oem=DEFAULT_OEM):
+        FakeEngine.created += 1
+        self.lang = lang
+        self.oem = oem
+        self.closed = False
+
+    def image_to_string(self, image, config='', lang=None):
+        time.sleep(0.01)
+        return f"{self.lang}:{image.size[0]}\f"
+
+    def image_to_osd(self, image, config=''):
+        return "Rotate: 90\n"
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def reset_fake():
+    FakeEngine.created = 0
+
+def test_parse_config_splits_supported_options():
+    options = parse_config("--psm 6 --oem 1 -c preserve_interword_spaces=1 --dpi 300", lang='fra')
+    assert (options.lang, options.oem, options.psm, options.dpi) == ('fra', 1, 6, 300)
+    assert options.variables == (('preserve_interword_spaces', '1'),)
+    assert options.supported
+    assert parse_config('').psm == ocr_engine.DEFAULT_PSM
+    assert not parse_config("--psm 6 --tessdata-dir /data").supported
+
+def test_pool_reuses_engines_and_caps_concurrency():
+    pool = EnginePool(size=2, engine_factory=FakeEngine)
+    image = Image.new('L', (40, 10), 255)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.image_to_string(image, config='--psm 6')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['eng:40\f'] * 8
+    assert FakeEngine.created == 2
+    stats = pool.stats()
+    assert stats['engines'] == 2 and stats['idle'] == 2 and stats['calls'] == 8
+
+def test_pool_keeps_engines_per_language():
+    pool = EnginePool(size=1, engine_factory=FakeEngine)
+    image = Image.new('L', (5, 5), 255)
+    assert pool.image_to_string(image, lang='deu') == 'deu:5\f'
+    assert pool.image_to_string(image) == 'eng:5\f'
+    assert pool.image_to_string(image, config='-l deu') == 'deu:5\f'
+    assert FakeEngine.created == 2
+
+def test_failed_engine_is_replaced():
+    class Flaky(FakeEngine):
+        def image_to_osd(self, image, config=''):
+            raise RuntimeError("bad page")
+
+    pool = EnginePool(size=1, engine_factory=Flaky)
+    image = Image.new('L', (5, 5), 255)
+    with pytest.raises(RuntimeError):
+        pool.image_to_osd(image)
+    assert pool.stats()['engines'] == 0
+    assert pool.image_to_string(image) == 'eng:5\f'
+
+def test_falls_back_to_subprocess_engine(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_engine.pytesseract, 'image_to_string',
+                        lambda image, lang=None, config='': calls.append(config) or 'text\f')
+
+    def unavailable(**kwargs):
+        raise RuntimeError("libtesseract is not available")
+
+    pool = EnginePool(size=2, engine_factory=unavailable)
+    image = Image.new('L', (5, 5), 255)
+    assert pool.image_to_string(image, config='--psm 6') == 'text\f'
+    # Options the API engine cannot honour always go to the binary
+    assert EnginePool(engine_factory=FakeEngine).image_to_string(image, config='--user-words w.txt') == 'text\f'
+    assert calls == ['--psm 6', '--user-words w.txt']
+    assert pool.stats()['api_available'] == 0
+
+class FakeLibrary:
+    """Stands in for libtesseract's C API"""
+
+    def __init__(self):
+        self.text = ctypes.create_string_buffer('Mon 10 Feb\n'.encode())
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append(name) or 0
+
+    def TessBaseAPIGetUTF8Text(self, handle):
+        return ctypes.addressof(self.text)
+
+    def TessBaseAPIDetectOrientationScript(self, handle, degrees, confidence, script, script_confidence):
+        degrees._obj.value = 90
+        confidence._obj.value = 5.5
+        script._obj.value = b'Latin'
+        script_confidence._obj.value = 2.25
+        return 1
+
+def test_api_engine_matches_tesseract_cli_output():
+    lib = FakeLibrary()
+    engine = ocr_engine.TesseractApiEngine(lib=lib)
+    image = Image.new('RGBA', (20, 10), 'white')
+
+    assert engine.image_to_string(image, config='--psm 6') == 'Mon 10 Feb\n\f'
+    assert 'TessDeleteText' in lib.calls and 'TessBaseAPIClear' in lib.calls
+
+    osd = engine.image_to_osd(image)
+    assert "Orientation in degrees: 90\nRotate: 270\n" in osd
+    assert "Script: Latin\nScript confidence: 2.25\n" in osd
+    # ProcessToImage.detect_orientation parses it like this
+    assert int(osd.split("Rotate:")[1].split("\n")[0].strip()) == 270
+
+def test_api_engine_restores_config_variables():
+    """-c settings last for one call, not for the pooled handle's later callers"""
+    class VariableLibrary(FakeLibrary):
+        def __init__(self):
+            super().__init__()
+            self.variables = {b'preserve_interword_spaces': b'0', b'textord_min_xheight': b'10'}
+
+        def TessBaseAPIGetIntVariable(self, handle, name, value):
+            if name not in self.variables:
+                return 0
+            value._obj.value = int(self.variables[name])
+            return 1
+
+        def TessBaseAPISetVariable(self, handle, name, value):
+            if name not in self.variables:
+                return 0
+            self.variables[name] = value
+            return 1
+
+    lib = VariableLibrary()
+    engine = ocr_engine.TesseractApiEngine(lib=lib)
+    image = Image.new('L', (20, 10), 'white')
+    engine.image_to_string(image, config='--psm 6 -c preserve_interword_spaces=1 -c no_such_variable=1')
+    assert lib.variables == {b'preserve_interword_spaces': b'0', b'textord_min_xheight': b'10'}
+    engine.image_to_osd(image, config='-c textord_min_xheight=4')
+    assert lib.variables[b'textord_min_xheight'] == b'10'
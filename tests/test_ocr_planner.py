@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from PIL import Image
+from reportlab.pdfgen import canvas
+import ocr_planner
+from ocr_planner import OcrPlanner, FAST_MAX_DIMENSION, TIER_TEXT_LAYER
+from menu_ocr import parse_day_dates, MAX_OCR_DIMENSION
+from app.services.menu_service import MenuService
+
+class FakeOcr:
+    """Returns texts[tier number] and records what each call was given"""
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.calls = []
+
+    def __call__(self, image, max_dimension, config):
+        self.calls.append((image.size, max_dimension, config))
+        return self.texts[len(self.calls) - 1] if len(self.calls) <= len(self.texts) else ''
+
+@pytest.fixture
+def page():
+    return Image.new('RGB', (1200, 800), 'white')
+
+@pytest.fixture(autouse=True)
+def already_upright(monkeypatch):
+    monkeypatch.setattr(ocr_planner, 'upright', lambda image: None)
+
+def _pdf(path, text):
+    pdf = canvas.Canvas(str(path))
+    if text:
+        pdf.drawString(72, 720, text)
+    pdf.showPage()
+    pdf.save()
+    return str(path)
+
+def test_text_layer_skips_ocr(tmp_path, page):
+    ocr = FakeOcr()
+    planner = OcrPlanner(ocr=ocr)
+    plan = planner.run(parse_day_dates, image=page, pdf_path=_pdf(tmp_path / 'menu.pdf', 'Mon 10 Feb Tue 11 Feb'))
+
+    assert plan['result'] == {'Mon': '10 Feb', 'Tue': '11 Feb'}
+    assert plan['tier'] == TIER_TEXT_LAYER
+    assert ocr.calls == []
+    assert planner.stats() == {TIER_TEXT_LAYER: 1}
+
+def test_escalates_only_until_dates_are_found(tmp_path, page):
+    ocr = FakeOcr('M0n lO Fcb', 'Mon 10 Feb')
+    plan = OcrPlanner(ocr=ocr).run(parse_day_dates, image=page, pdf_path=_pdf(tmp_path / 'scan.pdf', ''))
+
+    assert plan['result'] == {'Mon': '10 Feb'}
+    assert plan['tier'] == 'header'
+    assert plan['tiers'] == [TIER_TEXT_LAYER, 'header_fast', 'header']
+    # Both passes read the header band, the first at a lower resolution
+    (fast_size, fast_max, _), (size, max_dimension, _) = ocr.calls
+    assert fast_size == size and size[1] < page.size[1]
+    assert (fast_max, max_dimension) == (FAST_MAX_DIMENSION, MAX_OCR_DIMENSION)
+
+def test_records_failure_after_every_tier(page):
+    ocr = FakeOcr()
+    planner = OcrPlanner(ocr=ocr)
+    plan = planner.run(parse_day_dates, image=page)
+
+    assert plan['result'] is None and plan['tier'] is None
+    # The page is already upright, so it is not OCR'd a second time
+    assert plan['tiers'] == ['header_fast', 'header', 'header_sparse', 'page']
+    assert ocr.calls[2][2] == ocr_planner.SPARSE_CONFIG
+    assert ocr.calls[3][0] == page.size
+    assert planner.stats() == {'failed': 1}
+
+def test_rotated_page_is_tried_last(monkeypatch, page):
+    monkeypatch.setattr(ocr_planner, 'upright', lambda image: image.rotate(90, expand=True))
+    ocr = FakeOcr('', '', '', '', 'Summer Menu Week 2')
+    plan = OcrPlanner(ocr=ocr).run(lambda text: 'Week 2' in text, image=page)
+
+    assert plan['tier'] == 'page_rotated'
+    assert ocr.calls[-1][0] == (800, 1200)
+
+def test_menu_service_returns_planner_dates(tmp_path, mock_db, mock_storage, page):
+    image_path = str(tmp_path / 'page.png')
+    page.save(image_path)
+    planner = MagicMock()
+    planner.run.return_value = {'result': {'Mon': '10 Feb'}, 'tier': 'header_fast', 'text': '', 'tiers': []}
+    service = MenuService(db=mock_db, storage=mock_storage)
+    with patch('app.services.menu_service.get_ocr_planner', return_value=planner):
+        assert service.extract_dates_from_image(image_path) == {'Mon': '10 Feb'}
+        planner.run.return_value = {'result': None, 'tier': None, 'text': '', 'tiers': ['header_fast']}
+        assert service.extract_dates_from_image(image_path) is None
+    assert service.extract_dates_from_image(str(tmp_path / 'missing.png')) is None
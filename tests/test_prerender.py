@@ -0,0 +1,142 @@
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock, patch
+import pytest
+from app.services.menu_calendar import MenuCalendar
+from app.services.prerender import MenuPrerenderer, PRERENDER_TABLE, RETAIN_DAYS, RETRY_SECONDS
+from app.utils.merge_cache import content_digest
+from app.utils.leader import RedisLock
+from config import MockRedis
+
+SETTINGS = {'start_date': '2024-01-01', 'days_in_advance': 4, 'season': 'summer'}
+
+class FakeTable:
+    """Just enough of the postgrest query builder for the prerendered_menus table"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+        self.action = 'select'
+        self.payload = None
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row[column] < value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def upsert(self, record, on_conflict=None):
+        self.action, self.payload = 'upsert', record
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(f(row) for f in self.filters)]
+        if self.action == 'upsert':
+            key = lambda row: (row['period_start'], row['season'], row['week'])
+            self.rows[:] = [row for row in self.rows if key(row) != key(self.payload)] + [self.payload]
+            matched = [self.payload]
+        elif self.action == 'delete':
+            self.rows[:] = [row for row in self.rows if row not in matched]
+        return MagicMock(data=matched)
+
+@pytest.fixture
+def service():
+    rows = []
+    service = MagicMock()
+    service.db.table.side_effect = lambda name: FakeTable(rows) if name == PRERENDER_TABLE else None
+    service.rows = rows
+    service.template_bucket = 'menu-templates'
+    service.settings.calendar.return_value = MenuCalendar.from_settings(SETTINGS, today=date(2024, 1, 10))
+    service.templates = {
+        ('summer', 1): {'template_url': 'https://example.com/s1.png', 'file_path': 'summer/s1.png'},
+        ('summer', 3): {'template_url': 'https://example.com/s3.png', 'file_path': 'summer/s3.png'},
+        ('dates', 0): {'template_url': 'https://example.com/d.png', 'file_path': 'dates/d.png'},
+    }
+    service.get_template.side_effect = lambda season, week: service.templates.get((season, int(week)))
+    service.merge_header_with_template.side_effect = \
+        lambda source_image, template_path, **kwargs: f"{source_image}+{template_path}".encode()
+    service.storage.from_.return_value.get_public_url.side_effect = lambda path: f"https://cdn/{path}"
+    return service
+
+def test_renders_periods_inside_window(service):
+    report = MenuPrerenderer(service, days_ahead=7).run(today=date(2024, 1, 5))
+    # Only the period starting 15 Jan (sent 11 Jan) is within a week
+    assert report['rendered'] == ['2024-01-15 summer week 3']
+    record = service.rows[0]
+    assert record['checksum'] == content_digest(b'https://example.com/d.png+https://example.com/s3.png')
+    assert record['template_path'] == 'summer/s3.png'
+    # Stored once, under prerendered/ rather than also as a preview
+    assert service.merge_header_with_template.call_args.kwargs['upload'] is False
+    assert record['file_path'].startswith('prerendered/')
+    # The following period (sent 25 Jan) enters the window on 18 Jan
+    assert report['next_run'] == datetime(2024, 1, 18)
+
+def test_current_render_not_rebuilt(service):
+    prerenderer = MenuPrerenderer(service, days_ahead=7)
+    prerenderer.run(today=date(2024, 1, 5))
+    report = prerenderer.run(today=date(2024, 1, 6))
+    assert report['rendered'] == [] and report['current'] == 1
+    assert service.merge_header_with_template.call_count == 1
+
+def test_changed_template_rebuilds(service):
+    prerenderer = MenuPrerenderer(service, days_ahead=7)
+    prerenderer.run(today=date(2024, 1, 5))
+    service.templates[('summer', 3)] = {'template_url': 'https://example.com/s3b.png', 'file_path': 'summer/s3b.png'}
+    assert prerenderer.run(today=date(2024, 1, 6))['rendered'] == ['2024-01-15 summer week 3']
+    assert len(service.rows) == 1
+
+def test_failed_render_retried_sooner(service):
+    del service.templates[('dates', 0)]
+    report = MenuPrerenderer(service, days_ahead=7).run(today=date(2024, 1, 5))
+    assert len(report['failed']) == 1
+    assert report['next_run'] <= datetime.now() + timedelta(seconds=RETRY_SECONDS)
+
+def test_get_artifact_verifies_inputs_and_checksum(service):
+    prerenderer = MenuPrerenderer(service, days_ahead=7)
+    prerenderer.run(today=date(2024, 1, 5))
+    data = b'https://example.com/d.png+https://example.com/s3.png'
+    client = MagicMock()
+    with patch('app.services.prerender.get_download_client', return_value=client):
+        client.get.return_value = data
+        assert prerenderer.get_artifact('2024-01-15', 'Summer', '3') == data
+        assert prerenderer.get_artifact(date(2024, 1, 29), 'summer', 1) is None
+
+        client.get.return_value = b'corrupted'
+        assert prerenderer.get_artifact(date(2024, 1, 15), 'summer', 3) is None
+
+        client.get.return_value = data
+        service.templates[('dates', 0)] = {'template_url': 'https://example.com/d2.png', 'file_path': 'dates/d2.png'}
+        assert prerenderer.get_artifact(date(2024, 1, 15), 'summer', 3) is None
+
+def test_prune_keeps_shared_objects(service):
+    prerenderer = MenuPrerenderer(service)
+    service.rows.extend([
+        {'period_start': '2024-01-01', 'season': 'summer', 'week': 1, 'file_path': 'prerendered/a.png'},
+        {'period_start': '2024-01-15', 'season': 'summer', 'week': 3, 'file_path': 'prerendered/b.png'},
+        {'period_start': '2024-03-11', 'season': 'summer', 'week': 1, 'file_path': 'prerendered/b.png'},
+    ])
+    with patch('app.services.prerender.remove_paths') as remove:
+        assert prerenderer.prune(date(2024, 3, 11)) == 2
+    remove.assert_called_once()
+    assert remove.call_args[0][1] == ['prerendered/a.png']
+    assert [row['period_start'] for row in service.rows] == ['2024-03-11']
+    assert RETAIN_DAYS < (date(2024, 3, 11) - date(2024, 1, 15)).days
+
+def test_period_locked_by_another_replica_skipped(service):
+    redis_client = MockRedis()
+    RedisLock(redis_client, 'prerender:2024-01-15:summer:3', 300).acquire()
+    report = MenuPrerenderer(service, days_ahead=7, redis_client=redis_client).run(today=date(2024, 1, 5))
+    assert report['busy'] == ['2024-01-15 summer week 3'] and report['rendered'] == []
+    assert service.merge_header_with_template.call_count == 0
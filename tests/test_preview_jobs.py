@@ -0,0 +1,117 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+from config import MockRedis
+from app.utils.image_pool import ImagePoolBusy
+from app.utils.preview_jobs import PreviewJobs
+
+def _wait_for(jobs, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job and job['status'] not in ('pending', 'running'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_identical_requests_share_one_render():
+    """Requests for the same key while a render is in flight join it"""
+    release = threading.Event()
+    calls = []
+
+    def render():
+        calls.append(1)
+        release.wait(5)
+        return {'template': {'template_url': 'https://example.com/p.png'}}
+
+    jobs = PreviewJobs(redis_client=MockRedis())
+    key = jobs.make_key('summer', '1', 'summer/week_1.png', 'dates/header.png')
+    first, first_coalesced = jobs.submit(key, render)
+    second, second_coalesced = jobs.submit(key, render)
+    other, _ = jobs.submit(jobs.make_key('summer', '2', 'summer/week_2.png', 'dates/header.png'), render)
+    release.set()
+
+    assert first == second and other != first
+    assert (first_coalesced, second_coalesced) == (False, True)
+    assert _wait_for(jobs, first)['result']['template']['template_url'] == 'https://example.com/p.png'
+    _wait_for(jobs, other)
+    assert len(calls) == 2
+
+    # Once finished, the same key starts a fresh render
+    third, coalesced = jobs.submit(key, render)
+    assert third != first and not coalesced
+
+def test_job_state_visible_to_other_workers():
+    """Another web worker sharing Redis sees the job and joins it"""
+    redis_client = MockRedis()
+    release = threading.Event()
+    worker_a = PreviewJobs(redis_client=redis_client)
+    worker_b = PreviewJobs(redis_client=redis_client)
+
+    job_id, _ = worker_a.submit('key', lambda: release.wait(5) and {'ok': True})
+    assert worker_b.submit('key', lambda: {'ok': False}) == (job_id, True)
+    release.set()
+    _wait_for(worker_a, job_id)
+    assert worker_b.get(job_id)['result'] == {'ok': True}
+
+def test_busy_pool_reported_as_busy():
+    jobs = PreviewJobs()
+
+    def render():
+        raise ImagePoolBusy("busy", retry_after=0)
+
+    with patch('app.utils.preview_jobs.BUSY_RETRIES', 1):
+        job = _wait_for(jobs, jobs.submit('key', render)[0])
+    assert job['status'] == 'error'
+    assert job['error_type'] == 'busy'
+
+@pytest.fixture
+def client():
+    from app.routes import main as routes
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(routes.bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['logged_in'] = True
+    with patch.object(routes, 'check_maintenance_mode', return_value=False), \
+         patch.object(routes, 'get_preview_jobs', return_value=PreviewJobs()):
+        yield client, routes
+
+def test_preview_api_returns_job_then_result(client):
+    """/api/preview answers 202 at once and the status endpoint returns the render"""
+    client, routes = client
+    service = MagicMock()
+    service.get_template.return_value = {'template_url': 'https://example.com/t.png', 'file_path': 't.png'}
+    service.generate_preview.return_value = {'template': {'template_url': 'https://example.com/p.png'}}
+    with patch.object(routes, 'menu_service', service):
+        response = client.get('/api/preview?season=summer&week=1')
+        assert response.status_code == 202
+        status_url = response.get_json()['status_url']
+        assert response.headers['Location'] == status_url
+
+        deadline = time.monotonic() + 5
+        while (result := client.get(status_url)).status_code == 202 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert result.status_code == 200
+    assert result.get_json()['template']['template_url'] == 'https://example.com/p.png'
+    assert client.get('/api/preview/unknown').status_code == 404
+
+    # Job results are only for the logged-in dashboard
+    with client.session_transaction() as session:
+        session.clear()
+    assert client.get(status_url).status_code == 302
+
+def test_preview_status_503_when_pool_busy(client):
+    """A job that could not get an image pool slot answers 503 with Retry-After"""
+    client, routes = client
+    jobs = routes.get_preview_jobs()
+    jobs._update('busy-job', status='error', error='busy', error_type='busy', retry_after=3)
+    response = client.get('/api/preview/busy-job')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert response.get_json()['details']['type'] == 'busy'
@@ -0,0 +1,82 @@
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+from config import MockRedis
+from app.services.preview_store import PreviewStore
+from app.utils.merge_cache import MergeCache
+
+def _object(name, age_days, size):
+    stamp = datetime.fromtimestamp(time.time() - age_days * 86400, tz=timezone.utc).isoformat()
+    return {'id': name, 'name': name, 'updated_at': stamp, 'created_at': stamp, 'metadata': {'size': size}}
+
+def _store(objects):
+    storage = MagicMock()
+    bucket = storage.from_.return_value
+    bucket.list.side_effect = lambda path, options: objects[options['offset']:options['offset'] + options['limit']]
+    bucket.get_public_url.side_effect = lambda path: f'https://example.com/{path}'
+    return PreviewStore(storage), bucket
+
+def test_identical_renders_share_one_object():
+    """Object names come from the render content"""
+    store, bucket = _store([])
+    first, _ = store.save(b'render', 'png', 'image/png')
+    second, url = store.save(b'render', 'png', 'image/png')
+    other, _ = store.save(b'other', 'png', 'image/png')
+
+    assert first == second != other
+    assert first.startswith('previews/merged_') and url.endswith(first)
+    assert bucket.upload.call_args.kwargs['file_options']['x-upsert'] == 'true'
+
+def test_list_pages_through_folder():
+    objects = [_object(f'merged_{i}.png', 1, 10) for i in range(2500)]
+    store, bucket = _store(objects)
+    assert len(store.list_objects()) == 2500
+    assert bucket.list.call_count == 3
+
+def test_evict_applies_ttl_then_size_cap():
+    """Expired previews go first, then the oldest until under the cap"""
+    objects = [
+        _object('merged_old.png', 30, 100),
+        _object('merged_a.png', 3, 100),
+        _object('merged_b.png', 2, 100),
+        _object('merged_c.png', 1, 100),
+    ]
+    store, bucket = _store(objects)
+    cache = MagicMock()
+    with patch('app.services.preview_store.get_merge_cache', return_value=cache):
+        report = store.evict(ttl_seconds=10 * 86400, max_bytes=200)
+
+    assert report['expired'] == 1 and report['over_quota'] == 1
+    assert report['deleted'] == 2 and report['freed_bytes'] == 200
+    assert report['remaining_objects'] == 2 and report['remaining_bytes'] == 200
+    bucket.remove.assert_called_once_with(['previews/merged_old.png', 'previews/merged_a.png'])
+    cache.forget_url.assert_any_call('https://example.com/previews/merged_old.png')
+
+def test_dry_run_deletes_nothing():
+    store, bucket = _store([_object('merged_old.png', 30, 100)])
+    with patch('app.services.preview_store.get_merge_cache'):
+        report = store.evict(ttl_seconds=86400, dry_run=True)
+    assert report['paths'] == ['previews/merged_old.png'] and report['deleted'] == 0
+    bucket.remove.assert_not_called()
+
+def test_usage_report():
+    store, _ = _store([
+        _object('merged_' + 'a' * 32 + '.png', 1, 300),
+        _object('merged_' + 'b' * 32 + '.jpg', 2, 100),
+        _object('merged_1700000000000.png', 40, 50),
+    ])
+    report = store.usage_report()
+    assert report['objects'] == 3 and report['bytes'] == 450
+    assert report['legacy_objects'] == 1
+    assert report['by_format']['png'] == {'objects': 2, 'bytes': 350}
+
+def test_evicted_url_dropped_from_every_process_cache():
+    """Forgetting a URL in one process invalidates other processes' local entries"""
+    redis_client = MockRedis()
+    web, worker = MergeCache(redis_client=redis_client), MergeCache(redis_client=redis_client)
+    web.put('key', 'https://example.com/previews/a.png', b'data')
+    assert worker.get('key')['url'] == 'https://example.com/previews/a.png'
+
+    worker.forget_url('https://example.com/previews/a.png')
+    assert web.get('key') is None
+    assert worker.get('key') is None
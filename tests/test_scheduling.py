@@ -0,0 +1,104 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from app.utils.events import EventBus
+from app.utils.scheduling import WakeScheduler, MAX_SLEEP_SECONDS, FALLBACK_SLEEP_SECONDS
+
+def test_jobs_run_when_due_and_reschedule():
+    scheduler = WakeScheduler(max_sleep=100)
+    calls = []
+    scheduler.add('send', lambda: calls.append('send') or 50)
+    scheduler.add('later', lambda: calls.append('later'), first_run=30)
+
+    assert scheduler.run_pending() == 1
+    assert calls == ['send']
+    assert 29 < scheduler.next_due() <= 30
+    assert scheduler.run_pending() == 0
+
+def test_datetime_and_none_results():
+    scheduler = WakeScheduler(max_sleep=1000)
+    scheduler.add('send', lambda: datetime.now() + timedelta(seconds=200))
+    scheduler.run_pending()
+    assert 190 < scheduler.next_due() <= 200
+
+    scheduler = WakeScheduler(max_sleep=1000)
+    scheduler.add('paused', lambda: None)
+    scheduler.run_pending()
+    assert scheduler.next_due() > 990
+
+def test_far_due_times_capped_at_max_sleep():
+    scheduler = WakeScheduler(max_sleep=60)
+    scheduler.add('send', lambda: datetime.now() + timedelta(days=14))
+    scheduler.run_pending()
+    assert scheduler.next_due() <= 60
+
+def test_failed_job_retried():
+    scheduler = WakeScheduler(max_sleep=1000)
+    job = MagicMock(side_effect=Exception("database down"))
+    scheduler.add('send', job)
+    scheduler.run_pending()
+    assert job.call_count == 1
+    assert scheduler.next_due() > 0
+
+def test_event_wakes_job():
+    bus = EventBus(redis_client=None)
+    scheduler = WakeScheduler(event_bus=bus, max_sleep=1000)
+    job = MagicMock(return_value=500)
+    scheduler.add('send', job, wake_on=('settings_changed',))
+    scheduler.run_pending()
+    assert scheduler.run_pending() == 0
+
+    bus.publish('settings_changed')
+    assert scheduler.next_due() == 0
+    assert scheduler.run_pending() == 1
+    assert job.call_count == 2
+
+def test_run_sleeps_until_woken():
+    scheduler = WakeScheduler(max_sleep=30)
+    ran = threading.Event()
+    calls = []
+
+    def job():
+        calls.append(time.monotonic())
+        if len(calls) == 2:
+            ran.set()
+        return None
+
+    scheduler.add('send', job)
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+    assert len(calls) == 1  # Sleeping, not polling
+
+    scheduler.wake('send')
+    assert ran.wait(2)
+    scheduler.stop()
+    thread.join(2)
+    assert not thread.is_alive()
+
+def test_max_sleep_depends_on_pubsub():
+    assert WakeScheduler(event_bus=EventBus(redis_client=None)).max_sleep == FALLBACK_SLEEP_SECONDS
+    bus = EventBus(MagicMock())
+    assert WakeScheduler(event_bus=bus).max_sleep == MAX_SLEEP_SECONDS
+
+def test_missing_template_is_not_retried(monkeypatch):
+    """Without a template the send waits for an upload instead of retrying"""
+    from worker import scheduler as menu_scheduler
+    registry = MagicMock()
+    registry.get_template.return_value = None
+    monkeypatch.setattr(menu_scheduler, 'get_template_registry', lambda db: registry)
+    monkeypatch.setattr(menu_scheduler, 'get_send_ledger', lambda db: MagicMock())
+    today = datetime.now().date()
+    menu_service = MagicMock()
+    menu_service.calculate_next_menu.return_value = {
+        'send_date': today, 'period_start': today, 'season': 'summer', 'week': 1,
+        'recipient_emails': ['test@example.com']}
+    menu_service.settings.calendar.return_value.next_send.return_value.send_date = today + timedelta(days=14)
+    email_service = MagicMock()
+    job = menu_scheduler.MenuScheduler(menu_service, email_service, MagicMock())
+    job.ledger.pending.return_value = ['test@example.com']
+
+    assert job._check_and_send() == datetime.combine(today + timedelta(days=14), datetime.min.time())
+    email_service.send_menu.assert_not_called()
+    registry.get_template.assert_called_with('summer', 1)
@@ -0,0 +1,140 @@
+import threading
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock
+import pytest
+from app.services.send_ledger import SendLedger, menu_version, SENDS_TABLE
+
+KEY = ('period_start', 'recipient', 'menu_version')
+
+class DuplicateKey(Exception):
+    code = '23505'
+
+class FakeSends:
+    """menu_sends with its unique constraint, as postgrest would apply it"""
+
+    def __init__(self):
+        self.rows = []
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        assert name == SENDS_TABLE
+        return FakeQuery(self)
+
+class FakeQuery:
+    def __init__(self, store):
+        self.store = store
+        self.filters = {}
+        self.action = 'select'
+        self.payload = None
+
+    def select(self, *args):
+        return self
+
+    def insert(self, row):
+        self.action, self.payload = 'insert', row
+        return self
+
+    def update(self, values):
+        self.action, self.payload = 'update', values
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        with self.store.lock:
+            rows = self.store.rows
+            if self.action == 'insert':
+                if any(all(row[k] == self.payload[k] for k in KEY) for row in rows):
+                    raise DuplicateKey('duplicate key value violates unique constraint')
+                rows.append(dict(self.payload))
+                return MagicMock(data=[self.payload])
+            matched = [row for row in rows if all(row.get(k) == v for k, v in self.filters.items())]
+            if self.action == 'update':
+                for row in matched:
+                    row.update(self.payload)
+            elif self.action == 'delete':
+                self.store.rows[:] = [row for row in rows if row not in matched]
+            return MagicMock(data=[dict(row) for row in matched])
+
+@pytest.fixture
+def db():
+    return FakeSends()
+
+def test_claim_is_won_once(db):
+    first, second = SendLedger(db), SendLedger(db)
+    assert first.claim(date(2024, 1, 15), 'a@example.com', 'v1')
+    assert not second.claim(date(2024, 1, 15), 'A@example.com ', 'v1')
+    assert second.claim(date(2024, 1, 15), 'a@example.com', 'v2')
+    assert second.claim(date(2024, 1, 29), 'a@example.com', 'v1')
+
+def test_concurrent_workers_send_once(db):
+    sends = []
+    lock = threading.Lock()
+
+    def send(recipient):
+        with lock:
+            sends.append(recipient)
+        return True
+
+    recipients = [f"user{i}@example.com" for i in range(20)]
+    threads = [threading.Thread(target=SendLedger(db).deliver,
+                                args=(date(2024, 1, 15), recipients, 'v1', send)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(sends) == sorted(recipients)
+    assert SendLedger(db).pending(date(2024, 1, 15), recipients, 'v1') == []
+
+def test_failed_send_released_for_retry(db):
+    ledger = SendLedger(db)
+    result = ledger.deliver('2024-01-15', ['a@example.com', 'b@example.com'], 'v1',
+                            lambda recipient: recipient == 'a@example.com')
+    assert result == {'sent': ['a@example.com'], 'skipped': [], 'failed': ['b@example.com']}
+    assert ledger.pending('2024-01-15', ['a@example.com', 'b@example.com'], 'v1') == ['b@example.com']
+
+    retry = ledger.deliver('2024-01-15', ['a@example.com', 'b@example.com'], 'v1', lambda recipient: True)
+    assert retry['sent'] == ['b@example.com'] and retry['skipped'] == ['a@example.com']
+    assert ledger.is_sent(date(2024, 1, 15), 'b@example.com', 'v1')
+
+def test_send_exception_treated_as_failure(db):
+    def send(recipient):
+        raise ConnectionError("SMTP down")
+
+    result = SendLedger(db).deliver('2024-01-15', ['a@example.com'], 'v1', send)
+    assert result['failed'] == ['a@example.com']
+    assert db.rows == []
+
+def test_stale_claim_taken_over(db):
+    crashed = SendLedger(db)
+    crashed.claim('2024-01-15', 'a@example.com', 'v1')
+    assert not SendLedger(db).claim('2024-01-15', 'a@example.com', 'v1')
+
+    db.rows[0]['claimed_at'] = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    assert SendLedger(db).claim('2024-01-15', 'a@example.com', 'v1')
+    # The takeover refreshed claimed_at, so nobody else can take it now
+    assert not SendLedger(db).claim('2024-01-15', 'a@example.com', 'v1')
+
+def test_sent_rows_never_reclaimed(db):
+    ledger = SendLedger(db, claim_timeout=0)
+    ledger.deliver('2024-01-15', ['a@example.com'], 'v1', lambda recipient: True)
+    assert not SendLedger(db, claim_timeout=0).claim('2024-01-15', 'a@example.com', 'v1')
+
+def test_other_errors_propagate():
+    db = MagicMock()
+    db.table.return_value.insert.return_value.execute.side_effect = ConnectionError("database down")
+    with pytest.raises(ConnectionError):
+        SendLedger(db).claim('2024-01-15', 'a@example.com', 'v1')
+
+def test_menu_version():
+    assert menu_version('Summer', '1') == 'summer_week_1'
+    assert menu_version('summer', 1, {'file_path': 'summer/s1.png'}) == 'summer_week_1:summer/s1.png'
@@ -0,0 +1,93 @@
+from datetime import date
+from unittest.mock import MagicMock
+import pytest
+from app.services import settings_provider
+from app.services.settings_provider import (SettingsProvider, SETTINGS_CHANGED, DEFAULT_TTL_SECONDS,
+                                            FALLBACK_TTL_SECONDS, get_settings_provider)
+from app.utils.events import EventBus
+
+ROW = {
+    'start_date': '2024-01-01',
+    'season_change_date': '2024-10-01',
+    'days_in_advance': 14,
+    'recipient_emails': ['a@example.com'],
+    'season': 'summer'
+}
+
+@pytest.fixture
+def db():
+    db = MagicMock()
+    query = db.table.return_value.select.return_value.order.return_value.limit.return_value
+    query.execute.return_value.data = [dict(ROW)]
+    return db
+
+def test_settings_parsed_once(db):
+    provider = SettingsProvider(db)
+    settings = provider.get()
+    assert settings['start_date'] == date(2024, 1, 1)
+    assert settings['season_change_date'] == date(2024, 10, 1)
+    assert provider.get_raw()['start_date'] == '2024-01-01'
+    provider.get()
+    assert provider.loads == 1
+
+def test_callers_get_copies(db):
+    provider = SettingsProvider(db)
+    provider.get()['recipient_emails'].append('b@example.com')
+    assert provider.get()['recipient_emails'] == ['a@example.com']
+
+def test_save_refreshes(db):
+    provider = SettingsProvider(db)
+    provider.get()
+    provider.save({'season': 'winter'})
+    db.table.return_value.insert.assert_called_once_with({'season': 'winter'})
+    provider.get()
+    assert provider.loads == 2
+
+def test_change_event_from_other_process_refreshes(db):
+    bus = EventBus(MagicMock())
+    bus._ensure_listener = lambda: None
+    provider = SettingsProvider(db, event_bus=bus)
+    assert provider.ttl_seconds == DEFAULT_TTL_SECONDS
+    provider.get()
+    bus._handle_message(f'{{"event": "{SETTINGS_CHANGED}", "data": null, "origin": "other"}}')
+    provider.get()
+    assert provider.loads == 2
+
+def test_short_ttl_without_pubsub(db):
+    provider = SettingsProvider(db, event_bus=EventBus(redis_client=None))
+    assert provider.ttl_seconds == FALLBACK_TTL_SECONDS
+
+def test_stale_row_served_when_refresh_fails(db):
+    provider = SettingsProvider(db, ttl_seconds=0)
+    provider.get()
+    db.table.return_value.select.side_effect = Exception("database down")
+    assert provider.get()['season'] == 'summer'
+
+    # A change event followed by a failed reload still serves the last good row
+    provider = SettingsProvider(db, event_bus=EventBus(redis_client=None))
+    db.table.return_value.select.side_effect = None
+    provider.get()
+    provider.invalidate()
+    db.table.return_value.select.side_effect = Exception("database down")
+    assert provider.get()['season'] == 'summer'
+    assert provider.calendar() is not None
+    db.table.return_value.select.side_effect = None
+    provider.get()
+    assert provider.loads == 2
+
+def test_no_settings(db):
+    db.table.return_value.select.return_value.order.return_value.limit.return_value\
+        .execute.return_value.data = []
+    provider = SettingsProvider(db)
+    assert provider.get() is None and provider.get_raw() is None
+    provider.get()
+    assert provider.loads == 1
+
+def test_provider_not_shared_with_a_new_client_at_a_reused_id(monkeypatch):
+    first = MagicMock()
+    provider = get_settings_provider(first)
+    assert get_settings_provider(first) is provider
+    # A client created after the first is freed can get the same id()
+    other = MagicMock()
+    monkeypatch.setitem(settings_provider._providers, id(other), provider)
+    assert get_settings_provider(other).db is other
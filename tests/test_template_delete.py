@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import patch
+from app.services.menu_service import MenuService
+
+FOLDERS = {
+    'summer': ['week_1_100_abc.png', 'week_1_200_def.png', 'week_2_100_xyz.png'],
+    'backup/summer': ['week_1_50_old.png'],
+    'templates': [],
+}
+
+@pytest.fixture
+def service(mock_db, mock_storage):
+    bucket = mock_storage.from_.return_value
+    bucket.list.side_effect = lambda folder, options: [
+        {'id': name, 'name': name} for name in FOLDERS.get(folder, [])
+        if name.startswith(options.get('search', ''))
+    ]
+    bucket.remove.side_effect = lambda paths: [{'name': p} for p in paths if not p.endswith('def.png')]
+    service = MenuService(db=mock_db, storage=mock_storage)
+    bucket.list.reset_mock()
+    return service, bucket
+
+def test_delete_lists_template_folders_and_removes_in_one_call(service):
+    """Only the template's folders are listed and removal is batched"""
+    service, bucket = service
+    template = {'season': 'summer', 'week': 1, 'file_path': 'summer/week_1_100_abc.png'}
+    with patch.object(service, 'get_template', return_value=template), \
+         patch('time.sleep') as sleep:
+        result = service.delete_template('summer', 1)
+
+    assert {call.args[0] for call in bucket.list.call_args_list} == {'summer', 'backup/summer', 'templates'}
+    bucket.remove.assert_called_once_with([
+        'summer/week_1_100_abc.png', 'summer/week_1_200_def.png', 'backup/summer/week_1_50_old.png'
+    ])
+    sleep.assert_not_called()
+
+    assert result['success'] and result['deleted'] == 2 and result['failed'] == 0
+    statuses = {obj['path']: obj['status'] for obj in result['objects']}
+    assert statuses['summer/week_1_200_def.png'] == 'missing'
+
+def test_dates_template_deleted_by_week_zero(service, mock_db):
+    service, bucket = service
+    with patch.object(service, 'get_template', return_value={'season': 'dates', 'week': 0}):
+        assert service.delete_template('dates', 0)['success']
+
+    delete = mock_db.table.return_value.delete.return_value
+    delete.eq.return_value.eq.assert_called_with('week', 0)
+    assert {call.args[0] for call in bucket.list.call_args_list} == {'dates', 'backup/dates'}
+
+def test_storage_failure_reported_per_object(service):
+    service, bucket = service
+    bucket.remove.side_effect = Exception("storage down")
+    template = {'season': 'summer', 'week': 2, 'file_path': 'summer/week_2_100_xyz.png'}
+    with patch.object(service, 'get_template', return_value=template):
+        result = service.delete_template('summer', 2)
+
+    assert result['failed'] == 1
+    assert result['objects'] == [
+        {'path': 'summer/week_2_100_xyz.png', 'status': 'failed', 'error': 'storage down'}
+    ]
@@ -0,0 +1,93 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from app.services.template_registry import TemplateRegistry, TEMPLATES_TABLE, MENUS_TABLE, TEMPLATES_CHANGED
+from app.utils.events import EventBus
+
+ROWS = {
+    TEMPLATES_TABLE: [
+        {'season': 'summer', 'week': 1, 'template_url': 'https://example.com/s1.png'},
+        {'season': 'dates', 'week': 0, 'template_url': 'https://example.com/d.png'},
+    ],
+    MENUS_TABLE: [{'name': 'summer_week_1', 'file_path': 'menus/summer_week_1.png'}],
+}
+
+@pytest.fixture
+def db():
+    db = MagicMock()
+    db.table.side_effect = lambda name: MagicMock(**{
+        'select.return_value.execute.return_value.data': ROWS[name]
+    })
+    return db
+
+def test_lookups_share_one_select(db):
+    registry = TemplateRegistry(db)
+    assert registry.get_template('summer', '1')['template_url'] == 'https://example.com/s1.png'
+    assert registry.get_template('Dates', 'header')['week'] == 0
+    assert registry.get_template('winter', 2) is None
+    assert len(registry.templates()) == 2
+
+    assert registry.loads == 1
+    db.table.assert_called_once_with(TEMPLATES_TABLE)
+
+def test_menus_loaded_separately(db):
+    registry = TemplateRegistry(db)
+    assert registry.get_menu('summer_week_1') is not None
+    assert registry.get_menu('winter_week_1') is None
+    assert registry.loads == 1
+
+def test_invalidate_reloads_table(db):
+    registry = TemplateRegistry(db)
+    registry.templates()
+    registry.get_menu('summer_week_1')
+    registry.invalidate(TEMPLATES_TABLE)
+    registry.templates()
+    registry.get_menu('summer_week_1')
+    assert registry.loads == 3
+
+def test_returned_rows_are_copies(db):
+    registry = TemplateRegistry(db)
+    registry.get_template('summer', 1)['template_url'] = 'changed'
+    assert registry.get_template('summer', 1)['template_url'] == 'https://example.com/s1.png'
+
+def test_ttl_expiry(db):
+    registry = TemplateRegistry(db, ttl_seconds=0)
+    registry.templates()
+    registry.templates()
+    assert registry.loads == 2
+
+def test_invalidation_reaches_other_processes(db):
+    """Invalidations are broadcast and applied from other processes' messages"""
+    redis_client = MagicMock()
+    sender = EventBus(redis_client)
+    sender._ensure_listener = lambda: None
+    receiver_bus = EventBus(redis_client)
+    receiver_bus._ensure_listener = lambda: None
+
+    TemplateRegistry(db, event_bus=sender).invalidate(TEMPLATES_TABLE)
+    channel, message = redis_client.publish.call_args.args
+    assert json.loads(message)['event'] == TEMPLATES_CHANGED
+
+    receiver = TemplateRegistry(db, event_bus=receiver_bus)
+    receiver.templates()
+    receiver_bus._handle_message(message.encode())
+    receiver.templates()
+    assert receiver.loads == 2
+
+def test_own_messages_ignored():
+    bus = EventBus(MagicMock())
+    bus._ensure_listener = lambda: None
+    calls = []
+    bus.subscribe('changed', calls.append)
+    bus.publish('changed', {'table': 'menus'})
+    message = bus.redis_client.publish.call_args.args[1]
+    bus._handle_message(message)
+    assert calls == [{'table': 'menus'}]
+
+def test_local_only_without_pubsub():
+    bus = EventBus(redis_client=None)
+    calls = []
+    bus.subscribe('changed', calls.append)
+    bus.publish('changed')
+    assert calls == [None]
+    assert not bus.distributed
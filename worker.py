@@ -11,6 +11,15 @@ import time
 import redis
 from supabase import create_client
 from app.utils.logger import get_logger
+from app.services.preview_store import PreviewStore
+from app.services.menu_service import MenuService
+from app.services.prerender import MenuPrerenderer
+from app.services.send_ledger import get_send_ledger, menu_version
+from app.services.template_registry import get_template_registry, TEMPLATES_CHANGED
+from app.services.settings_provider import get_settings_provider, SETTINGS_CHANGED
+from app.utils.events import get_event_bus, SERVICE_STATE_CHANGED, FORCE_SEND
+from app.utils.scheduling import WakeScheduler
+from app.utils.leader import LeaderLease, SCHEDULER_LEASE
 from config import Config, supabase, redis_client
 
 # Create minimal Flask app for context
@@ -34,17 +43,18 @@ if redis_client.get('service_state') is None:
 # Initialize logger
 logger = get_logger()
 
+# Seconds between preview storage cleanups (shared across worker replicas)
+PREVIEW_CLEANUP_INTERVAL = 24 * 3600
+
+# Seconds before retrying recipients whose send failed
+SEND_RETRY_INTERVAL = 15 * 60
+
 def calculate_next_menu():
     """Calculate which menu should be sent next"""
     try:
-        # Get current settings
-        settings_response = supabase.table('menu_settings')\
-            .select('*')\
-            .order('created_at', desc=True)\
-            .limit(1)\
-            .execute()
-
-        if not settings_response.data:
+        # Get the rotation for the current settings
+        calendar = get_settings_provider(supabase).calendar()
+        if calendar is None:
             logger.log_activity(
                 action="Menu Calculation",
                 details="No menu settings found",
@@ -52,33 +62,8 @@ def calculate_next_menu():
             )
             return None
 
-        settings = settings_response.data[0]
-        start_date = datetime.strptime(settings['start_date'], '%Y-%m-%d').date()
-        today = datetime.now().date()
-
-        # Calculate next menu period
-        days_since_start = (today - start_date).days
-        weeks_since_start = days_since_start // 7
-        current_period = weeks_since_start // 2
-        
-        # Calculate next period start
-        next_period_start = start_date + timedelta(weeks=current_period * 2)
-        if today >= next_period_start:
-            next_period_start += timedelta(weeks=2)
-
-        # Calculate send date
-        send_date = next_period_start - timedelta(days=settings['days_in_advance'])
-
-        # Determine season and week
-        season = settings['season']
-        week_pair = "1_2" if (current_period % 2 == 0) else "3_4"
-
-        return {
-            'send_date': send_date,
-            'period_start': next_period_start,
-            'season': season,
-            'menu_pair': week_pair
-        }
+        # The first period whose send date is today or later
+        return calendar.next_send(datetime.now().date()).as_dict()
 
     except Exception as e:
         logger.log_activity(
@@ -92,16 +77,11 @@ def send_menu_email(start_date, recipient_list, season, week_number=None):
     """Send menu email to recipients"""
     try:
         # Get template
-        template = supabase.table('menu_templates')\
-            .select('*')\
-            .eq('season', season.lower())\
-            .eq('week', week_number)\
-            .execute()
-            
-        if not template.data:
+        template = get_template_registry(supabase).get_template(season, week_number)
+        if not template:
             raise ValueError(f"No template found for {season} week {week_number}")
             
-        template_url = template.data[0]['file_url']
+        template_url = template['template_url']
         
         # Format dates
         period_end = start_date + timedelta(days=13)  # 2 weeks
@@ -131,76 +111,102 @@ def send_menu_email(start_date, recipient_list, season, week_number=None):
         )
         return False
 
+def run_preview_cleanup():
+    """Evict old merged previews from storage, at most once per interval"""
+    try:
+        # Whoever sets the key runs the cleanup; it expires after one interval
+        if not redis_client.set('preview_cleanup:last_run', datetime.now().isoformat(),
+                                ex=PREVIEW_CLEANUP_INTERVAL, nx=True):
+            return None
+        return PreviewStore(supabase.storage).evict()
+    except Exception as e:
+        logger.log_activity(
+            action="Preview Cleanup Failed",
+            details=str(e),
+            status="error"
+        )
+        return None
+
+def send_to_recipients(next_menu):
+    """Send a menu to each configured recipient that no worker has sent it to yet"""
+    settings = get_settings_provider(supabase).get()
+    recipient_list = settings.get('recipient_emails', []) if settings else []
+    template = get_template_registry(supabase).get_template(next_menu['season'], next_menu['week'])
+    version = menu_version(next_menu['season'], next_menu['week'], template)
+
+    def send(recipient):
+        try:
+            return send_menu_email(
+                start_date=next_menu['period_start'],
+                recipient_list=[recipient],  # Send to one recipient
+                season=next_menu['season'],
+                week_number=next_menu['week']
+            )
+        finally:
+            # Small delay between emails, cleaning up after each one
+            time.sleep(2)
+            gc.collect()
+
+    # Process one recipient at a time; the ledger stops other replicas sending again
+    return get_send_ledger(supabase).deliver(next_menu['period_start'], recipient_list, version, send)
+
+def send_due_menu():
+    """Send the menu if one is due today and return when to check again"""
+    # While paused, sleep until the service is switched back on
+    if redis_client.get('service_state') != b'true':
+        return None
+    
+    next_menu = calculate_next_menu()
+    if not next_menu:
+        return None  # Woken again when settings are saved
+    
+    today = datetime.now().date()
+    next_send = next_menu['send_date']
+    if next_send == today:
+        result = send_to_recipients(next_menu)
+        gc.collect()
+        if result['failed']:
+            # Sent recipients are in the ledger; only the failed ones are retried
+            return SEND_RETRY_INTERVAL
+        calendar = get_settings_provider(supabase).calendar()
+        if calendar is None:
+            return None  # Settings gone; woken again when they are saved
+        next_send = calendar.next_send(today + timedelta(days=1)).send_date
+    
+    return datetime.combine(next_send, datetime.min.time())
+
+def cleanup_previews():
+    """Scheduled preview storage housekeeping"""
+    run_preview_cleanup()
+    return PREVIEW_CLEANUP_INTERVAL
+
+def prerender_menus():
+    """Build upcoming menus ahead of their send date and return when to run again"""
+    menu_service = MenuService(db=supabase, storage=supabase.storage, check_bucket=False)
+    return MenuPrerenderer(menu_service).run()['next_run']
+
 def run_worker():
-    """Main worker loop"""
+    """
+    Main worker loop: sleep until the next send or until woken by the dashboard.
+
+    Any number of replicas can run this. Only the holder of the scheduler
+    lease sends menus; rendering and storage housekeeping run everywhere
+    and coordinate through Redis locks.
+    """
     with app.app_context():
-        while True:
-            try:
-                # Check if service is active
-                if redis_client.get('service_state') != b'true':
-                    time.sleep(60)  # Check every minute
-                    continue
-                
-                # Clean up memory before processing
-                gc.collect()
-                
-                # Calculate next menu with memory management
-                next_menu = None
-                try:
-                    next_menu = calculate_next_menu()
-                except Exception as e:
-                    print(f"Error calculating next menu: {e}")
-                    time.sleep(300)  # Wait 5 minutes on error
-                    continue
-                
-                if not next_menu:
-                    time.sleep(300)  # Wait 5 minutes if no menu
-                    continue
-                
-                # Check if it's time to send
-                now = datetime.now().date()
-                if now == next_menu['send_date']:
-                    try:
-                        # Get settings for recipients
-                        settings = supabase.table('menu_settings')\
-                            .select('*')\
-                            .order('created_at', desc=True)\
-                            .limit(1)\
-                            .execute()
-                        
-                        if settings.data:
-                            recipient_list = settings.data[0].get('recipient_emails', [])
-                            if recipient_list:
-                                # Process one recipient at a time
-                                for recipient in recipient_list:
-                                    try:
-                                        send_menu_email(
-                                            start_date=next_menu['period_start'],
-                                            recipient_list=[recipient],  # Send to one recipient
-                                            season=next_menu['season'],
-                                            week_number=next_menu['menu_pair'].split('_')[0]
-                                        )
-                                        # Small delay between emails
-                                        time.sleep(2)
-                                    except Exception as e:
-                                        print(f"Error sending to {recipient}: {e}")
-                                        continue
-                                    finally:
-                                        # Clean up after each email
-                                        gc.collect()
-                    except Exception as e:
-                        print(f"Error processing recipients: {e}")
-                
-                # Clean up and sleep
-                gc.collect()
-                time.sleep(3600)  # Check every hour
-                
-            except Exception as e:
-                print(f"Worker error: {e}")
-                time.sleep(300)  # Wait 5 minutes on error
-            finally:
-                # Final cleanup
-                gc.collect()
+        lease = LeaderLease(SCHEDULER_LEASE, redis_client)
+        scheduler = WakeScheduler(event_bus=get_event_bus())
+        # Storage housekeeping runs even while sending is paused
+        scheduler.add('preview_cleanup', cleanup_previews)
+        scheduler.add('menu_prerender', prerender_menus,
+                      wake_on=(SETTINGS_CHANGED, TEMPLATES_CHANGED))
+        scheduler.add('menu_send', send_due_menu,
+                      wake_on=(SETTINGS_CHANGED, SERVICE_STATE_CHANGED, FORCE_SEND), lease=lease)
+        lease.start()
+        try:
+            scheduler.run()
+        finally:
+            lease.stop()
 
 if __name__ == '__main__':
     run_worker() 
\ No newline at end of file
@@ -10,17 +10,21 @@ import redis
 from supabase import create_client
 import logging
 from email.mime.application import MIMEApplication
-from app.utils.logger import ActivityLogger
+from app.utils.logger import ActivityLogger, get_logger
 from app.utils.notifications import NotificationManager
 from config import supabase, redis_client, SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD
 from PIL import Image, ImageDraw, ImageFont
 import io
 from email.mime.image import MIMEImage
 from app.services.menu_service import MenuService
+from app.services.prerender import MenuPrerenderer
+from app.services.send_ledger import get_send_ledger, menu_version
+from app.services.template_registry import get_template_registry
+from app.services.settings_provider import get_settings_provider
 from app.services.email_service import EmailService
 from app.utils.logger import Logger
 from worker.scheduler import MenuScheduler
-import requests
+from app.utils.http_client import get_download_client
 
 # Force load from .env file
 load_dotenv(override=True)
@@ -139,28 +143,13 @@ def send_email():
         return False
 
 def get_menu_settings():
-    """Get latest menu settings from database"""
-    settings_response = supabase.table('menu_settings')\
-        .select('*')\
-        .order('created_at', desc=True)\
-        .limit(1)\
-        .execute()
-        
-    return settings_response.data[0] if settings_response.data else None
+    """Get latest menu settings (cached until settings are saved)"""
+    return get_settings_provider(supabase).get_raw()
 
 def get_menu_template(season, week_number):
     """Get menu template from storage"""
     try:
-        template = supabase.table('menu_templates')\
-            .select('*')\
-            .eq('season', season.lower())\
-            .eq('week', int(week_number) if season.lower() != 'dates' else 0)\
-            .execute()
-            
-        if not template.data:
-            return None
-            
-        return template.data[0]
+        return get_template_registry(supabase).get_template(season, week_number)
         
     except Exception as e:
         print(f"Error getting template: {e}")
@@ -169,8 +158,9 @@ def get_menu_template(season, week_number):
 def calculate_next_menu():
     """Calculate which menu should be sent next"""
     try:
-        settings = get_menu_settings()
-        if not settings:
+        provider = get_settings_provider(supabase)
+        calendar = provider.calendar()
+        if calendar is None:
             logger.log_activity(
                 action="Menu Calculation",
                 details="No menu settings found",
@@ -178,55 +168,20 @@ def calculate_next_menu():
             )
             return None
             
-        today = datetime.now().date()
-        
-        # Calculate weeks since start
-        start_date = datetime.strptime(settings['start_date'], '%Y-%m-%d').date()
-        weeks_since_start = (today - start_date).days // 7
-        current_week = (weeks_since_start % 4) + 1
-        
-        # Calculate the next period start
-        periods_elapsed = weeks_since_start // 2
-        next_period_start = start_date + timedelta(days=periods_elapsed * 14)
-        
-        # If we're past this period, move to next one
-        if today >= next_period_start:
-            next_period_start += timedelta(days=14)
-        
-        # Calculate send date backwards from period start
-        send_date = next_period_start - timedelta(days=settings['days_in_advance'])
-        
-        # Determine season
-        season = settings['season']
-        if settings['season_change_date']:
-            change_date = datetime.strptime(settings['season_change_date'], '%Y-%m-%d').date()
-            if today >= change_date:
-                season = 'winter' if season == 'summer' else 'summer'
+        period = calendar.next_send(datetime.now().date())
+        next_menu = period.as_dict()
+        next_menu['recipient_emails'] = (provider.get_raw() or {}).get('recipient_emails') or []
         
         # Verify menu template exists before returning
-        if not check_menu_template_exists(season, current_week):
+        next_menu['template_missing'] = not check_menu_template_exists(period.season, period.week)
+        if next_menu['template_missing']:
             logger.log_activity(
                 action="Menu Check",
-                details=f"Menu template missing for {season.lower()} week {current_week}",
+                details=f"Menu template missing for {period.season} week {period.week}",
                 status="warning"
             )
-            return {
-                'send_date': send_date,  # Include send_date even if template missing
-                'period_start': next_period_start,
-                'season': season,
-                'week': current_week,
-                'template_missing': True,
-                'recipient_emails': settings['recipient_emails']
-            }
             
-        return {
-            'send_date': send_date,
-            'period_start': next_period_start,
-            'season': season,
-            'week': current_week,
-            'template_missing': False,
-            'recipient_emails': settings['recipient_emails']
-        }
+        return next_menu
         
     except Exception as e:
         logger.log_activity(
@@ -241,11 +196,7 @@ def check_menu_template_exists(season, week_number):
     try:
         menu_name = f"{season.lower()}_week_{week_number}"
         print(f"Checking for menu template: {menu_name}")  # Debug log
-        response = supabase.table('menus')\
-            .select('*')\
-            .eq('name', menu_name)\
-            .execute()
-        exists = bool(response.data)
+        exists = get_template_registry(supabase).get_menu(menu_name) is not None
         print(f"Template exists: {exists}")  # Debug log
         return exists
     except Exception as e:
@@ -324,29 +275,39 @@ def draw_dates_on_menu(image_data, start_date):
 def send_menu_email(start_date, recipient_list, season, week_number):
     """Send menu email to recipients"""
     try:
-        # Get menu template
-        menu_template = get_menu_template(season, week_number)
-        if not menu_template:
-            raise ValueError(f"No template found for {season} week {week_number}")
-
-        # Get dates template
-        dates_template = get_menu_template('dates', 0)  # Use week=0 for dates template
-        if not dates_template:
-            raise ValueError("Dates header template not found")
-        
-        dates_template_url = dates_template.get('template_url')
-        if not dates_template_url:
-            raise ValueError("Invalid dates template URL")
-
         # Create MenuService instance
-        menu_service = MenuService(db=supabase, storage=supabase.storage)
+        menu_service = MenuService(db=supabase, storage=supabase.storage, check_bucket=False)
+
+        # Attach the menu built ahead of time; only merge now if it is missing or stale
+        merged_template = MenuPrerenderer(menu_service).get_artifact(start_date, season, week_number)
+        if merged_template is None:
+            get_logger().log_activity(
+                action="Pre-rendered Menu Missing",
+                details=f"Rendering {season} week {week_number} for {start_date} at send time",
+                status="warning"
+            )
 
-        # Merge the templates
-        merged_template = menu_service.merge_header_with_template(
-            source_image=dates_template_url,
-            template_path=menu_template['template_url'],
-            header_proportion=0.20  # Header takes up 20% of the height
-        )
+            # Get menu template
+            menu_template = get_menu_template(season, week_number)
+            if not menu_template:
+                raise ValueError(f"No template found for {season} week {week_number}")
+
+            # Get dates template
+            dates_template = get_menu_template('dates', 0)  # Use week=0 for dates template
+            if not dates_template:
+                raise ValueError("Dates header template not found")
+
+            dates_template_url = dates_template.get('template_url')
+            if not dates_template_url:
+                raise ValueError("Invalid dates template URL")
+
+            # Merge the templates (reuses the cached render when nothing changed)
+            merged_template = menu_service.merge_header_with_template(
+                source_image=dates_template_url,
+                template_path=menu_template['template_url'],
+                header_proportion=0.20,  # Header takes up 20% of the height
+                return_bytes=True
+            )
 
         if not merged_template:
             raise ValueError("Failed to merge templates")
@@ -375,15 +336,11 @@ Menu System"""
 
         msg.attach(MIMEText(body, 'plain'))
 
-        # Download and attach the merged template
-        response = requests.get(merged_template)
-        if response.status_code == 200:
-            attachment = MIMEApplication(response.content, _subtype='png')
-            attachment.add_header('Content-Disposition', 'attachment', 
-                                filename=f"Menu_{period_start.strftime('%Y-%m-%d')}.png")
-            msg.attach(attachment)
-        else:
-            raise ValueError("Failed to download merged template")
+        # Attach the merged template
+        attachment = MIMEApplication(merged_template, _subtype='png')
+        attachment.add_header('Content-Disposition', 'attachment', 
+                            filename=f"Menu_{period_start.strftime('%Y-%m-%d')}.png")
+        msg.attach(attachment)
 
         # Send email
         with smtplib.SMTP(os.getenv('SMTP_SERVER'), int(os.getenv('SMTP_PORT'))) as server:
@@ -412,6 +369,37 @@ Menu System"""
         )
         return False
 
+def send_to_recipients(next_menu, test=False):
+    """
+    Send the menu to every recipient it has not gone to yet.
+
+    Each recipient is claimed in the send ledger first, so concurrent
+    workers never send the same menu twice. Test sends are recorded
+    separately and do not stand in for the real send.
+    """
+    template = get_menu_template(next_menu['season'], next_menu['week'])
+    version = menu_version(next_menu['season'], next_menu['week'], template)
+    if test:
+        version += '#test'
+
+    result = get_send_ledger(supabase).deliver(
+        next_menu['period_start'],
+        next_menu['recipient_emails'],
+        version,
+        lambda recipient: send_menu_email(
+            next_menu['period_start'],
+            [recipient],
+            next_menu['season'],
+            next_menu['week']
+        )
+    )
+    if result['skipped']:
+        logger.log_activity(
+            action="Menu Already Sent",
+            details=f"Skipped {len(result['skipped'])} recipient(s) for period starting {next_menu['period_start']}"
+        )
+    return result
+
 def check_and_send():
     """Main worker function"""
     try:
@@ -435,19 +423,14 @@ def check_and_send():
             )
             return
             
-        # TEMPORARY TEST CODE - Remove after testing
+        # Test mode sends ahead of the send date, but only once per menu
         if redis_client.get('debug_mode') == b'true':
             print("🧪 TEST MODE: Forcing menu send...")
-            success = send_menu_email(
-                next_menu['period_start'], 
-                next_menu['recipient_emails'], 
-                next_menu['season'], 
-                next_menu['week']
-            )
-            if success:
-                print("✅ Test menu sent successfully!")
-            else:
+            result = send_to_recipients(next_menu, test=True)
+            if result['failed']:
                 print("❌ Test menu send failed!")
+            elif result['sent']:
+                print("✅ Test menu sent successfully!")
             return
             
         if today == next_menu['send_date']:
@@ -455,12 +438,7 @@ def check_and_send():
                 action="Menu Send Started",
                 details=f"Sending menu for period starting {next_menu['period_start']}"
             )
-            success = send_menu_email(
-                next_menu['period_start'], 
-                next_menu['recipient_emails'], 
-                next_menu['season'],
-                next_menu['week']
-            )
+            send_to_recipients(next_menu)
             
         else:
             logger.log_activity(
@@ -511,7 +489,7 @@ def test_menu_processing():
             raise ValueError("Dates header template not found")
         
         # Test template merging
-        menu_service = MenuService(db=supabase, storage=supabase.storage)
+        menu_service = MenuService(db=supabase, storage=supabase.storage, check_bucket=False)
         merged_template = menu_service.merge_header_with_template(
             source_image=dates_template['template_url'],
             template_path=template['template_url'],
@@ -524,13 +502,9 @@ def test_menu_processing():
         print(f"Template merging successful: {merged_template}")
         
         # Download and save test output
-        response = requests.get(merged_template)
-        if response.status_code == 200:
-            with open('test_menu.png', 'wb') as f:
-                f.write(response.content)
-            print("Test file saved as test_menu.png")
-        else:
-            raise ValueError("Failed to download merged template")
+        with open('test_menu.png', 'wb') as f:
+            f.write(get_download_client().get(merged_template))
+        print("Test file saved as test_menu.png")
         
         return True
     except Exception as e:
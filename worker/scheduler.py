@@ -1,36 +1,64 @@
-from datetime import datetime
-import time
+from datetime import datetime, timedelta
 from typing import Optional
 from app.services.menu_service import MenuService
 from app.services.email_service import EmailService
+from app.services.settings_provider import SETTINGS_CHANGED
+from app.services.template_registry import TEMPLATES_CHANGED, get_template_registry
+from app.services.prerender import MenuPrerenderer
+from app.services.send_ledger import get_send_ledger, menu_version
 from app.utils.logger import Logger
+from app.utils.events import get_event_bus, SERVICE_STATE_CHANGED, FORCE_SEND
+from app.utils.scheduling import WakeScheduler
+from app.utils.leader import LeaderLease, SCHEDULER_LEASE, get_redis_client
+from app.utils.http_client import get_download_client
+
+# Seconds before retrying recipients whose send failed
+SEND_RETRY_SECONDS = 15 * 60
 
 class MenuScheduler:
     def __init__(self, menu_service: MenuService, email_service: EmailService, logger: Logger):
         self.menu_service = menu_service
         self.email_service = email_service
         self.logger = logger
+        self.ledger = get_send_ledger(menu_service.db)
         self.last_check: Optional[datetime] = None
         
-    def run(self, check_interval: int = 300):
-        """Run the scheduler with better error handling and logging"""
+    def run(self, check_interval: Optional[int] = None):
+        """
+        Run the scheduler, sleeping until the next send date.
+
+        Settings and template changes, service toggles and force sends
+        published by the dashboard wake it early. check_interval caps how long it sleeps
+        (by default an hour with Redis pub/sub, a minute without).
+        """
         self.logger.log("Scheduler", "Starting menu scheduler", level="info")
         
-        while True:
-            try:
-                self._check_and_send()
-                time.sleep(check_interval)
-            except Exception as e:
-                self.logger.log(
-                    "Scheduler Error",
-                    f"Error in scheduler loop: {str(e)}",
-                    status="error",
-                    level="error"
-                )
-                time.sleep(60)  # Wait before retrying
+        # Every replica pre-renders; only the lease holder sends
+        lease = LeaderLease(SCHEDULER_LEASE, get_redis_client())
+        scheduler = WakeScheduler(event_bus=get_event_bus(), max_sleep=check_interval)
+        scheduler.add('menu_send', self._check_and_send,
+                      wake_on=(SETTINGS_CHANGED, TEMPLATES_CHANGED, SERVICE_STATE_CHANGED, FORCE_SEND),
+                      lease=lease)
+        scheduler.add('menu_prerender', self._prerender,
+                      wake_on=(SETTINGS_CHANGED, TEMPLATES_CHANGED))
+        lease.start()
+        try:
+            scheduler.run()
+        finally:
+            lease.stop()
+
+    def _prerender(self):
+        """Build upcoming menus ahead of their send date; returns when to run again"""
+        report = MenuPrerenderer(self.menu_service).run()
+        return report['next_run']
     
     def _check_and_send(self):
-        """Check if menu needs to be sent with proper error handling"""
+        """
+        Send the menu if it is due and return when to check again.
+
+        Returns the start of the next send date, or None to wait for an
+        event when there is nothing to schedule.
+        """
         try:
             now = datetime.now()
             self.last_check = now
@@ -38,11 +66,22 @@ class MenuScheduler:
             # Get next menu details
             next_menu = self.menu_service.calculate_next_menu()
             if not next_menu:
-                return
+                return None
                 
             # Check if it's time to send
+            next_send = next_menu['send_date']
             if self._should_send_menu(next_menu):
-                self._send_menu(next_menu)
+                # Without a template there is nothing to retry until one is uploaded
+                if self._send_menu(next_menu) and not self._already_sent_today(next_menu):
+                    # Retry recipients whose send failed; the ledger skips the rest
+                    return SEND_RETRY_SECONDS
+            if next_send <= now.date():
+                # Today's send is handled; look from tomorrow
+                calendar = self.menu_service.settings.calendar()
+                if calendar is None:
+                    return None  # Settings gone; woken again when they are saved
+                next_send = calendar.next_send(now.date() + timedelta(days=1)).send_date
+            return datetime.combine(next_send, datetime.min.time())
                 
         except Exception as e:
             self.logger.log(
@@ -51,53 +90,69 @@ class MenuScheduler:
                 status="error",
                 level="error"
             )
+            raise
 
     def _should_send_menu(self, next_menu):
         """Determine if menu should be sent now"""
         now = datetime.now().date()
         return (
             next_menu.get('send_date') == now and
-            not self._already_sent_today()
+            not self._already_sent_today(next_menu)
         )
 
     def _send_menu(self, next_menu):
-        """Send the menu with proper error handling"""
+        """Send the menu with proper error handling; returns False when there is no template"""
         try:
             # Get menu template
-            menu_data = self.menu_service.get_menu_template(
+            template = get_template_registry(self.menu_service.db).get_template(
                 next_menu['season'], 
                 next_menu['week']
             )
             
-            if not menu_data:
+            if not template:
                 self.logger.log(
                     "Menu Send Failed",
-                    "Menu template not found",
+                    f"No template found for {next_menu['season']} week {next_menu['week']}",
                     status="error",
                     level="error"
                 )
-                return
+                return False
+
+            menu_data = get_download_client().get(template['template_url'])
                 
-            # Send email
-            success, error = self.email_service.send_menu(
-                menu_data=menu_data,
-                recipients=next_menu['recipient_emails'],
-                start_date=next_menu['period_start'],
-                menu_type=f"{next_menu['season']} Week {next_menu['week']}"
+            errors = []
+
+            def send(recipient):
+                success, error = self.email_service.send_menu(
+                    menu_data=menu_data,
+                    recipients=[recipient],
+                    start_date=next_menu['period_start'],
+                    menu_type=f"{next_menu['season']} Week {next_menu['week']}"
+                )
+                if not success:
+                    errors.append(error or "Unknown error")
+                return success
+
+            # Send email to each recipient this scheduler wins the claim for
+            result = self.ledger.deliver(
+                next_menu['period_start'],
+                next_menu['recipient_emails'],
+                self._menu_version(next_menu),
+                send
             )
             
-            if success:
+            if result['failed']:
+                self.logger.log(
+                    "Menu Send Failed",
+                    '; '.join(errors) or "Unknown error",
+                    status="error"
+                )
+            elif result['sent']:
                 self.logger.log(
                     "Menu Sent",
                     f"Menu sent successfully for {next_menu['period_start']}",
                     status="success"
                 )
-            else:
-                self.logger.log(
-                    "Menu Send Failed",
-                    error or "Unknown error",
-                    status="error"
-                )
                 
         except Exception as e:
             self.logger.log(
@@ -106,7 +161,17 @@ class MenuScheduler:
                 status="error",
                 level="error"
             )
+        return True
+
+    def _already_sent_today(self, next_menu):
+        """Whether every recipient already has this period's menu, from this or another worker"""
+        pending = self.ledger.pending(
+            next_menu['period_start'],
+            next_menu.get('recipient_emails') or [],
+            self._menu_version(next_menu)
+        )
+        return not pending
 
-    def _already_sent_today(self):
-        # Implementation of _already_sent_today method
-        pass 
\ No newline at end of file
+    def _menu_version(self, next_menu):
+        template = get_template_registry(self.menu_service.db).get_template(next_menu['season'], next_menu['week'])
+        return menu_version(next_menu['season'], next_menu['week'], template) 
\ No newline at end of file
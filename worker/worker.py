@@ -6,6 +6,7 @@ import time
 from app.services.menu_service import MenuService
 from app.services.email_service import EmailService
 from app.utils.logger import Logger
+from app.utils.leader import LeaderLease, SCHEDULER_LEASE
 from config import (
     supabase, 
     redis_client, 
@@ -21,7 +22,7 @@ load_dotenv(override=True)
 def calculate_next_menu():
     """Calculate which menu should be sent next"""
     try:
-        menu_service = MenuService(db=supabase, storage=supabase.storage)
+        menu_service = MenuService(db=supabase, storage=supabase.storage, check_bucket=False)
         return menu_service.calculate_next_menu()
     except Exception as e:
         logger = Logger()
@@ -42,7 +43,7 @@ def send_menu_email(start_date, recipient_list, season, week_number):
             'SMTP_PASSWORD': SMTP_PASSWORD
         })
         
-        menu_service = MenuService(db=supabase, storage=supabase.storage)
+        menu_service = MenuService(db=supabase, storage=supabase.storage, check_bucket=False)
         menu_data = menu_service.get_menu_template(season, week_number)
         
         if not menu_data:
@@ -84,13 +85,16 @@ def main():
         status="info"
     )
     
+    # Only the replica holding the scheduler lease sends
+    lease = LeaderLease(SCHEDULER_LEASE, redis_client).start()
+    
     while True:
         try:
             # Check if service is active
             is_active = redis_client.get('service_state') == b'true'
             is_debug = redis_client.get('debug_mode') == b'true'
             
-            if is_active or is_debug:
+            if lease.is_leader and (is_active or is_debug):
                 # Calculate next menu
                 next_menu = menu_service.calculate_next_menu()
                 if next_menu: